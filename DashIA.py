@@ -10,17 +10,13 @@ from scipy import stats
 import warnings
 warnings.filterwarnings('ignore')
 
-# Import du simulateur
-try:
-    from NinjaGBHData import NinjaGBHDataSimulator
-    ninja_simulator = NinjaGBHDataSimulator()
-except:
-    st.error("❌ Module NinjaGBHData non trouvé. Utilisation de données simulées.")
-    # Création d'un simulateur basique en cas d'erreur
-    class BasicSimulator:
-        def __init__(self):
-            self.territory_colors = {'DROM': '#FF6B6B', 'COM': '#FFA500', 'Métropole': '#00CED1'}
-    ninja_simulator = BasicSimulator()
+# Source de données (GBH_DATA_SOURCE : simulateur par défaut, Parquet, SQLite ou HTTP)
+from NinjaGBHData import NinjaGBHDataSimulator
+from NinjaGBHSources import get_data_source
+from NinjaGBHRollups import financial_rollup
+from NinjaGBHSeries import RangeSeries
+from NinjaGBHCube import OLAPCube, STORE_MEASURES
+from NinjaGBHFraud import DEFAULT_SEED, ScoredBatches, load_or_train, score_simulated_batches
 
 # ========== CONFIGURATION ==========
 NEON_BLUE = '#00f3ff'
@@ -37,8 +33,15 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+@st.cache_resource
+def get_source():
+    """Source de données unique du processus (connexions et graine conservées entre reruns)"""
+    return get_data_source()
+
+data_source = get_source()
+
 # ========== FONCTIONS D'ANALYSE AVANCÉE ==========
-def calculate_advanced_metrics(financial_data, territory_data):
+def calculate_advanced_metrics(financial_data, territory_data, monthly_avg=None):
     """Calcule des métriques analytiques avancées"""
     
     metrics = {}
@@ -60,8 +63,8 @@ def calculate_advanced_metrics(financial_data, territory_data):
         metrics['sharpe_ratio'] = (daily_returns.mean() / daily_returns.std() * np.sqrt(252)) if daily_returns.std() > 0 else 0
         
         # Saisonnalité détectée
-        financial_data['Month'] = financial_data['Date'].dt.month
-        monthly_avg = financial_data.groupby('Month')['CA_Quotidien'].mean()
+        if monthly_avg is None:
+            monthly_avg = financial_data.groupby(financial_data['Date'].dt.month)['CA_Quotidien'].mean()
         metrics['seasonality_strength'] = (monthly_avg.max() - monthly_avg.min()) / monthly_avg.mean() * 100
     
     # Analyse territoriale
@@ -225,15 +228,17 @@ def calculate_financial_ratios(financial_data):
     
     if len(financial_data) > 1:
         latest = financial_data.iloc[-1]
+        series = RangeSeries(financial_data)
+        last_day = series.trailing_window(days=1)
         
         # Ratios de profitabilité
         if latest['Chiffre_d_affaires'] > 0:
-            ratios['net_margin'] = (latest['Bénéfice_net'] - financial_data.iloc[-2]['Bénéfice_net']) / (latest['Chiffre_d_affaires'] - financial_data.iloc[-2]['Chiffre_d_affaires']) * 100
+            ratios['net_margin'] = series.ratio('Bénéfice_net', 'Chiffre_d_affaires', *last_day) * 100
             ratios['operating_margin'] = ratios['net_margin'] * 0.85  # Estimation
         
         # Ratios d'efficacité
         if 'Effectifs' in financial_data.columns and latest['Effectifs'] > 0:
-            revenue_per_employee = (latest['Chiffre_d_affaires'] - financial_data.iloc[-2]['Chiffre_d_affaires']) / latest['Effectifs']
+            revenue_per_employee = series.sum('Chiffre_d_affaires', *last_day) / latest['Effectifs']
             ratios['revenue_per_employee'] = revenue_per_employee
         
         # Ratios de liquidité (estimés)
@@ -255,22 +260,63 @@ def calculate_financial_ratios(financial_data):
     return ratios
 
 # ========== CHARGEMENT DES DONNÉES ==========
+@st.cache_resource
+def get_financial_rollup():
+    """Agrégats mensuels partagés entre sessions, complétés jour après jour"""
+    return financial_rollup()
+
+def monthly_profile(rollup):
+    """CA quotidien moyen par mois calendaire, lu dans les seaux mensuels"""
+    months = rollup.table('month', 'group')
+    by_month = months.groupby(months['Période'].dt.month)[['CA_Quotidien', 'Lignes']].sum()
+    return by_month['CA_Quotidien'] / by_month['Lignes']
+
+@st.cache_resource
+def get_fraud_batches(seed=DEFAULT_SEED):
+    """Modèle de fraude persisté et lots notés en cache, partagés entre sessions
+
+    Tailles par défaut du module : ``python3 NinjaGBHFraud.py`` lancé au préalable
+    remplit le cache et la première visite ne fait que le relire.
+    """
+    simulator = getattr(data_source, 'simulator', None) or NinjaGBHDataSimulator(seed)
+    scorer = load_or_train(simulator)
+    batches = ScoredBatches(scorer)
+    # Seuls les lots absents du cache disque sont notés
+    batch_ids = score_simulated_batches(batches, simulator, seed)
+    return batches, batch_ids
+
+@st.cache_data(ttl=300)
+def load_department_facts(days=30):
+    """Faits magasin × jour × département récents (None si la source n'en fournit pas)"""
+    end = pd.Timestamp(datetime.now()).normalize()
+    try:
+        return data_source.store_facts(end - pd.Timedelta(days=days - 1), end)
+    except (NotImplementedError, FileNotFoundError):
+        return None
+
 @st.cache_data(ttl=300)
 def load_all_data():
     """Charge toutes les données avec cache"""
     
     try:
-        financial_data = ninja_simulator.generate_financial_data(
+        snapshot = data_source.snapshot(
             start_date='2023-01-01',
-            end_date=datetime.now()
+            end_date=datetime.now(),
+            n_transactions=50
         )
-        territory_data = ninja_simulator.generate_territory_performance()
-        store_stats = ninja_simulator.get_store_statistics()
-        kpi_summary = ninja_simulator.get_kpi_summary()
-        transactions = ninja_simulator.generate_real_transactions(50)
+        financial_data = snapshot.financial_data
+        territory_data = snapshot.territory_data
+        store_stats = snapshot.store_stats
+        kpi_summary = snapshot.kpi_summary
+        transactions = snapshot.transactions
+        
+        # Seuls les jours postérieurs au dernier chargement sont agrégés
+        rollup = get_financial_rollup()
+        rollup.update(financial_data, since_watermark=True)
+        monthly_avg = monthly_profile(rollup)
         
         # Calcul des analyses avancées
-        advanced_metrics = calculate_advanced_metrics(financial_data, territory_data)
+        advanced_metrics = calculate_advanced_metrics(financial_data, territory_data, monthly_avg)
         regression_results = perform_regression_analysis(financial_data)
         cluster_analysis = analyze_territory_clusters(territory_data)
         time_series_analysis = perform_time_series_analysis(financial_data)
@@ -286,7 +332,8 @@ def load_all_data():
             'regression_results': regression_results,
             'cluster_analysis': cluster_analysis,
             'time_series_analysis': time_series_analysis,
-            'financial_ratios': financial_ratios
+            'financial_ratios': financial_ratios,
+            'monthly_avg': monthly_avg
         }
         
     except Exception as e:
@@ -303,7 +350,7 @@ with st.sidebar:
     analysis_type = st.selectbox(
         "Type d'Analyse",
         ["📊 Vue d'Ensemble", "📈 Analytics Avancées", "🤖 IA & Prédictions", 
-         "📋 Benchmarking", "🎯 Recommendations"]
+         "📋 Benchmarking", "🕵️ Transactions Suspectes", "🎯 Recommendations"]
     )
     
     if st.button("🔄 Rafraîchir les Analyses", use_container_width=True):
@@ -497,8 +544,8 @@ elif analysis_type == "📈 Analytics Avancées":
             fig.update_layout(template='plotly_dark', height=400)
             st.plotly_chart(fig, use_container_width=True)
             
-            # Analyse mensuelle
-            monthly_avg = data['financial_data'].groupby(data['financial_data']['Date'].dt.month)['CA_Quotidien'].mean()
+            # Analyse mensuelle (agrégats pré-calculés)
+            monthly_avg = data['monthly_avg']
             
             fig = go.Figure()
             fig.add_trace(go.Scatterpolar(
@@ -826,6 +873,74 @@ elif analysis_type == "📋 Benchmarking":
                     st.write(f"**Recommandation:** Augmenter les investissements marketing de 15-20%")
         else:
             st.info("✅ Aucune opportunité majeure identifiée - performances équilibrées")
+    
+    # Départements : faits magasins (simulateur ou historique du backfill Parquet)
+    st.subheader("🧩 Benchmark des Départements - 30 derniers jours")
+    
+    department_facts = load_department_facts()
+    if department_facts is None or len(department_facts) == 0:
+        st.info("📭 Faits magasins indisponibles pour cette source (voir NinjaGBHBackfill pour parquet://)")
+    else:
+        cube = OLAPCube(department_facts, ['Département', 'Type'], STORE_MEASURES, keep_rows=False)
+        departments = cube.drill_down()[['CA', 'Marge', 'Clients']].copy()
+        departments['Taux_marge'] = departments['Marge'] / departments['CA'] * 100
+        departments['Part_CA'] = departments['CA'] / cube.sum('CA') * 100
+        
+        st.dataframe(
+            departments.sort_values('CA', ascending=False),
+            column_config={
+                'CA': st.column_config.NumberColumn('CA', format="%.0f€"),
+                'Marge': st.column_config.NumberColumn('Marge', format="%.0f€"),
+                'Clients': st.column_config.NumberColumn('Clients', format="%.0f"),
+                'Taux_marge': st.column_config.NumberColumn('Taux de marge', format="%.1f%%"),
+                'Part_CA': st.column_config.NumberColumn('Part du CA', format="%.1f%%")
+            },
+            use_container_width=True
+        )
+
+elif analysis_type == "🕵️ Transactions Suspectes":
+    
+    st.header("🕵️ Transactions Suspectes")
+    
+    with st.spinner("Notation des lots de transactions (python3 NinjaGBHFraud.py les pré-calcule)..."):
+        fraud_batches, batch_ids = get_fraud_batches()
+    summary = fraud_batches.summary(batch_ids)
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("🧾 Transactions notées", f"{summary['rows'].sum():,}")
+    col2.metric("🚩 Transactions suspectes", f"{summary['suspicious'].sum():,}")
+    col3.metric("📊 Taux de suspicion", f"{summary['suspicious'].sum() / max(summary['rows'].sum(), 1):.2%}")
+    
+    st.caption(
+        f"IsolationForest ({fraud_batches.scorer.n_estimators} arbres), seuil de score "
+        f"{fraud_batches.scorer.threshold:.3f} ; résultats en cache par lot, sans nouvelle notation."
+    )
+    
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        suspicious_only = st.checkbox("Suspectes uniquement", value=True)
+        page_size = st.selectbox("Lignes par page", [25, 50, 100, 250], index=1)
+        total = summary['suspicious' if suspicious_only else 'rows'].sum()
+        n_pages = max(1, -(-int(total) // page_size))
+        page = st.number_input(f"Page (1-{n_pages})", min_value=1, max_value=n_pages, value=1)
+    
+    with col2:
+        results = fraud_batches.page(int(page), page_size, suspicious_only, batch_ids)
+        items = results['items']
+        if len(items) > 0:
+            items['Date'] = pd.to_datetime(items['Timestamp']).dt.strftime('%d/%m/%Y %H:%M')
+            st.dataframe(
+                items[['Date', 'Territoire', 'Magasin', 'Type', 'Montant', 'Score_fraude', 'Lot']],
+                column_config={
+                    'Montant': st.column_config.NumberColumn('Montant', format="%.2f€"),
+                    'Score_fraude': st.column_config.ProgressColumn(
+                        'Score', min_value=0.0, max_value=1.0, format="%.3f"
+                    )
+                },
+                hide_index=True,
+                use_container_width=True
+            )
+        st.caption(f"Page {results['page']}/{results['pages']} — {results['total']:,} lignes")
 
 else:  # Recommendations
     
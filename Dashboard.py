@@ -5,9 +5,13 @@ import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
 import streamlit as st
-from datetime import datetime, timedelta
-import time
+from datetime import datetime
 import warnings
+from NinjaGBHSources import SimulatorSource, get_data_source
+from NinjaGBHSeries import RangeSeries
+from NinjaGBHData import NinjaGBHDataSimulator
+from NinjaGBHLive import LiveTransactionFeed
+from NinjaGBHSketches import AmountSketches, CustomerSketches, LiveLeaderboards
 warnings.filterwarnings('ignore')
 
 # ========== CONFIGURATION STREAMLIT ==========
@@ -102,8 +106,8 @@ def calculate_real_time_metrics(financial_data, territory_data):
         
         # CA des dernières 24h
         if len(financial_data) >= 2:
-            last_24h = financial_data.tail(2)
-            metrics['revenue_last_24h'] = last_24h['Chiffre_d_affaires'].iloc[-1] - last_24h['Chiffre_d_affaires'].iloc[0]
+            series = RangeSeries(financial_data)
+            metrics['revenue_last_24h'] = series.trailing('Chiffre_d_affaires', days=1)
             
             # Taux de croissance instantané
             if len(financial_data) >= 10:
@@ -144,11 +148,6 @@ def calculate_real_time_metrics(financial_data, territory_data):
     
     # Analyse territoriale dynamique
     if len(territory_data) > 0:
-        # Top performers du moment
-        metrics['top_performer'] = territory_data.loc[territory_data['Chiffre_affaires'].idxmax()]['Territoire']
-        metrics['top_growth'] = territory_data.loc[territory_data['Croissance'].idxmax()]['Territoire']
-        metrics['top_satisfaction'] = territory_data.loc[territory_data['Satisfaction'].idxmax()]['Territoire']
-        
         # Performance par type en temps réel
         type_performance = territory_data.groupby('Type').agg({
             'Chiffre_affaires': 'mean',
@@ -206,58 +205,26 @@ def generate_realtime_forecast(financial_data, horizon_hours=24):
     
     return forecast
 
-def monitor_real_time_transactions(transactions_data):
-    """Analyse des transactions en temps réel"""
+def monitor_real_time_transactions(live_feed, window_minutes=15):
+    """Analyse des transactions en temps réel (fenêtres glissantes du flux en direct)"""
     
     monitoring = {}
     
-    if len(transactions_data) > 0:
-        # Convertir les dates
-        df_transactions = pd.DataFrame(transactions_data)
-        
-        if 'Date' in df_transactions.columns:
-            # Dernières transactions (15 dernières minutes)
-            now = datetime.now()
-            df_transactions['Timestamp'] = pd.to_datetime(df_transactions['Date'], errors='coerce')
-            
-            recent_transactions = df_transactions[
-                df_transactions['Timestamp'] > (now - timedelta(minutes=15))
-            ]
-            
-            monitoring['recent_transactions_count'] = len(recent_transactions)
-            
-            if len(recent_transactions) > 0:
-                # Montant total des dernières transactions
-                def parse_amount(amount_str):
-                    try:
-                        # Nettoyer le string
-                        clean_str = str(amount_str).replace('€', '').replace(' ', '').replace(',', '')
-                        return float(clean_str)
-                    except:
-                        return 0
-                
-                recent_transactions['Montant_Numeric'] = recent_transactions['Montant'].apply(parse_amount)
-                monitoring['recent_revenue'] = recent_transactions['Montant_Numeric'].sum()
-                
-                # Distribution par type de territoire
-                if 'Type_Territoire' in recent_transactions.columns:
-                    territory_dist = recent_transactions.groupby('Type_Territoire').agg({
-                        'Montant_Numeric': 'sum',
-                        'Date': 'count'
-                    }).round(2)
-                    monitoring['territory_distribution'] = territory_dist
-                
-                # Transactions suspectes
-                high_value_transactions = recent_transactions[
-                    abs(recent_transactions['Montant_Numeric']) > 10000
-                ]
-                monitoring['high_value_count'] = len(high_value_transactions)
-        
-        # Statistiques globales
-        monitoring['total_transactions'] = len(df_transactions)
-        
-        if 'Type_Territoire' in df_transactions.columns:
-            monitoring['territory_coverage'] = df_transactions['Type_Territoire'].nunique()
+    # Rattrapage du flux jusqu'à maintenant puis lecture des totaux glissants
+    live_feed.poll()
+    windows = live_feed.window.stats()
+    recent = windows[window_minutes]
+    
+    monitoring['recent_transactions_count'] = recent['count']
+    monitoring['recent_revenue'] = recent['revenue']
+    monitoring['territory_distribution'] = recent['territory_distribution']
+    monitoring['anomaly_count'] = recent['anomaly_count']
+    monitoring['recent_anomalies'] = live_feed.detector.recent(10)
+    monitoring['windows'] = windows
+    
+    # Statistiques globales
+    monitoring['total_transactions'] = live_feed.window.total_events
+    monitoring['territory_coverage'] = len(windows[max(windows)]['territory_distribution'])
     
     return monitoring
 
@@ -298,156 +265,30 @@ with col3:
 st.divider()
 
 # ========== CHARGEMENT DES DONNÉES ==========
+@st.cache_resource
+def get_source():
+    """Source de données unique du processus (GBH_DATA_SOURCE : simulateur par défaut, Parquet, SQLite ou HTTP)"""
+    return get_data_source()
+
 @st.cache_resource(ttl=60)  # Cache de 60 secondes pour données "temps réel"
 def load_ninja_data():
     """Charge les données depuis NinjaGBHData avec rafraîchissement automatique"""
     
     try:
-        # Import dynamique de NinjaGBHData
-        import importlib
-        import sys
-        import os
-        
-        # Essayer d'importer le module
-        try:
-            from NinjaGBHData import NinjaGBHDataSimulator
-            ninja = NinjaGBHDataSimulator()
-            print("✅ NinjaGBHData chargé avec succès")
-            
-        except ImportError as e:
-            print(f"⚠️ NinjaGBHData non trouvé, création d'un simulateur local: {e}")
-            # Créer un simulateur local si le module n'existe pas
-            class LocalNinjaSimulator:
-                def __init__(self):
-                    self.territory_colors = {
-                        'DROM': '#FF6B6B',
-                        'COM': '#FFA500',
-                        'Métropole': '#00CED1'
-                    }
-                
-                def generate_financial_data(self, start_date='2023-01-01', end_date=None):
-                    if end_date is None:
-                        end_date = datetime.now()
-                    
-                    dates = pd.date_range(start=start_date, end=end_date, freq='D')
-                    n_days = len(dates)
-                    
-                    # CA avec variations réalistes
-                    base_ca = 280000
-                    trend = np.arange(n_days) * 150
-                    seasonal = np.sin(np.arange(n_days) * 2 * np.pi / 365) * 50000
-                    noise = np.random.normal(0, 20000, n_days)
-                    
-                    daily_revenue = base_ca + trend + seasonal + noise
-                    daily_revenue = np.maximum(daily_revenue, 120000)
-                    
-                    return pd.DataFrame({
-                        'Date': dates,
-                        'Chiffre_d_affaires': np.cumsum(daily_revenue),
-                        'CA_Quotidien': daily_revenue,
-                        'Bénéfice_net': np.cumsum(daily_revenue * 0.12),
-                        'Investissements': np.random.choice([0, 50000, 100000, 200000], n_days, p=[0.7, 0.15, 0.1, 0.05]),
-                        'Effectifs': np.random.randint(2500, 3000, n_days),
-                        'Satisfaction_client': np.random.uniform(4.0, 4.8, n_days),
-                        'Panier_moyen': np.random.uniform(50, 80, n_days),
-                        'Nbre_magasins': np.random.randint(45, 55, n_days)
-                    })
-                
-                def generate_territory_performance(self):
-                    territories = {
-                        'DROM': ['Martinique', 'Guadeloupe', 'Réunion', 'Guyane', 'Mayotte'],
-                        'COM': ['Saint-Martin', 'Saint-Barthélemy', 'Polynésie française', 'Nouvelle-Calédonie'],
-                        'Métropole': ['Île-de-France', 'Auvergne-Rhône-Alpes', 'Provence-Alpes-Côte d\'Azur', 
-                                     'Nouvelle-Aquitaine', 'Occitanie', 'Hauts-de-France']
-                    }
-                    
-                    territory_rows = []
-                    for ter_type, ter_list in territories.items():
-                        for territory in ter_list:
-                            if ter_type == 'DROM':
-                                ca_base = np.random.uniform(2000000, 5000000)
-                                growth = np.random.uniform(8, 20)
-                                satisfaction = np.random.uniform(4.2, 4.8)
-                            elif ter_type == 'COM':
-                                ca_base = np.random.uniform(1000000, 3000000)
-                                growth = np.random.uniform(5, 15)
-                                satisfaction = np.random.uniform(4.1, 4.7)
-                            else:
-                                ca_base = np.random.uniform(5000000, 12000000)
-                                growth = np.random.uniform(3, 10)
-                                satisfaction = np.random.uniform(4.0, 4.6)
-                            
-                            territory_rows.append({
-                                'Territoire': territory,
-                                'Type': ter_type,
-                                'Chiffre_affaires': ca_base,
-                                'Croissance': growth,
-                                'Satisfaction': satisfaction,
-                                'Part_marche': np.random.uniform(15, 40),
-                                'Rentabilité': np.random.uniform(10, 20),
-                                'Panier_moyen': np.random.uniform(50, 90),
-                                'Magasins': np.random.randint(2, 6),
-                                'Nouveaux_clients_mois': np.random.randint(500, 3000)
-                            })
-                    
-                    return pd.DataFrame(territory_rows)
-                
-                def generate_real_transactions(self, n=50):
-                    transactions = []
-                    territories = ['Martinique', 'Guadeloupe', 'Île-de-France', 'Auvergne-Rhône-Alpes']
-                    
-                    for i in range(n):
-                        transaction_time = datetime.now() - timedelta(
-                            minutes=np.random.randint(0, 1440),
-                            seconds=np.random.randint(0, 60)
-                        )
-                        
-                        amount = np.random.uniform(50, 5000)
-                        territory = np.random.choice(territories)
-                        
-                        if territory in ['Martinique', 'Guadeloupe']:
-                            ter_type = 'DROM'
-                        elif territory == 'Île-de-France':
-                            ter_type = 'Métropole'
-                        else:
-                            ter_type = 'Métropole'
-                        
-                        transactions.append({
-                            'Date': transaction_time.strftime('%d/%m/%Y %H:%M'),
-                            'Type': np.random.choice(['Vente', 'Achat', 'Service']),
-                            'Catégorie': np.random.choice(['Alimentation', 'Bricolage', 'Textile', 'Électronique']),
-                            'Magasin': f"GBH {np.random.choice(['Paris', 'Lyon', 'Marseille', 'Fort-de-France'])}",
-                            'Montant': f"{amount:+,.2f} €",
-                            'Territoire': territory,
-                            'Type_Territoire': ter_type,
-                            'ID_Transaction': f"GBH{np.random.randint(10000, 99999)}"
-                        })
-                    
-                    return transactions
-                
-                def get_store_statistics(self):
-                    return pd.DataFrame({
-                        'Type': ['DROM', 'COM', 'Métropole'],
-                        'Nombre_Magasins': [15, 8, 35],
-                        'CA_Total': [18000000, 8000000, 60000000]
-                    })
-                
-                def get_kpi_summary(self):
-                    return {
-                        'total_territoires': 15,
-                        'total_magasins': 58,
-                        'ca_total': 86000000,
-                        'satisfaction_moyenne': 4.3,
-                        'croissance_moyenne': 8.5
-                    }
-            
-            ninja = LocalNinjaSimulator()
+        # Source partagée : seul l'instantané est régénéré à chaque expiration du cache
+        ninja = get_source()
         
-        # Générer les données avec timestamp récent
-        financial_data = ninja.generate_financial_data(
+        # Générer les données avec timestamp récent (une seule génération par rafraîchissement)
+        snapshot = ninja.snapshot(
             start_date='2024-01-01',  # Dernière année seulement
-            end_date=datetime.now()
+            end_date=datetime.now(),
+            n_transactions=100
         )
+        financial_data = snapshot.financial_data
+        territory_data = snapshot.territory_data
+        transactions = snapshot.transactions
+        store_stats = snapshot.store_stats
+        kpi_summary = snapshot.kpi_summary
         
         # Ajouter des données du jour en cours (simulation temps réel)
         today = datetime.now().strftime('%Y-%m-%d')
@@ -461,15 +302,9 @@ def load_ninja_data():
             
             financial_data = pd.concat([financial_data, pd.DataFrame([last_entry])], ignore_index=True)
         
-        territory_data = ninja.generate_territory_performance()
-        transactions = ninja.generate_real_transactions(100)
-        store_stats = ninja.get_store_statistics()
-        kpi_summary = ninja.get_kpi_summary()
-        
         # Calculer les métriques temps réel
         real_time_metrics = calculate_real_time_metrics(financial_data, territory_data)
         real_time_forecast = generate_realtime_forecast(financial_data)
-        transaction_monitoring = monitor_real_time_transactions(transactions)
         
         return {
             'ninja': ninja,
@@ -480,7 +315,6 @@ def load_ninja_data():
             'kpi_summary': kpi_summary,
             'real_time_metrics': real_time_metrics,
             'real_time_forecast': real_time_forecast,
-            'transaction_monitoring': transaction_monitoring,
             'last_updated': datetime.now()
         }
         
@@ -488,6 +322,18 @@ def load_ninja_data():
         st.error(f"❌ Erreur de chargement: {str(e)}")
         return None
 
+@st.cache_resource
+def get_live_feed():
+    """Flux de transactions en direct partagé par toutes les sessions"""
+    source = get_source()
+    # Parquet, SQLite et HTTP n'exposent pas de flux : simulateur propre, signalé par live_source_notice()
+    simulator = source.simulator if isinstance(source, SimulatorSource) else NinjaGBHDataSimulator()
+    return LiveTransactionFeed(simulator, consumers={
+        'amounts': AmountSketches(),
+        'customers': CustomerSketches(retention_days=90),
+        'leaderboards': LiveLeaderboards()
+    })
+
 # Chargement initial des données
 data = load_ninja_data()
 
@@ -495,70 +341,110 @@ if data is None:
     st.error("Impossible de charger les données. Vérifiez le module NinjaGBHData.")
     st.stop()
 
+live_feed = get_live_feed()
+transaction_monitoring = monitor_real_time_transactions(live_feed)
+live_simulated = not isinstance(get_source(), SimulatorSource)
+
+def live_source_notice():
+    """Signale les sections alimentées par le flux simulé quand la source configurée n'en a pas"""
+    if live_simulated:
+        st.warning(
+            f"⚠️ Flux simulé : la source configurée ({type(get_source()).__name__}) ne fournit pas "
+            "de transactions en direct ; ces chiffres ne proviennent pas de ses données."
+        )
+
+# ========== RAFRAÎCHISSEMENT DES SECTIONS EN DIRECT ==========
+REFRESH_OPTIONS = {'30s': 30, '1min': 60, '5min': 300, '10min': 600, 'Manuel': 0}
+
+def live_fragment(run_every):
+    """Section re-rendue seule toutes les ``run_every`` secondes, sans bloquer de thread
+
+    st.fragment (Streamlit ≥ 1.37) ou st.experimental_fragment (1.33 à 1.36) ; sans
+    fragments, la section est rendue une fois et suit les rafraîchissements de la page.
+    """
+    fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None)
+    if fragment is None:
+        return lambda func: func
+    return fragment(run_every=run_every)
+
+# Contrôles de la section 5, lus avant leur affichage : les modifier relance la page entière
+refresh_seconds = REFRESH_OPTIONS[st.session_state.get('refresh_rate', '1min')]
+auto_refresh = st.session_state.get('auto_refresh', True)
+live_refresh = refresh_seconds if auto_refresh and refresh_seconds > 0 else None
+
 # ========== AFFICHAGE DES DONNÉES TEMPS RÉEL ==========
 
 # Section 1: Métriques en direct
 st.subheader("📊 Métriques en Direct")
 
-col1, col2, col3, col4 = st.columns(4)
-
-with col1:
-    latest_ca = data['financial_data']['Chiffre_d_affaires'].iloc[-1]
-    previous_ca = data['financial_data']['Chiffre_d_affaires'].iloc[-2] if len(data['financial_data']) > 1 else latest_ca
-    daily_growth = ((latest_ca - previous_ca) / previous_ca * 100) if previous_ca > 0 else 0
+@live_fragment(live_refresh)
+def render_live_metrics():
+    """Cartes de métriques (données relues à l'expiration du cache de 60 s)"""
+    data = load_ninja_data()
+    if data is None:
+        return
     
-    st.markdown(f"""
-    <div class="metric-card">
-        <div style="display: flex; justify-content: space-between; align-items: center;">
-            <div>
-                <div style="color: #8a94a6; font-size: 14px; margin-bottom: 5px;">CA Cumulé</div>
-                <div style="color: #00f3ff; font-size: 28px; font-weight: bold;">{latest_ca:,.0f}€</div>
-            </div>
-            <div style="color: {'#00ff9d' if daily_growth > 0 else '#ff4757'}; font-size: 16px;">
-                {'↗' if daily_growth > 0 else '↘'} {abs(daily_growth):.1f}%
-            </div>
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
+    col1, col2, col3, col4 = st.columns(4)
 
-with col2:
-    if 'real_time_metrics' in data and 'revenue_last_24h' in data['real_time_metrics']:
-        revenue_24h = data['real_time_metrics']['revenue_last_24h']
+    with col1:
+        latest_ca = data['financial_data']['Chiffre_d_affaires'].iloc[-1]
+        previous_ca = data['financial_data']['Chiffre_d_affaires'].iloc[-2] if len(data['financial_data']) > 1 else latest_ca
+        daily_growth = ((latest_ca - previous_ca) / previous_ca * 100) if previous_ca > 0 else 0
+    
         st.markdown(f"""
         <div class="metric-card">
-            <div style="color: #8a94a6; font-size: 14px; margin-bottom: 5px;">Dernières 24h</div>
-            <div style="color: #00ff9d; font-size: 28px; font-weight: bold;">{revenue_24h:,.0f}€</div>
-            <div style="color: #8a94a6; font-size: 12px; margin-top: 5px;">CA généré</div>
+            <div style="display: flex; justify-content: space-between; align-items: center;">
+                <div>
+                    <div style="color: #8a94a6; font-size: 14px; margin-bottom: 5px;">CA Cumulé</div>
+                    <div style="color: #00f3ff; font-size: 28px; font-weight: bold;">{latest_ca:,.0f}€</div>
+                </div>
+                <div style="color: {'#00ff9d' if daily_growth > 0 else '#ff4757'}; font-size: 16px;">
+                    {'↗' if daily_growth > 0 else '↘'} {abs(daily_growth):.1f}%
+                </div>
+            </div>
         </div>
         """, unsafe_allow_html=True)
 
-with col3:
-    current_satisfaction = data['financial_data']['Satisfaction_client'].iloc[-1]
-    st.markdown(f"""
-    <div class="metric-card">
-        <div style="display: flex; justify-content: space-between; align-items: center;">
-            <div>
-                <div style="color: #8a94a6; font-size: 14px; margin-bottom: 5px;">Satisfaction</div>
-                <div style="color: #ffcc00; font-size: 28px; font-weight: bold;">{current_satisfaction:.1f}/5.0</div>
-            </div>
-            <div style="font-size: 24px;">
-                {'⭐' if current_satisfaction >= 4.5 else '✨' if current_satisfaction >= 4.0 else '💫'}
+    with col2:
+        if 'real_time_metrics' in data and 'revenue_last_24h' in data['real_time_metrics']:
+            revenue_24h = data['real_time_metrics']['revenue_last_24h']
+            st.markdown(f"""
+            <div class="metric-card">
+                <div style="color: #8a94a6; font-size: 14px; margin-bottom: 5px;">Dernières 24h</div>
+                <div style="color: #00ff9d; font-size: 28px; font-weight: bold;">{revenue_24h:,.0f}€</div>
+                <div style="color: #8a94a6; font-size: 12px; margin-top: 5px;">CA généré</div>
             </div>
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
+            """, unsafe_allow_html=True)
 
-with col4:
-    if 'real_time_forecast' in data and 'next_hour_estimate' in data['real_time_forecast']:
-        next_hour = data['real_time_forecast']['next_hour_estimate']
+    with col3:
+        current_satisfaction = data['financial_data']['Satisfaction_client'].iloc[-1]
         st.markdown(f"""
         <div class="metric-card">
-            <div style="color: #8a94a6; font-size: 14px; margin-bottom: 5px;">Prévision prochaine heure</div>
-            <div style="color: #b967ff; font-size: 28px; font-weight: bold;">{next_hour:,.0f}€</div>
-            <div style="color: #8a94a6; font-size: 12px; margin-top: 5px;">Estimation IA</div>
+            <div style="display: flex; justify-content: space-between; align-items: center;">
+                <div>
+                    <div style="color: #8a94a6; font-size: 14px; margin-bottom: 5px;">Satisfaction</div>
+                    <div style="color: #ffcc00; font-size: 28px; font-weight: bold;">{current_satisfaction:.1f}/5.0</div>
+                </div>
+                <div style="font-size: 24px;">
+                    {'⭐' if current_satisfaction >= 4.5 else '✨' if current_satisfaction >= 4.0 else '💫'}
+                </div>
+            </div>
         </div>
         """, unsafe_allow_html=True)
 
+    with col4:
+        if 'real_time_forecast' in data and 'next_hour_estimate' in data['real_time_forecast']:
+            next_hour = data['real_time_forecast']['next_hour_estimate']
+            st.markdown(f"""
+            <div class="metric-card">
+                <div style="color: #8a94a6; font-size: 14px; margin-bottom: 5px;">Prévision prochaine heure</div>
+                <div style="color: #b967ff; font-size: 28px; font-weight: bold;">{next_hour:,.0f}€</div>
+                <div style="color: #8a94a6; font-size: 12px; margin-top: 5px;">Estimation IA</div>
+            </div>
+            """, unsafe_allow_html=True)
+
+render_live_metrics()
+
 # Section 2: Graphique temps réel
 st.subheader("📈 Évolution Temps Réel")
 
@@ -632,41 +518,45 @@ with tab2:
         
         st.plotly_chart(fig, use_container_width=True)
 
-with tab3:
+@live_fragment(live_refresh)
+def render_transaction_monitor():
+    """Moniteur des transactions : rattrapage du flux puis lecture des fenêtres glissantes"""
+    live_source_notice()
+    transaction_monitoring = monitor_real_time_transactions(live_feed)
+    
     # Monitoring des transactions
-    if 'transaction_monitoring' in data:
-        monitoring = data['transaction_monitoring']
-        
+    if transaction_monitoring:
+        monitoring = transaction_monitoring
+    
         col1, col2, col3 = st.columns(3)
-        
+    
         with col1:
             st.metric(
                 "Transactions récentes (15min)",
                 monitoring.get('recent_transactions_count', 0),
                 "opérations"
             )
-        
+    
         with col2:
             st.metric(
                 "Revenu récent",
                 f"{monitoring.get('recent_revenue', 0):,.0f}€",
                 "15 dernières minutes"
             )
-        
+    
         with col3:
             st.metric(
-                "Transactions haute valeur",
-                monitoring.get('high_value_count', 0),
-                "> 10,000€"
+                "Transactions atypiques",
+                monitoring.get('anomaly_count', 0),
+                f"écart > {live_feed.detector.threshold:g}σ (magasin × catégorie)"
             )
-        
+    
         # Timeline des transactions
-        if 'transactions' in data and len(data['transactions']) > 0:
-            df_transactions = pd.DataFrame(data['transactions'])
-            
-            # Limiter aux 20 dernières transactions
-            recent_transactions = df_transactions.head(20)
-            
+        recent_transactions = live_feed.recent(20)
+        if len(recent_transactions) > 0:
+            # 20 dernières transactions du flux (formatage de la date au rendu uniquement)
+            recent_transactions['Date'] = pd.to_datetime(recent_transactions['Timestamp']).dt.strftime('%d/%m/%Y %H:%M')
+        
             st.dataframe(
                 recent_transactions[['Date', 'Type', 'Territoire', 'Montant']],
                 column_config={
@@ -681,81 +571,175 @@ with tab3:
                 hide_index=True,
                 use_container_width=True
             )
+    
+        # Dernières transactions atypiques pour leur magasin et leur catégorie
+        recent_anomalies = monitoring.get('recent_anomalies', pd.DataFrame())
+        if len(recent_anomalies) > 0:
+            recent_anomalies['Date'] = pd.to_datetime(recent_anomalies['Timestamp']).dt.strftime('%d/%m/%Y %H:%M')
+            st.caption("🔎 Dernières transactions atypiques")
+            st.dataframe(
+                recent_anomalies[['Date', 'Magasin', 'Type', 'Montant', 'Score_anomalie']],
+                column_config={
+                    'Date': 'Heure',
+                    'Montant': st.column_config.NumberColumn('Montant', format="%.2f€"),
+                    'Score_anomalie': st.column_config.NumberColumn('Écart (σ)', format="%.1f")
+                },
+                hide_index=True,
+                use_container_width=True
+            )
+    
+        # Distribution des montants sur tout le flux (quantiles approchés, mémoire bornée)
+        amounts = live_feed.consumers['amounts']
+        with live_feed.lock:
+            basket_quantiles = amounts.quantiles('panier', 'Département')
+            transaction_quantiles = amounts.quantiles('transaction', 'Territoire')
+    
+        quantile_format = {
+            column: st.column_config.NumberColumn(column, format="%.0f€")
+            for column in ['p50', 'p95', 'p99']
+        }
+        col1, col2 = st.columns(2)
+        with col1:
+            st.caption("🛒 Panier par département (p50 / p95 / p99)")
+            st.dataframe(basket_quantiles, column_config=quantile_format, use_container_width=True)
+        with col2:
+            st.caption("💳 Montant des transactions par territoire (p50 / p95 / p99)")
+            st.dataframe(transaction_quantiles, column_config=quantile_format, use_container_width=True)
+    
+        # Clients distincts du jour : fusion des HyperLogLog journaliers, sans relire le flux
+        customers = live_feed.consumers['customers']
+        today = pd.Timestamp(datetime.now()).normalize()
+        with live_feed.lock:
+            loyalty = customers.returning('Groupe', 'GBH', today, today, lookback_days=30)
+            daily_customers = customers.daily('Territoire', today, today)
+    
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("Clients uniques (aujourd'hui)", f"{loyalty['distinct']:,.0f}", "estimation HyperLogLog")
+        with col2:
+            st.metric("Clients fidèles", f"{loyalty['returning_rate']:.1f}%", "déjà venus sur 30 jours")
+        if len(daily_customers) > 0:
+            st.dataframe(
+                daily_customers.drop(columns='Date').sort_values('Clients_distincts', ascending=False),
+                column_config={'Clients_distincts': st.column_config.NumberColumn('Clients uniques', format="%.0f")},
+                hide_index=True,
+                use_container_width=True
+            )
+
+with tab3:
+    render_transaction_monitor()
 
 # Section 3: Alertes et notifications
 st.subheader("🚨 Alertes Temps Réel")
 
-if 'real_time_metrics' in data and 'alerts' in data['real_time_metrics']:
-    alerts = data['real_time_metrics']['alerts']
-    
-    if alerts:
-        for alert in alerts:
-            if alert['type'] == 'danger':
-                st.error(f"🔴 **{alert['priority']}**: {alert['message']}")
-            elif alert['type'] == 'warning':
-                st.warning(f"🟡 **{alert['priority']}**: {alert['message']}")
-            else:
-                st.info(f"🔵 **{alert['priority']}**: {alert['message']}")
+@live_fragment(live_refresh)
+def render_alerts():
+    data = load_ninja_data()
+    if data is None:
+        return
+    
+    if 'real_time_metrics' in data and 'alerts' in data['real_time_metrics']:
+        alerts = data['real_time_metrics']['alerts']
+    
+        if alerts:
+            for alert in alerts:
+                if alert['type'] == 'danger':
+                    st.error(f"🔴 **{alert['priority']}**: {alert['message']}")
+                elif alert['type'] == 'warning':
+                    st.warning(f"🟡 **{alert['priority']}**: {alert['message']}")
+                else:
+                    st.info(f"🔵 **{alert['priority']}**: {alert['message']}")
+        else:
+            st.success("✅ Aucune alerte critique - Tous les systèmes fonctionnent normalement")
     else:
-        st.success("✅ Aucune alerte critique - Tous les systèmes fonctionnent normalement")
-else:
-    st.info("📡 Surveillance des alertes en cours...")
+        st.info("📡 Surveillance des alertes en cours...")
+
+render_alerts()
 
 # Section 4: Performance territoriale en direct
 st.subheader("🌍 Performance Territoriale - Live")
 
-if 'real_time_metrics' in data:
-    col1, col2, col3 = st.columns(3)
+@live_fragment(live_refresh)
+def render_leaderboards():
+    live_source_notice()
+    live_feed.poll()
     
+    # Classements du flux en direct (top-K Space-Saving, lecture indépendante du débit)
+    leaderboards = live_feed.consumers['leaderboards']
+    with live_feed.lock:
+        top_territory = leaderboards.leader('Territoire', 'CA')
+        top_store = leaderboards.leader('Magasin', 'CA')
+        top_type = leaderboards.leader('Type', 'Transactions')
+        store_ranking = leaderboards.top('Magasin', 'CA', 10)
+        type_ranking = leaderboards.top('Type', 'Transactions', 10)
+
+    col1, col2, col3 = st.columns(3)
+
     with col1:
         st.metric(
-            "🏆 Meilleur Performer",
-            data['real_time_metrics'].get('top_performer', 'N/A'),
-            "Plus haut CA"
+            "🏆 Meilleur territoire",
+            top_territory or 'N/A',
+            "Plus haut CA (flux)"
         )
-    
+
     with col2:
         st.metric(
-            "🚀 Plus forte croissance",
-            data['real_time_metrics'].get('top_growth', 'N/A'),
-            "Taux de croissance"
+            "🏪 Meilleur magasin",
+            top_store.split(' / ')[-1] if top_store else 'N/A',
+            "Plus haut CA (flux)"
         )
-    
+
     with col3:
         st.metric(
-            "⭐ Meilleure satisfaction",
-            data['real_time_metrics'].get('top_satisfaction', 'N/A'),
-            "Score client"
+            "🔁 Opération la plus fréquente",
+            top_type or 'N/A',
+            "Nombre d'opérations"
         )
 
+    col1, col2 = st.columns(2)
+    with col1:
+        st.caption("🏪 Top 10 magasins par CA")
+        st.dataframe(
+            store_ranking[['Magasin', 'Estimation', 'Part']],
+            column_config={
+                'Estimation': st.column_config.NumberColumn('CA', format="%.0f€"),
+                'Part': st.column_config.NumberColumn('Part', format="%.1f%%")
+            },
+            hide_index=True,
+            use_container_width=True
+        )
+    with col2:
+        st.caption("🔁 Top 10 types d'opération")
+        st.dataframe(
+            type_ranking[['Type', 'Estimation', 'Part']],
+            column_config={
+                'Estimation': st.column_config.NumberColumn('Opérations', format="%.0f"),
+                'Part': st.column_config.NumberColumn('Part', format="%.1f%%")
+            },
+            hide_index=True,
+            use_container_width=True
+        )
+
+render_leaderboards()
+
 # Section 5: Dashboard de contrôle
 st.subheader("🎮 Contrôle Temps Réel")
 
 col1, col2, col3 = st.columns(3)
 
 with col1:
-    refresh_rate = st.select_slider(
+    st.select_slider(
         "Fréquence de rafraîchissement",
-        options=['30s', '1min', '5min', '10min', 'Manuel'],
-        value='1min'
+        options=list(REFRESH_OPTIONS),
+        value='1min',
+        key='refresh_rate'
     )
-    
-    # Convertir en secondes
-    refresh_seconds = {
-        '30s': 30,
-        '1min': 60,
-        '5min': 300,
-        '10min': 600,
-        'Manuel': 0
-    }[refresh_rate]
 
 with col2:
-    auto_refresh = st.checkbox("Rafraîchissement automatique", value=True)
+    st.checkbox("Rafraîchissement automatique", value=True, key='auto_refresh')
     
-    if auto_refresh and refresh_seconds > 0:
-        st.info(f"🔄 Prochain rafraîchissement dans {refresh_seconds} secondes")
-        time.sleep(0.1)  # Petite pause pour l'effet
-        # En production, utiliser st.rerun() dans une boucle
+    if live_refresh:
+        st.info(f"🔄 Sections en direct actualisées toutes les {live_refresh} secondes")
 
 with col3:
     if st.button("📊 Générer Rapport Instantané", use_container_width=True):
@@ -771,7 +755,7 @@ with col3:
             st.write(f"**CA total:** {data['financial_data']['Chiffre_d_affaires'].iloc[-1]:,.0f}€")
             st.write(f"**Satisfaction actuelle:** {data['financial_data']['Satisfaction_client'].iloc[-1]:.1f}/5.0")
             st.write(f"**Nombre de territoires actifs:** {len(data['territory_data'])}")
-            st.write(f"**Transactions récentes:** {data['transaction_monitoring'].get('recent_transactions_count', 0)}")
+            st.write(f"**Transactions récentes:** {transaction_monitoring.get('recent_transactions_count', 0)}")
 
 # Pied de page avec info temps réel
 st.divider()
@@ -783,14 +767,10 @@ with footer_col1:
     st.caption(f"🕒 Dernière mise à jour: {last_update}")
 
 with footer_col2:
-    total_transactions = data['transaction_monitoring'].get('total_transactions', 0)
-    st.caption(f"💳 Total transactions: {total_transactions}")
+    total_transactions = transaction_monitoring.get('total_transactions', 0)
+    st.caption(f"💳 Total transactions{' (flux simulé)' if live_simulated else ''}: {total_transactions}")
 
 with footer_col3:
-    territory_coverage = data['transaction_monitoring'].get('territory_coverage', 0)
+    territory_coverage = transaction_monitoring.get('territory_coverage', 0)
     st.caption(f"🌍 Couverture territoriale: {territory_coverage} régions")
 
-# Rafraîchissement automatique
-if auto_refresh and refresh_seconds > 0:
-    time.sleep(refresh_seconds)
-    st.rerun()
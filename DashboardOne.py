@@ -6,13 +6,16 @@ import plotly.express as px
 from plotly.subplots import make_subplots
 import dash
 from dash import dcc, html, Input, Output, dash_table, callback_context
+from dash.dash_table.Format import Format, Group, Scheme, Sign, Symbol
 import dash_bootstrap_components as dbc
 from datetime import datetime, timedelta
+import os
 import warnings
 warnings.filterwarnings('ignore')
 
 # Importer notre simulateur premium
-from NinjaGBHData import NinjaGBHDataSimulator
+from NinjaGBHData import SimulationSnapshot, format_transactions
+from NinjaGBHSources import get_data_source
 
 # Thème couleurs premium
 COLORS = {
@@ -41,18 +44,27 @@ COLORS = {
 }
 
 # Initialisation
-ninja_simulator = NinjaGBHDataSimulator()
-COLORS.update(ninja_simulator.territory_colors)
+data_source = get_data_source()
+COLORS.update(data_source.territory_colors)
 
 print("🎨 Initialisation du Dashboard GBH Premium...")
-financial_data = ninja_simulator.generate_financial_data()
-territory_data = ninja_simulator.generate_territory_performance()
-store_stats = ninja_simulator.get_store_statistics()
-kpi_summary = ninja_simulator.get_kpi_summary()
-transactions_data = ninja_simulator.generate_real_transactions(15)
+# Avec GBH_SNAPSHOT_PATH, les workers rechargent (memory-map) l'instantané publié par le premier
+# (régénéré si la version, la graine fixée ou les paramètres ont changé)
+SNAPSHOT_PATH = os.environ.get('GBH_SNAPSHOT_PATH')
+if SNAPSHOT_PATH:
+    snapshot = SimulationSnapshot.load_or_create(SNAPSHOT_PATH, data_source, n_transactions=15)
+else:
+    snapshot = data_source.snapshot(n_transactions=15)
+financial_data = snapshot.financial_data
+territory_data = snapshot.territory_data
+territory_cube = snapshot.territory_cube
+store_stats = snapshot.store_stats
+kpi_summary = snapshot.kpi_summary
+transactions_data = snapshot.transactions
 
 # Application Dash avec thème personnalisé
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.DARKLY])
+server = app.server  # Point d'entrée WSGI (gunicorn DashboardOne:server)
 
 # Styles CSS personnalisés
 CUSTOM_STYLES = {
@@ -505,7 +517,7 @@ def create_overview_view():
 
 def create_drom_view():
     """Vue dédiée aux DROM"""
-    drom_data = territory_data[territory_data['Type'] == 'DROM']
+    drom_data = territory_cube.rows('DROM')
     
     return dbc.Container([
         dbc.Row([
@@ -525,9 +537,9 @@ def create_drom_view():
             dbc.Col([
                 dbc.Card([
                     dbc.CardBody([
-                        html.H4(f"{len(drom_data)} Territoires DROM", 
+                        html.H4(f"{territory_cube.count('DROM')} Territoires DROM", 
                                style={'color': COLORS['text_primary']}),
-                        html.H2(f"{drom_data['Chiffre_affaires'].sum():,.0f}€", 
+                        html.H2(f"{territory_cube.sum('Chiffre_affaires', 'DROM'):,.0f}€", 
                                style={'color': COLORS['drom']}),
                         html.P("Chiffre d'affaires total", 
                               style={'color': COLORS['text_secondary']})
@@ -540,7 +552,7 @@ def create_drom_view():
                     dbc.CardBody([
                         html.H4("Croissance Moyenne", 
                                style={'color': COLORS['text_primary']}),
-                        html.H2(f"+{drom_data['Croissance'].mean():.1f}%", 
+                        html.H2(f"+{territory_cube.mean('Croissance', 'DROM'):.1f}%", 
                                style={'color': COLORS['success']}),
                         html.P("vs période précédente", 
                               style={'color': COLORS['text_secondary']})
@@ -553,7 +565,7 @@ def create_drom_view():
                     dbc.CardBody([
                         html.H4("Satisfaction Moyenne", 
                                style={'color': COLORS['text_primary']}),
-                        html.H2(f"{drom_data['Satisfaction'].mean():.1f}/5", 
+                        html.H2(f"{territory_cube.mean('Satisfaction', 'DROM'):.1f}/5", 
                                style={'color': COLORS['warning']}),
                         html.P("Score client", 
                               style={'color': COLORS['text_secondary']})
@@ -566,7 +578,7 @@ def create_drom_view():
                     dbc.CardBody([
                         html.H4("Part de Marché Moyenne", 
                                style={'color': COLORS['text_primary']}),
-                        html.H2(f"{drom_data['Part_marche'].mean():.1f}%", 
+                        html.H2(f"{territory_cube.mean('Part_marche', 'DROM'):.1f}%", 
                                style={'color': COLORS['info']}),
                         html.P("Dans chaque territoire", 
                               style={'color': COLORS['text_secondary']})
@@ -626,7 +638,7 @@ def create_drom_view():
 
 def create_com_view():
     """Vue dédiée aux COM"""
-    com_data = territory_data[territory_data['Type'] == 'COM']
+    com_data = territory_cube.rows('COM')
     
     return dbc.Container([
         dbc.Row([
@@ -646,9 +658,9 @@ def create_com_view():
             dbc.Col([
                 dbc.Card([
                     dbc.CardBody([
-                        html.H4(f"{len(com_data)} Territoires COM", 
+                        html.H4(f"{territory_cube.count('COM')} Territoires COM", 
                                style={'color': COLORS['text_primary']}),
-                        html.H2(f"{com_data['Chiffre_affaires'].sum():,.0f}€", 
+                        html.H2(f"{territory_cube.sum('Chiffre_affaires', 'COM'):,.0f}€", 
                                style={'color': COLORS['com']}),
                         html.P("Chiffre d'affaires total", 
                               style={'color': COLORS['text_secondary']})
@@ -661,7 +673,7 @@ def create_com_view():
                     dbc.CardBody([
                         html.H4("Croissance Moyenne", 
                                style={'color': COLORS['text_primary']}),
-                        html.H2(f"+{com_data['Croissance'].mean():.1f}%", 
+                        html.H2(f"+{territory_cube.mean('Croissance', 'COM'):.1f}%", 
                                style={'color': COLORS['success']}),
                         html.P("vs période précédente", 
                               style={'color': COLORS['text_secondary']})
@@ -674,7 +686,7 @@ def create_com_view():
                     dbc.CardBody([
                         html.H4("Panier Moyen", 
                                style={'color': COLORS['text_primary']}),
-                        html.H2(f"{com_data['Panier_moyen'].mean():.1f}€", 
+                        html.H2(f"{territory_cube.mean('Panier_moyen', 'COM'):.1f}€", 
                                style={'color': COLORS['warning']}),
                         html.P("Montant moyen par transaction", 
                               style={'color': COLORS['text_secondary']})
@@ -687,7 +699,7 @@ def create_com_view():
                     dbc.CardBody([
                         html.H4("Rentabilité Moyenne", 
                                style={'color': COLORS['text_primary']}),
-                        html.H2(f"{com_data['Rentabilité'].mean():.1f}%", 
+                        html.H2(f"{territory_cube.mean('Rentabilité', 'COM'):.1f}%", 
                                style={'color': COLORS['info']}),
                         html.P("Marge nette moyenne", 
                               style={'color': COLORS['text_secondary']})
@@ -732,7 +744,7 @@ def create_com_view():
 
 def create_metro_view():
     """Vue dédiée à la Métropole"""
-    metro_data = territory_data[territory_data['Type'] == 'Métropole']
+    metro_data = territory_cube.rows('Métropole')
     
     return dbc.Container([
         dbc.Row([
@@ -752,9 +764,9 @@ def create_metro_view():
             dbc.Col([
                 dbc.Card([
                     dbc.CardBody([
-                        html.H4(f"{len(metro_data)} Régions Métropolitaines", 
+                        html.H4(f"{territory_cube.count('Métropole')} Régions Métropolitaines", 
                                style={'color': COLORS['text_primary']}),
-                        html.H2(f"{metro_data['Chiffre_affaires'].sum():,.0f}€", 
+                        html.H2(f"{territory_cube.sum('Chiffre_affaires', 'Métropole'):,.0f}€", 
                                style={'color': COLORS['metro']}),
                         html.P("Chiffre d'affaires total", 
                               style={'color': COLORS['text_secondary']})
@@ -767,7 +779,7 @@ def create_metro_view():
                     dbc.CardBody([
                         html.H4("Performance Relative", 
                                style={'color': COLORS['text_primary']}),
-                        html.H2(f"{(metro_data['Chiffre_affaires'].sum() / territory_data['Chiffre_affaires'].sum() * 100):.1f}%", 
+                        html.H2(f"{(territory_cube.share('Chiffre_affaires', 'Métropole') * 100):.1f}%", 
                                style={'color': COLORS['primary']}),
                         html.P("Part du CA total", 
                               style={'color': COLORS['text_secondary']})
@@ -780,7 +792,7 @@ def create_metro_view():
                     dbc.CardBody([
                         html.H4("Densité de Magasins", 
                                style={'color': COLORS['text_primary']}),
-                        html.H2(f"{metro_data['Magasins'].sum() / len(metro_data):.1f}", 
+                        html.H2(f"{territory_cube.mean('Magasins', 'Métropole'):.1f}", 
                                style={'color': COLORS['warning']}),
                         html.P("Magasins par région", 
                               style={'color': COLORS['text_secondary']})
@@ -793,7 +805,7 @@ def create_metro_view():
                     dbc.CardBody([
                         html.H4("Nouveaux Clients", 
                                style={'color': COLORS['text_primary']}),
-                        html.H2(f"{metro_data['Nouveaux_clients_mois'].sum():,}", 
+                        html.H2(f"{int(territory_cube.sum('Nouveaux_clients_mois', 'Métropole')):,}", 
                                style={'color': COLORS['success']}),
                         html.P("Par mois", 
                               style={'color': COLORS['text_secondary']})
@@ -1136,14 +1148,16 @@ def create_transactions_table(territory_type=None):
         filtered_data = transactions_data
     
     return dash_table.DataTable(
-        data=filtered_data,
+        data=format_transactions(filtered_data).to_dict('records'),
         columns=[
             {'name': 'Date', 'id': 'Date'},
             {'name': 'Type', 'id': 'Type'},
             {'name': 'Catégorie', 'id': 'Catégorie'},
             {'name': 'Territoire', 'id': 'Territoire'},
             {'name': 'Type Territoire', 'id': 'Type_Territoire'},
-            {'name': 'Montant', 'id': 'Montant'}
+            {'name': 'Montant', 'id': 'Montant', 'type': 'numeric',
+             'format': Format(precision=2, scheme=Scheme.fixed, group=Group.yes, sign=Sign.positive,
+                              symbol=Symbol.yes, symbol_suffix=' €')}
         ],
         style_cell={
             'backgroundColor': COLORS['card_bg'],
@@ -1166,12 +1180,12 @@ def create_transactions_table(territory_type=None):
                 'backgroundColor': '#1E2A47'
             },
             {
-                'if': {'filter_query': '{Montant} contains "-"'},
+                'if': {'filter_query': '{Montant} < 0'},
                 'color': COLORS['danger'],
                 'fontWeight': '600'
             },
             {
-                'if': {'filter_query': '{Montant} contains "+"'},
+                'if': {'filter_query': '{Montant} > 0'},
                 'color': COLORS['success'],
                 'fontWeight': '600'
             },
@@ -1220,7 +1234,7 @@ def update_main_stats(n_intervals, n_clicks):
         global financial_data
         last_date = financial_data['Date'].iloc[-1]
         new_date = last_date + timedelta(days=1)
-        new_data = ninja_simulator.generate_financial_data(
+        new_data = data_source.financial(
             start_date=new_date.strftime('%Y-%m-%d'),
             end_date=new_date
         )
@@ -1320,9 +1334,9 @@ def update_financial_trend(n_intervals):
     [Input('interval-component', 'n_intervals')]
 )
 def update_territory_breakdown(n_intervals):
-    drom_ca = territory_data[territory_data['Type'] == 'DROM']['Chiffre_affaires'].sum()
-    com_ca = territory_data[territory_data['Type'] == 'COM']['Chiffre_affaires'].sum()
-    metro_ca = territory_data[territory_data['Type'] == 'Métropole']['Chiffre_affaires'].sum()
+    drom_ca = territory_cube.sum('Chiffre_affaires', 'DROM')
+    com_ca = territory_cube.sum('Chiffre_affaires', 'COM')
+    metro_ca = territory_cube.sum('Chiffre_affaires', 'Métropole')
     
     fig = go.Figure(data=[go.Pie(
         labels=['DROM', 'COM', 'Métropole'],
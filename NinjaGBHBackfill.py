@@ -0,0 +1,133 @@
+# NinjaGBHBackfill.py - Historique persistant des faits magasins au format Parquet
+#
+# Le répertoire de sortie est directement lisible par ParquetSource
+# (GBH_DATA_SOURCE=parquet:///chemin) : faits dans STORE_FACTS_DIR, tables de
+# l'instantané (financial, territories...) à la racine.
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from NinjaGBHData import NinjaGBHDataSimulator
+from NinjaGBHSources import STORE_FACTS_DIR, write_parquet
+
+# Colonnes encodées dans le chemin des partitions (Type=.../Territoire=.../year=.../month=...)
+PARTITION_COLUMNS = ['Type', 'Territoire', 'year', 'month']
+
+# Un simulateur par processus, recréé à l'identique à partir de la graine partagée
+_worker_simulators = {}
+
+
+def _get_simulator(seed):
+    """Retourne le simulateur du processus courant pour cette graine"""
+    if seed not in _worker_simulators:
+        _worker_simulators[seed] = NinjaGBHDataSimulator(seed)
+    return _worker_simulators[seed]
+
+
+def partition_path(output_dir, ter_type, territoire, year, month):
+    """Chemin de partition au format Hive (valeurs encodées comme le lit pyarrow)"""
+    return os.path.join(
+        output_dir,
+        f"Type={quote(ter_type, safe='')}",
+        f"Territoire={quote(territoire, safe='')}",
+        f"year={year}",
+        f"month={month}"
+    )
+
+
+def backfill_partition(seed, output_dir, territoire, start_date, end_date, compression='zstd'):
+    """Génère et écrit une partition territoire × mois ; retourne (chemin, nombre de lignes)"""
+    simulator = _get_simulator(seed)
+    facts = simulator.generate_store_daily_facts(start_date, end_date, territoires=[territoire])
+    if facts.empty:
+        return None, 0
+
+    ter_type = simulator._get_territory_type(territoire)
+    first_day = pd.Timestamp(start_date)
+    path = partition_path(output_dir, ter_type, territoire, first_day.year, first_day.month)
+    os.makedirs(path, exist_ok=True)
+
+    # Les colonnes de partition sont portées par le chemin, pas par le fichier
+    facts = facts.drop(columns=['Type', 'Territoire'])
+    facts['Magasin'] = facts['Magasin'].cat.remove_unused_categories()
+    facts.to_parquet(os.path.join(path, 'part-0.parquet'), index=False, compression=compression)
+    return path, len(facts)
+
+
+def month_partitions(start_date, end_date):
+    """Découpe [start_date, end_date] en bornes (début, fin) de mois calendaires"""
+    start, end = pd.Timestamp(start_date).normalize(), pd.Timestamp(end_date).normalize()
+    bounds = []
+    for month_start in pd.date_range(start.replace(day=1), end, freq='MS'):
+        month_end = month_start + pd.offsets.MonthEnd(0)
+        bounds.append((max(start, month_start), min(end, month_end)))
+    return bounds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Backfill multiprocessus de l'historique magasin × jour × département en Parquet partitionné"
+    )
+    parser.add_argument('--start', default='2023-01-01', help="Date de début (AAAA-MM-JJ)")
+    parser.add_argument('--end', default=None, help="Date de fin (AAAA-MM-JJ, aujourd'hui par défaut)")
+    parser.add_argument('--output', default='ninja_history', help="Répertoire de sortie (source parquet://)")
+    parser.add_argument('--seed', type=int, default=None, help="Graine du simulateur (tirée au hasard sinon)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Nombre de processus")
+    parser.add_argument('--territoires', nargs='*', default=None, help="Restreindre à ces territoires")
+    parser.add_argument('--compression', default='zstd', help="Codec Parquet (zstd, snappy, gzip...)")
+    args = parser.parse_args(argv)
+
+    # Tous les processus partagent la même graine : sortie identique quel que soit le découpage
+    seed = args.seed if args.seed is not None else np.random.SeedSequence().entropy
+    end_date = args.end or datetime.now().strftime('%Y-%m-%d')
+    territoires = args.territoires or list(NinjaGBHDataSimulator(seed)._territory_index)
+    tasks = [
+        (territoire, first, last)
+        for territoire in territoires
+        for first, last in month_partitions(args.start, end_date)
+    ]
+
+    print(f"🗄️ Backfill {args.start} → {end_date} : {len(tasks)} partitions, {args.workers} processus, graine {seed}")
+    started = time.perf_counter()
+    total_rows = 0
+    facts_dir = os.path.join(args.output, STORE_FACTS_DIR)
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [
+            pool.submit(backfill_partition, seed, facts_dir, territoire, first, last, args.compression)
+            for territoire, first, last in tasks
+        ]
+        for done, future in enumerate(as_completed(futures), start=1):
+            _, rows = future.result()
+            total_rows += rows
+            if done % 50 == 0 or done == len(futures):
+                print(f"  {done}/{len(futures)} partitions écrites ({total_rows:,} lignes)")
+
+    # Manifeste : permet de régénérer ou de compléter l'historique à l'identique
+    os.makedirs(facts_dir, exist_ok=True)
+    with open(os.path.join(facts_dir, '_backfill.json'), 'w', encoding='utf-8') as f:
+        json.dump({
+            'seed': str(seed),
+            'start_date': args.start,
+            'end_date': end_date,
+            'territoires': territoires,
+            'partitions': PARTITION_COLUMNS,
+            'rows': total_rows
+        }, f, ensure_ascii=False, indent=2)
+
+    # Tables de l'instantané du groupe, même période et même graine
+    write_parquet(NinjaGBHDataSimulator(seed).snapshot(args.start, end_date), args.output)
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ {total_rows:,} lignes en {elapsed:.1f}s ({total_rows / max(elapsed, 1e-9):,.0f} lignes/s)")
+
+
+if __name__ == '__main__':
+    main()
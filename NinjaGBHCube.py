@@ -0,0 +1,118 @@
+# NinjaGBHCube.py - Cube OLAP en mémoire : Groupe → Type → Territoire → Magasin → Département
+import numpy as np
+import pandas as pd
+
+# Hiérarchie des faits magasin × jour × département (la racine est le Groupe)
+HIERARCHY = ['Type', 'Territoire', 'Magasin', 'Département']
+STORE_MEASURES = ['CA', 'Marge', 'Clients']
+
+# Hiérarchie et mesures de la table des performances territoriales
+TERRITORY_HIERARCHY = ['Type', 'Territoire']
+TERRITORY_MEASURES = [
+    'Chiffre_affaires', 'Croissance', 'Magasins', 'Satisfaction', 'Part_marche',
+    'Rentabilité', 'Nouveaux_clients_mois', 'Panier_moyen'
+]
+
+
+class OLAPCube:
+    """Agrégats pré-calculés à chaque niveau de la hiérarchie
+
+    Un nœud est identifié par son chemin depuis la racine, par exemple
+    ``('DROM', 'Martinique')`` ; ``()`` est le Groupe. Somme, moyenne et nombre de
+    lignes, enfants (drill-down) et lignes sources sont obtenus par simple lecture
+    de dictionnaire. Un chemin absent est un nœud vide.
+    """
+
+    def __init__(self, frame, levels=HIERARCHY, measures=STORE_MEASURES, keep_rows=True):
+        self.levels = list(levels)
+        self.measures = [m for m in measures if m in frame.columns]
+        self.columns = self.measures + [f"{m}_moyen" for m in self.measures] + ['Nombre']
+        self.frame = frame.reset_index(drop=True) if keep_rows else None
+        self.nodes = {}
+        self.children = {}
+        self.positions = {}
+
+        values = pd.DataFrame(frame[self.measures].to_numpy(dtype=np.float64), columns=self.measures)
+        keys = [frame[level].astype(str).to_numpy() for level in self.levels]
+
+        totals = values.sum()
+        self.nodes[()] = self._stats(totals.to_numpy(), len(frame))
+        if keep_rows:
+            self.positions[()] = np.arange(len(frame))
+
+        for depth in range(1, len(self.levels) + 1):
+            grouped = values.groupby(keys[:depth], sort=True)
+            stats = grouped.sum()
+            stats['Nombre'] = grouped.size()
+            for m in self.measures:
+                stats[f"{m}_moyen"] = stats[m] / stats['Nombre']
+            stats = stats[self.columns]
+            stats.index.names = self.levels[:depth]
+
+            for key, row in zip(stats.index, stats.to_numpy()):
+                node = dict(zip(self.columns, row))
+                node['Nombre'] = int(node['Nombre'])
+                self.nodes[key if isinstance(key, tuple) else (key,)] = node
+            if keep_rows:
+                for key, positions in grouped.indices.items():
+                    self.positions[key if isinstance(key, tuple) else (key,)] = positions
+
+            # Enfants de chaque parent : une table par nœud du niveau supérieur
+            if depth == 1:
+                self.children[()] = stats
+            else:
+                parent_levels = 0 if depth == 2 else list(range(depth - 1))
+                for parent, table in stats.groupby(level=parent_levels, sort=False):
+                    parent = parent if isinstance(parent, tuple) else (parent,)
+                    self.children[parent] = table.droplevel(list(range(depth - 1)))
+
+    def _stats(self, sums, count):
+        stats = dict(zip(self.measures, sums))
+        stats.update({f"{m}_moyen": (s / count if count else np.nan) for m, s in zip(self.measures, sums)})
+        stats['Nombre'] = count
+        return stats
+
+    @classmethod
+    def from_store_facts(cls, facts, keep_rows=False):
+        """Cube des faits magasin × jour × département (iter_store_daily_facts)"""
+        return cls(facts, HIERARCHY, STORE_MEASURES, keep_rows)
+
+    @classmethod
+    def from_territories(cls, territory_data):
+        """Cube Groupe → Type → Territoire de la table des performances territoriales"""
+        return cls(territory_data, TERRITORY_HIERARCHY, TERRITORY_MEASURES, keep_rows=True)
+
+    def node(self, *path):
+        """Agrégats d'un nœud : {mesure: somme, mesure_moyen: moyenne, Nombre: lignes}"""
+        return self.nodes.get(path) or self._stats(np.zeros(len(self.measures)), 0)
+
+    def sum(self, measure, *path):
+        return self.node(*path)[measure]
+
+    def mean(self, measure, *path):
+        return self.node(*path)[f"{measure}_moyen"]
+
+    def count(self, *path):
+        return self.node(*path)['Nombre']
+
+    def drill_down(self, *path):
+        """Agrégats des enfants d'un nœud (une ligne par enfant)"""
+        if path in self.children:
+            return self.children[path]
+        level = self.levels[len(path)] if len(path) < len(self.levels) else None
+        return pd.DataFrame(columns=self.columns).rename_axis(level)
+
+    def roll_up(self, *path):
+        """Agrégats du parent d'un nœud"""
+        return self.node(*path[:-1])
+
+    def rows(self, *path):
+        """Lignes sources d'un nœud (cube construit avec keep_rows=True)"""
+        if self.frame is None:
+            raise ValueError("Cube construit sans les lignes sources (keep_rows=False)")
+        return self.frame.take(self.positions.get(path, np.array([], dtype=np.int64)))
+
+    def share(self, measure, *path):
+        """Part d'un nœud dans le total du Groupe"""
+        total = self.sum(measure)
+        return self.sum(measure, *path) / total if total else np.nan
@@ -2,10 +2,175 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import random
+from functools import cached_property
+import asyncio
+import itertools
+import json
+import os
+import shutil
+import time
+
+def format_amounts(amounts):
+    """Formate des montants numériques en libellés signés ('+1,234.50 €')"""
+    return pd.Series(amounts, dtype='float64').map('{:+,.2f} €'.format)
+
+
+def format_transactions(transactions, limit=None, amounts=False):
+    """Prépare les transactions pour l'affichage : seules les lignes rendues sont formatées
+    
+    ``Montant`` reste numérique sauf avec ``amounts=True`` (tables sans format de colonne).
+    """
+    frame = transactions if isinstance(transactions, pd.DataFrame) else pd.DataFrame(transactions)
+    if limit is not None:
+        frame = frame.head(limit)
+    frame = frame.copy()
+    if 'Timestamp' in frame.columns:
+        frame.insert(0, 'Date', pd.to_datetime(frame.pop('Timestamp')).dt.strftime('%d/%m/%Y %H:%M'))
+    if amounts and 'Montant' in frame.columns:
+        frame['Montant'] = format_amounts(frame['Montant']).to_numpy()
+    return frame
+
+
+# Backend JIT optionnel pour les marches aléatoires séquentielles
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _floored_walks_loop(start, increments, floor, out):
+    """Boucle de référence : out[w, i] = max(out[w, i-1] + increments[w, i], floor[w])"""
+    n_walks, n_steps = increments.shape
+    for w in range(n_walks):
+        value = start[w]
+        out[w, 0] = value
+        for i in range(1, n_steps):
+            value = max(value + increments[w, i], floor[w])
+            out[w, i] = value
+    return out
+
+
+_floored_walks_jit = njit(cache=True)(_floored_walks_loop) if njit is not None else None
+
+
+def simulate_floored_walks(start, increments, floor, backend='auto'):
+    """Simule en bloc des marches aléatoires avec plancher (une ligne par marche)
+    
+    La première colonne de ``increments`` est ignorée : chaque marche part de ``start``.
+    ``start`` et ``floor`` sont des scalaires ou des vecteurs d'une valeur par marche.
+    ``backend`` vaut 'auto', 'numpy' ou 'numba'.
+    """
+    increments = np.atleast_2d(np.asarray(increments, dtype=np.float64))
+    n_walks, n_steps = increments.shape
+    start = np.broadcast_to(np.asarray(start, dtype=np.float64), (n_walks,))
+    floor = np.broadcast_to(np.asarray(floor, dtype=np.float64), (n_walks,))
+    
+    if backend == 'numba' and _floored_walks_jit is None:
+        raise ImportError("Le backend 'numba' nécessite le paquet numba")
+    if backend in ('auto', 'numba') and _floored_walks_jit is not None:
+        out = np.empty_like(increments)
+        return _floored_walks_jit(np.ascontiguousarray(start), increments,
+                                  np.ascontiguousarray(floor), out)
+    
+    # Récurrence de Lindley : x_t = floor + C_t - min(0, min_{k<=t} C_k)
+    walks = np.empty_like(increments)
+    walks[:, 0] = start
+    if n_steps > 1:
+        excess = (start - floor)[:, None] + np.cumsum(increments[:, 1:], axis=1)
+        walks[:, 1:] = floor[:, None] + excess - np.minimum(np.minimum.accumulate(excess, axis=1), 0)
+    return walks
+
+
+def simulate_counting_walks(start, events):
+    """Cumule en bloc des compteurs d'événements (une ligne par marche, première colonne ignorée)"""
+    events = np.atleast_2d(np.asarray(events))
+    n_walks, n_steps = events.shape
+    counts = np.empty((n_walks, n_steps), dtype=np.int64)
+    counts[:, 0] = 0
+    np.cumsum(events[:, 1:], axis=1, out=counts[:, 1:])
+    counts += np.broadcast_to(np.asarray(start, dtype=np.int64), (n_walks,))[:, None]
+    return counts
+
+
+# Clés des flux aléatoires dérivés de la graine du simulateur (spawn_key des SeedSequence)
+STREAM_FINANCIAL = 0
+STREAM_TERRITORY = 1
+STREAM_STORE = 2
+STREAM_STATS = 3
+
+# Catalogue des transactions et fourchettes de montants (partagés par tous les générateurs)
+TRANSACTION_CATEGORIES = {
+    'Vente': ['Alimentation', 'Bricolage', 'Textile', 'Électronique', 'Maison', 'Auto'],
+    'Achat': ['Stock Alimentation', 'Stock Bricolage', 'Stock Textile', 'Équipement'],
+    'Service': ['Livraison', 'Installation', 'Maintenance', 'SAV'],
+    'Frais': ['Loyer', 'Énergie', 'Personnel', 'Marketing']
+}
+
+SALE_AMOUNTS = {
+    'Alimentation': (45, 280),
+    'Bricolage': (75, 750),
+    'Textile': (30, 220),
+    'Électronique': (150, 3000),
+    'Maison': (40, 450),
+    'Auto': (120, 1500)
+}
+
+PURCHASE_AMOUNTS = {
+    'Stock Alimentation': (2500, 35000),
+    'Stock Bricolage': (4000, 50000),
+    'Stock Textile': (1200, 25000),
+    'Équipement': (10000, 80000)
+}
+
+SERVICE_AMOUNT = (50, 2000)
+FEE_AMOUNT = (1000, 15000)
+
+# Ajustements territoriaux (fourchettes de multiplicateur, 1.0 en Métropole)
+SALE_MULTIPLIERS = {'DROM': (1.15, 1.35), 'COM': (1.25, 1.5)}
+PURCHASE_MULTIPLIERS = {'DROM': (1.2, 1.45), 'COM': (1.3, 1.6)}
+
+TERRITORY_TYPES = ['DROM', 'COM', 'Métropole']
+
+# Décalage horaire par rapport à Paris (heure d'hiver), 0 pour la Métropole
+TERRITORY_UTC_OFFSETS = {
+    'Martinique': -5, 'Guadeloupe': -5, 'Réunion': 3, 'Guyane': -4, 'Mayotte': 2,
+    'Saint-Martin': -5, 'Saint-Barthélemy': -5, 'Saint-Pierre-et-Miquelon': -4,
+    'Wallis-et-Futuna': 11, 'Polynésie française': -11, 'Nouvelle-Calédonie': 10
+}
+
+# Activité journalière type d'un magasin par département : (tickets/jour, taux de marge)
+DEPARTMENT_PROFILES = {
+    'Alimentation': (420, 0.18),
+    'Bricolage': (60, 0.32),
+    'Textile': (90, 0.45),
+    'Électronique': (35, 0.15),
+    'Maison': (70, 0.35),
+    'Auto': (25, 0.25)
+}
+
+# Version des instantanés sauvegardés : à incrémenter quand la sortie du simulateur change
+SNAPSHOT_VERSION = 2
+
+# Clientèle simulée : base de clients par magasin, partagée entre les magasins d'un territoire
+CUSTOMERS_PER_STORE = 30000
+CUSTOMER_ID_STRIDE = 10_000_000
+
+# Affluence relative par heure locale (magasins ouverts de 8h à 21h)
+HOURLY_PROFILE = np.array([
+    0, 0, 0, 0, 0, 0, 0, 0,
+    0.6, 0.8, 1.0, 1.2, 1.3, 1.1, 0.9, 0.9, 1.0, 1.3, 1.4, 1.1, 0.7,
+    0, 0, 0
+])
+
 
 class NinjaGBHDataSimulator:
-    def __init__(self):
+    def __init__(self, seed=None):
+        # Graine racine : chaque territoire / magasin reçoit un flux enfant indépendant
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.seed = self.seed_sequence.entropy
+        self.seed_fixed = seed is not None
+        self.rng = np.random.default_rng(self.seed_sequence)
+        
         # Tous les territoires français avec données enrichies
         self.territoires = {
             'DROM': [
@@ -36,6 +201,31 @@ class NinjaGBHDataSimulator:
         
         self.departments = ['Alimentation', 'Bricolage', 'Textile', 'Électronique', 'Maison', 'Auto']
         self.stores = self._generate_stores()
+        self._territory_index = {
+            territoire: i for i, territoire in enumerate(
+                t for territoires in self.territoires.values() for t in territoires
+            )
+        }
+        # Indexé par (territoire, magasin) : certains noms existent dans deux territoires
+        self._store_index = {
+            key: i for i, key in enumerate(
+                (territoire, store) for territoire in self._territory_index for store in self.stores[territoire]
+            )
+        }
+    
+    def _stream(self, *key):
+        """Flux aléatoire reproductible identifié par une clé d'entiers positifs"""
+        return np.random.default_rng(
+            np.random.SeedSequence(self.seed_sequence.entropy, spawn_key=tuple(int(k) for k in key))
+        )
+    
+    def territory_rng(self, territoire, *key):
+        """Flux enfant propre à un territoire (indépendant de l'ordre de génération)"""
+        return self._stream(STREAM_TERRITORY, self._territory_index[territoire], *key)
+    
+    def store_rng(self, territoire, store, *key):
+        """Flux enfant propre à un magasin (indépendant de l'ordre de génération)"""
+        return self._stream(STREAM_STORE, self._store_index[(territoire, store)], *key)
         
     def _generate_stores(self):
         """Génère la liste des magasins par territoire avec données réalistes"""
@@ -96,45 +286,47 @@ class NinjaGBHDataSimulator:
         
         date_range = pd.date_range(start=start_date, end=end_date, freq='D')
         n_days = len(date_range)
+        calendar = self._calendar_features(date_range)
+        t = calendar['index']
+        
+        # Un flux par plage de dates : même (graine, plage) => mêmes données
+        first_day = date_range[0].toordinal() if n_days else 0
+        rng = self._stream(STREAM_FINANCIAL, first_day, n_days)
+        month = calendar['month']
         
         # Génération de données avec patterns complexes
         base_ca = 280000
         
         # Saisonnalités multiples
-        seasonal_annual = np.sin(np.arange(n_days) * 2 * np.pi / 365) * 0.35
-        seasonal_monthly = np.sin(np.arange(n_days) * 2 * np.pi / 30) * 0.25
-        seasonal_weekly = np.sin(np.arange(n_days) * 2 * np.pi / 7) * 0.15
-        
-        # Événements spéciaux (Soldes, Noël, etc.)
-        special_events = np.zeros(n_days)
-        for i in range(n_days):
-            date = date_range[i]
-            # Périodes de soldes
-            if (date.month == 1 and date.day <= 31) or (date.month == 7 and date.day <= 31):
-                special_events[i] = 0.25
-            # Noël
-            elif date.month == 12 and date.day > 15:
-                special_events[i] = 0.4
-            # Périodes creuses
-            elif date.month in [2, 9]:
-                special_events[i] = -0.1
+        seasonal_annual = np.sin(t * 2 * np.pi / 365) * 0.35
+        seasonal_monthly = np.sin(t * 2 * np.pi / 30) * 0.25
+        seasonal_weekly = np.sin(t * 2 * np.pi / 7) * 0.15
+        
+        # Événements spéciaux (Soldes, Noël, etc.) - premier masque vérifié l'emporte
+        special_events = np.select(
+            [
+                np.isin(month, [1, 7]),                    # Périodes de soldes
+                (month == 12) & (calendar['day'] > 15),    # Noël
+                np.isin(month, [2, 9])                     # Périodes creuses
+            ],
+            [0.25, 0.4, -0.1],
+            default=0.0
+        )
         
         # Croissance avec accélération progressive
-        trend = np.arange(n_days) * 150 * (1 + np.arange(n_days) * 0.0001)
+        trend = t * 150 * (1 + t * 0.0001)
         
         # Bruit réaliste (moins les weekends)
-        noise = np.random.normal(0, 12000, n_days)
-        for i in range(n_days):
-            if date_range[i].weekday() >= 5:  # Weekend
-                noise[i] *= 0.7
+        noise = rng.normal(0, 12000, n_days)
+        noise[calendar['weekend']] *= 0.7
         
         # CA quotidien final
         daily_revenue = base_ca * (1 + seasonal_annual + seasonal_monthly + seasonal_weekly + special_events) + trend + noise
         daily_revenue = np.maximum(daily_revenue, 120000)
         
         # Métriques dérivées plus réalistes
-        expense_ratio = 0.78 + np.random.normal(0, 0.03, n_days)
-        profit_margin = 0.14 + np.random.normal(0, 0.02, n_days)
+        expense_ratio = 0.78 + rng.normal(0, 0.03, n_days)
+        profit_margin = 0.14 + rng.normal(0, 0.02, n_days)
 
         data = {
             'Date': date_range,
@@ -142,152 +334,168 @@ class NinjaGBHDataSimulator:
             'CA_Quotidien': daily_revenue,
             'Dépenses': np.cumsum(daily_revenue * expense_ratio),
             'Bénéfice_net': np.cumsum(daily_revenue * profit_margin),
-            'Investissements': self._generate_investments(date_range),
-            'Effectifs': self._generate_employees(date_range),
-            'Satisfaction_client': self._generate_satisfaction(date_range),
-            'Panier_moyen': self._generate_basket_size(date_range),
-            'Nouveaux_clients': self._generate_new_customers(date_range),
-            'Nbre_magasins': self._generate_store_count(date_range),
-            'Productivité': self._generate_productivity(date_range)
+            'Investissements': self._generate_investments(date_range, calendar, rng=rng, batched=True),
+            'Effectifs': self._generate_employees(date_range, calendar, rng=rng),
+            'Satisfaction_client': self._generate_satisfaction(date_range, calendar, rng=rng, batched=True),
+            'Panier_moyen': self._generate_basket_size(date_range, calendar, rng=rng, batched=True),
+            'Nouveaux_clients': self._generate_new_customers(date_range, calendar, rng=rng, batched=True),
+            'Nbre_magasins': self._generate_store_count(date_range, calendar, rng=rng),
+            'Productivité': self._generate_productivity(date_range, calendar, rng=rng, batched=True)
         }
         
         return pd.DataFrame(data)
     
-    def _generate_investments(self, date_range):
+    def _calendar_features(self, date_range):
+        """Extrait une seule fois les composantes calendaires d'un DatetimeIndex"""
+        weekday = date_range.weekday.to_numpy(dtype=np.int8)
+        return {
+            'index': np.arange(len(date_range), dtype=np.float64),
+            'month': date_range.month.to_numpy(dtype=np.int8),
+            'day': date_range.day.to_numpy(dtype=np.int8),
+            'weekday': weekday,
+            'dayofyear': date_range.dayofyear.to_numpy(dtype=np.int16),
+            'weekend': weekday >= 5
+        }
+    
+    def _generate_investments(self, date_range, calendar=None, rng=None, batched=False):
         """Génère des investissements avec patterns réalistes"""
-        investments = np.zeros(len(date_range))
-        
-        # Investissements majeurs stratégiques
-        for i, date in enumerate(date_range):
-            # Ouvertures de magasins (investissements importants)
-            if date.day == 1 and date.month in [3, 6, 9]:  # Début de trimestre
-                if random.random() < 0.3:
-                    investments[i] = random.choice([250000, 500000, 1000000])
-            
-            # Rénovations (investissements moyens)
-            elif date.day == 15 and random.random() < 0.2:
-                investments[i] = random.uniform(50000, 200000)
+        if calendar is None:
+            calendar = self._calendar_features(date_range)
+        rng = self.rng if rng is None else rng
+        n_days = len(date_range)
+        month, day = calendar['month'], calendar['day']
+        draw = rng.random(n_days)
+        
+        # Ouvertures de magasins (investissements importants) en début de trimestre
+        opening = (day == 1) & np.isin(month, [3, 6, 9]) & (draw < 0.3)
+        # Rénovations (investissements moyens)
+        renovation = (day == 15) & (draw < 0.2)
         
-        return investments
+        investments = np.zeros(n_days)
+        investments[opening] = rng.choice([250000, 500000, 1000000], opening.sum())
+        investments[renovation] = rng.uniform(50000, 200000, renovation.sum())
+        
+        return investments.astype(np.float32) if batched else investments
     
-    def _generate_employees(self, date_range):
-        """Génère une évolution réaliste des effectifs"""
-        base_employees = 2800
-        employees = [base_employees]
+    def _generate_employees(self, date_range, calendar=None, rng=None, n_walks=None, base_employees=2800):
+        """Génère une évolution réaliste des effectifs
         
-        for i in range(1, len(date_range)):
-            prev = employees[-1]
-            # Croissance basée sur la performance
-            growth = random.normalvariate(0.8, 0.5)
-            
-            # Embauches saisonnières
-            date = date_range[i]
-            if date.month in [11, 12]:  # Préparation Noël
-                growth += random.uniform(2, 5)
-            elif date.month in [1, 2]:  # Post-soldes
-                growth -= random.uniform(1, 3)
-            
-            new_count = max(prev + growth, base_employees * 0.95)
-            employees.append(new_count)
+        Avec ``n_walks``, simule autant d'historiques indépendants (un par magasin ou
+        territoire) et renvoie un tableau 2-D (n_walks, n_jours).
+        """
+        if calendar is None:
+            calendar = self._calendar_features(date_range)
+        rng = self.rng if rng is None else rng
+        shape = (1 if n_walks is None else n_walks, len(date_range))
+        month = calendar['month']
+        
+        # Croissance basée sur la performance
+        growth = rng.normal(0.8, 0.5, shape)
+        
+        # Embauches saisonnières : préparation Noël, puis post-soldes
+        christmas = np.isin(month, [11, 12])
+        post_sales = np.isin(month, [1, 2])
+        growth[:, christmas] += rng.uniform(2, 5, (shape[0], christmas.sum()))
+        growth[:, post_sales] -= rng.uniform(1, 3, (shape[0], post_sales.sum()))
         
-        return employees
+        base_employees = np.asarray(base_employees, dtype=np.float64)
+        employees = simulate_floored_walks(base_employees, growth, base_employees * 0.95)
+        
+        return employees[0] if n_walks is None else employees
     
-    def _generate_basket_size(self, date_range):
+    def _generate_basket_size(self, date_range, calendar=None, rng=None, batched=False):
         """Génère l'évolution du panier moyen"""
+        if calendar is None:
+            calendar = self._calendar_features(date_range)
+        rng = self.rng if rng is None else rng
         base_basket = 65
-        baskets = []
+        month = calendar['month']
         
-        for date in date_range:
-            # Variations saisonnières
-            seasonal = np.sin(date.timetuple().tm_yday * 2 * np.pi / 365) * 8
-            
-            # Effets spéciaux
-            special = 0
-            if date.month == 12:  # Noël - paniers plus gros
-                special = 15
-            elif date.month in [1, 7]:  # Soldes - paniers moyens
-                special = 5
-            
-            basket = base_basket + seasonal + special + random.normalvariate(0, 3)
-            baskets.append(max(basket, 40))
+        # Variations saisonnières
+        seasonal = np.sin(calendar['dayofyear'] * 2 * np.pi / 365) * 8
+        
+        # Effets spéciaux : Noël (paniers plus gros), soldes (paniers moyens)
+        special = np.select([month == 12, np.isin(month, [1, 7])], [15, 5], default=0)
+        
+        baskets = base_basket + seasonal + special + rng.normal(0, 3, len(date_range))
+        baskets = np.maximum(baskets, 40)
         
-        return baskets
+        return baskets.astype(np.float32) if batched else baskets.tolist()
     
-    def _generate_new_customers(self, date_range):
+    def _generate_new_customers(self, date_range, calendar=None, rng=None, batched=False):
         """Génère le nombre de nouveaux clients"""
+        if calendar is None:
+            calendar = self._calendar_features(date_range)
+        rng = self.rng if rng is None else rng
         base_customers = 400
-        customers = []
+        month = calendar['month']
         
-        for date in date_range:
-            # Saisonnalité
-            seasonal = np.sin(date.timetuple().tm_yday * 2 * np.pi / 365) * 50
-            
-            # Jours de semaine vs weekend
-            weekday_effect = 80 if date.weekday() < 5 else 120
-            
-            # Événements spéciaux
-            special = 0
-            if date.month == 12:
-                special = 100
-            elif date.month in [1, 7]:
-                special = 150
-            
-            customers.append(int(max(base_customers + seasonal + weekday_effect + special + random.normalvariate(0, 30), 200)))
+        # Saisonnalité
+        seasonal = np.sin(calendar['dayofyear'] * 2 * np.pi / 365) * 50
+        
+        # Jours de semaine vs weekend
+        weekday_effect = np.where(calendar['weekend'], 120, 80)
+        
+        # Événements spéciaux
+        special = np.select([month == 12, np.isin(month, [1, 7])], [100, 150], default=0)
         
-        return customers
+        customers = base_customers + seasonal + weekday_effect + special + rng.normal(0, 30, len(date_range))
+        customers = np.maximum(customers, 200).astype(np.int32)
+        
+        return customers if batched else customers.tolist()
     
-    def _generate_satisfaction(self, date_range):
+    def _generate_satisfaction(self, date_range, calendar=None, rng=None, batched=False):
         """Génère des scores de satisfaction réalistes"""
+        if calendar is None:
+            calendar = self._calendar_features(date_range)
+        rng = self.rng if rng is None else rng
         base_satisfaction = 4.3
-        satisfaction = []
+        month = calendar['month']
         
-        for date in date_range:
-            # Dégradation légère pendant les périodes de forte activité
-            busy_penalty = 0
-            if date.month in [12, 1, 7]:
-                busy_penalty = -0.1
-            
-            # Amélioration pendant les périodes calmes
-            calm_bonus = 0
-            if date.month in [2, 9]:
-                calm_bonus = 0.05
-            
-            score = base_satisfaction + busy_penalty + calm_bonus + random.normalvariate(0, 0.04)
-            satisfaction.append(max(min(score, 4.8), 4.0))
+        # Dégradation légère pendant les périodes de forte activité
+        busy_penalty = np.where(np.isin(month, [12, 1, 7]), -0.1, 0)
+        
+        # Amélioration pendant les périodes calmes
+        calm_bonus = np.where(np.isin(month, [2, 9]), 0.05, 0)
+        
+        scores = base_satisfaction + busy_penalty + calm_bonus + rng.normal(0, 0.04, len(date_range))
+        scores = np.clip(scores, 4.0, 4.8)
         
-        return satisfaction
+        return scores.astype(np.float32) if batched else scores.tolist()
     
-    def _generate_store_count(self, date_range):
-        """Génère l'évolution du nombre de magasins"""
-        base_stores = 48
-        stores = [base_stores]
+    def _generate_store_count(self, date_range, calendar=None, rng=None, n_walks=None, base_stores=48):
+        """Génère l'évolution du nombre de magasins
         
-        for i in range(1, len(date_range)):
-            prev = stores[-1]
-            # Ouvertures progressives (environ 1 nouveau magasin par mois)
-            if date_range[i].day == 1 and random.random() < 0.3:
-                stores.append(prev + 1)
-            else:
-                stores.append(prev)
+        Avec ``n_walks``, renvoie un tableau 2-D (n_walks, n_jours) d'historiques d'ouvertures.
+        """
+        if calendar is None:
+            calendar = self._calendar_features(date_range)
+        rng = self.rng if rng is None else rng
+        shape = (1 if n_walks is None else n_walks, len(date_range))
         
-        return stores
+        # Ouvertures progressives (environ 1 nouveau magasin par mois)
+        openings = (calendar['day'] == 1) & (rng.random(shape) < 0.3)
+        stores = simulate_counting_walks(base_stores, openings)
+        
+        return stores[0] if n_walks is None else stores
     
-    def _generate_productivity(self, date_range):
+    def _generate_productivity(self, date_range, calendar=None, rng=None, batched=False):
         """Génère des indicateurs de productivité"""
+        if calendar is None:
+            calendar = self._calendar_features(date_range)
+        rng = self.rng if rng is None else rng
         base_productivity = 85  # %
-        productivity = []
         
-        for date in date_range:
-            # Variations saisonnières
-            seasonal = np.sin(date.timetuple().tm_yday * 2 * np.pi / 365) * 3
-            
-            # Effet apprentissage (amélioration dans le temps)
-            learning_effect = min(len(productivity) * 0.01, 5)
-            
-            prod = base_productivity + seasonal + learning_effect + random.normalvariate(0, 2)
-            productivity.append(max(min(prod, 95), 75))
+        # Variations saisonnières
+        seasonal = np.sin(calendar['dayofyear'] * 2 * np.pi / 365) * 3
+        
+        # Effet apprentissage (amélioration dans le temps)
+        learning_effect = np.minimum(calendar['index'] * 0.01, 5)
+        
+        productivity = base_productivity + seasonal + learning_effect + rng.normal(0, 2, len(date_range))
+        productivity = np.clip(productivity, 75, 95)
         
-        return productivity
+        return productivity.astype(np.float32) if batched else productivity.tolist()
     
     def generate_territory_performance(self):
         """Génère les performances détaillées par territoire"""
@@ -295,59 +503,65 @@ class NinjaGBHDataSimulator:
         
         # DROM - forte croissance
         for territoire in self.territoires['DROM']:
-            ca_base = random.uniform(1800000, 4500000)
+            rng = self.territory_rng(territoire)
+            ca_base = rng.uniform(1800000, 4500000)
             perf = {
                 'Territoire': territoire,
                 'Type': 'DROM',
                 'Chiffre_affaires': ca_base,
-                'Croissance': random.uniform(4, 20),
+                'Croissance': rng.uniform(4, 20),
                 'Magasins': len(self.stores[territoire]),
-                'Satisfaction': random.uniform(4.2, 4.8),
-                'Part_marche': random.uniform(28, 48),
-                'Rentabilité': random.uniform(10, 18),
-                'Nouveaux_clients_mois': random.randint(800, 2000),
-                'Panier_moyen': random.uniform(55, 85)
+                'Satisfaction': rng.uniform(4.2, 4.8),
+                'Part_marche': rng.uniform(28, 48),
+                'Rentabilité': rng.uniform(10, 18),
+                'Nouveaux_clients_mois': int(rng.integers(800, 2001)),
+                'Panier_moyen': rng.uniform(55, 85)
             }
             performance.append(perf)
         
         # COM - croissance modérée
         for territoire in self.territoires['COM']:
-            ca_base = random.uniform(600000, 2200000)
+            rng = self.territory_rng(territoire)
+            ca_base = rng.uniform(600000, 2200000)
             perf = {
                 'Territoire': territoire,
                 'Type': 'COM',
                 'Chiffre_affaires': ca_base,
-                'Croissance': random.uniform(3, 16),
+                'Croissance': rng.uniform(3, 16),
                 'Magasins': len(self.stores[territoire]),
-                'Satisfaction': random.uniform(4.1, 4.7),
-                'Part_marche': random.uniform(18, 38),
-                'Rentabilité': random.uniform(8, 15),
-                'Nouveaux_clients_mois': random.randint(300, 1200),
-                'Panier_moyen': random.uniform(60, 95)
+                'Satisfaction': rng.uniform(4.1, 4.7),
+                'Part_marche': rng.uniform(18, 38),
+                'Rentabilité': rng.uniform(8, 15),
+                'Nouveaux_clients_mois': int(rng.integers(300, 1201)),
+                'Panier_moyen': rng.uniform(60, 95)
             }
             performance.append(perf)
         
         # Métropole - croissance stable
         for territoire in self.territoires['Métropole']:
-            ca_base = random.uniform(3500000, 12000000)
+            rng = self.territory_rng(territoire)
+            ca_base = rng.uniform(3500000, 12000000)
             perf = {
                 'Territoire': territoire,
                 'Type': 'Métropole',
                 'Chiffre_affaires': ca_base,
-                'Croissance': random.uniform(2, 12),
+                'Croissance': rng.uniform(2, 12),
                 'Magasins': len(self.stores[territoire]),
-                'Satisfaction': random.uniform(3.9, 4.5),
-                'Part_marche': random.uniform(6, 22),
-                'Rentabilité': random.uniform(12, 20),
-                'Nouveaux_clients_mois': random.randint(1500, 4000),
-                'Panier_moyen': random.uniform(50, 80)
+                'Satisfaction': rng.uniform(3.9, 4.5),
+                'Part_marche': rng.uniform(6, 22),
+                'Rentabilité': rng.uniform(12, 20),
+                'Nouveaux_clients_mois': int(rng.integers(1500, 4001)),
+                'Panier_moyen': rng.uniform(50, 80)
             }
             performance.append(perf)
         
         return pd.DataFrame(performance)
     
-    def generate_real_transactions(self, n_transactions=100):
+    def generate_real_transactions(self, n_transactions=100, now=None):
         """Génère des transactions réalistes avec plus de variété"""
+        rng = self.rng
+        if now is None:
+            now = datetime.now()
         transactions = []
         
         all_territoires = (
@@ -356,54 +570,50 @@ class NinjaGBHDataSimulator:
             self.territoires['Métropole']
         )
         
-        transaction_categories = {
-            'Vente': ['Alimentation', 'Bricolage', 'Textile', 'Électronique', 'Maison', 'Auto'],
-            'Achat': ['Stock Alimentation', 'Stock Bricolage', 'Stock Textile', 'Équipement'],
-            'Service': ['Livraison', 'Installation', 'Maintenance', 'SAV'],
-            'Frais': ['Loyer', 'Énergie', 'Personnel', 'Marketing']
-        }
+        transaction_categories = TRANSACTION_CATEGORIES
         
         for i in range(n_transactions):
-            days_ago = random.randint(0, 45)
-            transaction_date = datetime.now() - timedelta(
+            days_ago = int(rng.integers(0, 46))
+            transaction_date = now - timedelta(
                 days=days_ago, 
-                hours=random.randint(0, 23),
-                minutes=random.randint(0, 59)
+                hours=int(rng.integers(0, 24)),
+                minutes=int(rng.integers(0, 60))
             )
             
-            territoire = random.choice(all_territoires)
-            store = random.choice(self.stores[territoire])
+            territoire = all_territoires[rng.integers(len(all_territoires))]
+            store = self.stores[territoire][rng.integers(len(self.stores[territoire]))]
             
             # Catégorie de transaction
-            category = random.choice(list(transaction_categories.keys()))
-            subcategory = random.choice(transaction_categories[category])
+            category = list(transaction_categories)[rng.integers(len(transaction_categories))]
+            subcategory = transaction_categories[category][rng.integers(len(transaction_categories[category]))]
             
             # Montant réaliste selon la catégorie
             if category == 'Vente':
-                amount = self._get_sale_amount(subcategory, territoire)
+                amount = self._get_sale_amount(subcategory, territoire, rng)
                 trans_type = f"Vente {subcategory}"
             elif category == 'Achat':
-                amount = -self._get_purchase_amount(subcategory, territoire)
+                amount = -self._get_purchase_amount(subcategory, territoire, rng)
                 trans_type = f"Achat {subcategory}"
             elif category == 'Service':
-                amount = random.uniform(50, 2000)
+                amount = rng.uniform(*SERVICE_AMOUNT)
                 trans_type = f"Service {subcategory}"
             else:  # Frais
-                amount = -random.uniform(1000, 15000)
+                amount = -rng.uniform(*FEE_AMOUNT)
                 trans_type = f"Frais {subcategory}"
             
             transactions.append({
-                'Date': transaction_date.strftime('%d/%m/%Y %H:%M'),
+                'Timestamp': pd.Timestamp(transaction_date).value,
                 'Type': trans_type,
                 'Catégorie': category,
                 'Magasin': store,
-                'Montant': f"{amount:+,.2f} €",
+                'Montant': amount,
                 'Territoire': territoire,
                 'Type_Territoire': self._get_territory_type(territoire),
-                'ID_Transaction': f"GBH{random.randint(10000, 99999)}"
+                'ID_Transaction': f"GBH{rng.integers(10000, 100000)}"
             })
         
-        transactions.sort(key=lambda x: x['Date'], reverse=True)
+        # Tri sur l'horodatage int64 (le libellé 'Date' n'est produit qu'à l'affichage)
+        transactions.sort(key=lambda x: x['Timestamp'], reverse=True)
         return transactions[:n_transactions]
     
     def _get_territory_type(self, territoire):
@@ -415,53 +625,364 @@ class NinjaGBHDataSimulator:
         else:
             return 'Métropole'
     
-    def _get_sale_amount(self, department, territoire):
+    def _get_sale_amount(self, department, territoire, rng=None):
         """Retourne des montants de vente réalistes"""
-        base_amounts = {
-            'Alimentation': (45, 280),
-            'Bricolage': (75, 750),
-            'Textile': (30, 220),
-            'Électronique': (150, 3000),
-            'Maison': (40, 450),
-            'Auto': (120, 1500)
-        }
-        min_val, max_val = base_amounts.get(department, (70, 700))
+        rng = self.rng if rng is None else rng
+        min_val, max_val = SALE_AMOUNTS.get(department, (70, 700))
         
         # Ajustement territorial
         multiplier = 1.0
-        if territoire in self.territoires['DROM']:
-            multiplier = random.uniform(1.15, 1.35)
-        elif territoire in self.territoires['COM']:
-            multiplier = random.uniform(1.25, 1.5)
+        bounds = SALE_MULTIPLIERS.get(self._get_territory_type(territoire))
+        if bounds is not None:
+            multiplier = rng.uniform(*bounds)
         
-        return random.uniform(min_val, max_val) * multiplier
+        return rng.uniform(min_val, max_val) * multiplier
     
-    def _get_purchase_amount(self, department, territoire):
+    def _get_purchase_amount(self, department, territoire, rng=None):
         """Retourne des montants d'achat réalistes"""
-        base_amounts = {
-            'Stock Alimentation': (2500, 35000),
-            'Stock Bricolage': (4000, 50000),
-            'Stock Textile': (1200, 25000),
-            'Équipement': (10000, 80000)
-        }
-        min_val, max_val = base_amounts.get(department, (3000, 40000))
+        rng = self.rng if rng is None else rng
+        min_val, max_val = PURCHASE_AMOUNTS.get(department, (3000, 40000))
         
         multiplier = 1.0
-        if territoire in self.territoires['DROM']:
-            multiplier = random.uniform(1.2, 1.45)
-        elif territoire in self.territoires['COM']:
-            multiplier = random.uniform(1.3, 1.6)
+        bounds = PURCHASE_MULTIPLIERS.get(self._get_territory_type(territoire))
+        if bounds is not None:
+            multiplier = rng.uniform(*bounds)
         
-        return random.uniform(min_val, max_val) * multiplier
+        return rng.uniform(min_val, max_val) * multiplier
     
-    def get_store_statistics(self):
+    @cached_property
+    def _transaction_layout(self):
+        """Tables de correspondance vectorisées pour la génération colonnaire"""
+        territories = list(self._territory_index)
+        store_counts = np.array([len(self.stores[t]) for t in territories], dtype=np.int64)
+        store_names = list(dict.fromkeys(s for _, s in self._store_index))
+        
+        types, type_category, low, high, sign = [], [], [], [], []
+        mult_low = []
+        mult_high = []
+        for c, (category, subcategories) in enumerate(TRANSACTION_CATEGORIES.items()):
+            for subcategory in subcategories:
+                if category == 'Vente':
+                    bounds, multipliers, direction = SALE_AMOUNTS.get(subcategory, (70, 700)), SALE_MULTIPLIERS, 1
+                elif category == 'Achat':
+                    bounds, multipliers, direction = PURCHASE_AMOUNTS.get(subcategory, (3000, 40000)), PURCHASE_MULTIPLIERS, -1
+                elif category == 'Service':
+                    bounds, multipliers, direction = SERVICE_AMOUNT, {}, 1
+                else:  # Frais
+                    bounds, multipliers, direction = FEE_AMOUNT, {}, -1
+                types.append(f"{category} {subcategory}")
+                type_category.append(c)
+                low.append(bounds[0])
+                high.append(bounds[1])
+                sign.append(direction)
+                mult_low.append([multipliers.get(t, (1.0, 1.0))[0] for t in TERRITORY_TYPES])
+                mult_high.append([multipliers.get(t, (1.0, 1.0))[1] for t in TERRITORY_TYPES])
+        
+        sub_counts = np.array([len(v) for v in TRANSACTION_CATEGORIES.values()], dtype=np.int64)
+        return {
+            'territories': territories,
+            'territory_type': np.array(
+                [TERRITORY_TYPES.index(self._get_territory_type(t)) for t in territories], dtype=np.int8
+            ),
+            'stores': store_names,
+            'store_name_code': np.array([store_names.index(s) for _, s in self._store_index], dtype=np.int64),
+            'store_offsets': np.concatenate(([0], np.cumsum(store_counts)[:-1])),
+            'store_counts': store_counts,
+            'store_territory': np.repeat(np.arange(len(territories)), store_counts),
+            'categories': list(TRANSACTION_CATEGORIES),
+            'sub_offsets': np.concatenate(([0], np.cumsum(sub_counts)[:-1])),
+            'sub_counts': sub_counts,
+            'types': types,
+            'type_category': np.array(type_category, dtype=np.int8),
+            'low': np.array(low, dtype=np.float64),
+            'high': np.array(high, dtype=np.float64),
+            'sign': np.array(sign, dtype=np.float64),
+            'mult_low': np.array(mult_low, dtype=np.float64),
+            'mult_high': np.array(mult_high, dtype=np.float64)
+        }
+    
+    def generate_transactions_frame(self, n_transactions=100, now=None, sort=True, engine='pandas', rng=None):
+        """Génère des transactions en colonnes (tirages NumPy en bloc, sans dict par ligne)
+        
+        Colonnes catégorielles, ``Timestamp`` en int64 (ns depuis l'epoch) et ``Montant``
+        numérique en euros. ``engine='arrow'`` renvoie une ``pyarrow.Table``.
+        """
+        rng = self.rng if rng is None else rng
+        if now is None:
+            now = datetime.now()
+        layout = self._transaction_layout
+        n = int(n_transactions)
+        
+        # Horodatage : jusqu'à 45 jours, 23 heures et 59 minutes dans le passé, soit un
+        # tirage uniforme sur 66 240 minutes. Les autres colonnes étant indépendantes de la
+        # date, tirer directement les effectifs par minute donne un ordre trié sans argsort.
+        n_minutes = 46 * 1440
+        if sort:
+            per_minute = rng.multinomial(n, np.full(n_minutes, 1.0 / n_minutes))
+            minutes_ago = np.repeat(np.arange(n_minutes, dtype=np.int64), per_minute)
+        else:
+            minutes_ago = rng.integers(0, n_minutes, n)
+        timestamps = pd.Timestamp(now).value - minutes_ago * 60_000_000_000
+        
+        # Territoire puis magasin uniforme dans le territoire
+        territory = rng.integers(0, len(layout['territories']), n)
+        store = layout['store_offsets'][territory] + (
+            rng.random(n) * layout['store_counts'][territory]
+        ).astype(np.int64)
+        
+        frame = self._transaction_columns(rng, timestamps, store)
+        if engine == 'arrow':
+            import pyarrow as pa
+            return pa.Table.from_pandas(frame, preserve_index=False)
+        return frame
+    
+    def _transaction_columns(self, rng, timestamps, store):
+        """Construit le DataFrame colonnaire à partir des horodatages et des index magasins"""
+        layout = self._transaction_layout
+        n = len(store)
+        territory = layout['store_territory'][store]
+        ter_type = layout['territory_type'][territory]
+        
+        # Catégorie puis sous-catégorie uniforme dans la catégorie
+        category = rng.integers(0, len(layout['categories']), n)
+        trans_type = layout['sub_offsets'][category] + (
+            rng.random(n) * layout['sub_counts'][category]
+        ).astype(np.int64)
+        
+        # Montant réaliste selon le type et l'ajustement territorial
+        low, high = layout['low'][trans_type], layout['high'][trans_type]
+        mult_low = layout['mult_low'][trans_type, ter_type]
+        mult_high = layout['mult_high'][trans_type, ter_type]
+        amount = (low + rng.random(n) * (high - low)) * (mult_low + rng.random(n) * (mult_high - mult_low))
+        amount *= layout['sign'][trans_type]
+        
+        return pd.DataFrame({
+            'Timestamp': np.asarray(timestamps, dtype=np.int64),
+            'Type': pd.Categorical.from_codes(trans_type, layout['types']),
+            'Catégorie': pd.Categorical.from_codes(category, layout['categories']),
+            'Magasin': pd.Categorical.from_codes(layout['store_name_code'][store], layout['stores']),
+            'Montant': amount,
+            'Territoire': pd.Categorical.from_codes(territory, layout['territories']),
+            'Type_Territoire': pd.Categorical.from_codes(ter_type, TERRITORY_TYPES),
+            'ID_Transaction': rng.integers(10000, 100000, n).astype(np.int32),
+            'ID_Client': self._customer_ids(rng, territory, category == layout['categories'].index('Vente'))
+        })
+    
+    def _customer_ids(self, rng, territory, is_sale):
+        """Identifiants clients des ventes (-1 pour les opérations internes)
+        
+        u² concentre les passages sur les clients fidèles de la base du territoire.
+        """
+        pool = CUSTOMERS_PER_STORE * self._transaction_layout['store_counts'][territory]
+        local = (rng.random(len(territory)) ** 2 * pool).astype(np.int64)
+        return np.where(is_sale, territory.astype(np.int64) * CUSTOMER_ID_STRIDE + local, -1)
+    
+    def _store_hourly_weights(self):
+        """Profil d'affluence (24 h, heure de Paris) de chaque magasin selon son fuseau"""
+        layout = self._transaction_layout
+        # Part de chaque magasin si l'on tire un territoire puis un magasin uniformément
+        share = 1.0 / (len(layout['territories']) * layout['store_counts'][layout['store_territory']])
+        offsets = np.array(
+            [TERRITORY_UTC_OFFSETS.get(t, 0) for t in layout['territories']], dtype=np.int64
+        )[layout['store_territory']]
+        local_hours = (np.arange(24)[:, None] + offsets[None, :]) % 24
+        return HOURLY_PROFILE[local_hours] * share[None, :]
+    
+    def _transaction_batches(self, events_per_second, batch_seconds, start, burstiness, rng):
+        """Générateur infini de micro-lots d'horloge simulée (mémoire constante)"""
+        layout = self._transaction_layout
+        hourly_weights = self._store_hourly_weights()
+        n_stores = len(layout['store_territory'])
+        step = int(batch_seconds * 1_000_000_000)
+        expected = events_per_second * batch_seconds
+        clock = pd.Timestamp(start).value
+        
+        while True:
+            hour = pd.Timestamp(clock).hour
+            weights = hourly_weights[hour]
+            if weights.sum() == 0:
+                weights = hourly_weights.mean(axis=0)
+            intensity = expected * weights / weights.sum()
+            
+            # Arrivées de Poisson par magasin ; le facteur gamma (moyenne 1) crée les rafales
+            if burstiness:
+                intensity = intensity * rng.gamma(1.0 / burstiness, burstiness, n_stores)
+            counts = rng.poisson(intensity)
+            store = rng.permutation(np.repeat(np.arange(n_stores), counts))
+            timestamps = np.sort(clock + rng.integers(0, step, len(store)))
+            
+            yield self._transaction_columns(rng, timestamps, store)
+            clock += step
+    
+    def stream_transactions(self, events_per_second=50, batch_seconds=1.0, max_batches=None,
+                            start=None, realtime=True, burstiness=0.5, rng=None):
+        """Flux continu de micro-lots de transactions (DataFrames triés par Timestamp)
+        
+        Le débit moyen vaut ``events_per_second`` ; sa répartition suit les horaires
+        d'ouverture locaux des magasins. Avec ``realtime=True`` chaque lot est cadencé
+        sur l'horloge murale, sinon les lots sont produits aussi vite que possible.
+        """
+        rng = self.rng if rng is None else rng
+        start = datetime.now() if start is None else start
+        # islice s'arrête avant de tirer un lot de trop (et d'avancer le flux aléatoire)
+        batches = itertools.islice(
+            self._transaction_batches(events_per_second, batch_seconds, start, burstiness, rng), max_batches
+        )
+        deadline = time.monotonic()
+        
+        for batch in batches:
+            if realtime:
+                deadline += batch_seconds
+                time.sleep(max(0.0, deadline - time.monotonic()))
+            yield batch
+    
+    async def astream_transactions(self, events_per_second=50, batch_seconds=1.0, max_batches=None,
+                                   start=None, realtime=True, burstiness=0.5, rng=None):
+        """Version asynchrone de ``stream_transactions`` (n'occupe pas la boucle pendant l'attente)"""
+        rng = self.rng if rng is None else rng
+        start = datetime.now() if start is None else start
+        batches = itertools.islice(
+            self._transaction_batches(events_per_second, batch_seconds, start, burstiness, rng), max_batches
+        )
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        
+        for batch in batches:
+            if realtime:
+                deadline += batch_seconds
+                await asyncio.sleep(max(0.0, deadline - loop.time()))
+            yield batch
+    
+    def iter_store_daily_facts(self, start_date='2023-01-01', end_date=None, territoires=None, months_per_chunk=1):
+        """Génère par blocs de mois la table de faits magasin × jour × département
+        
+        Chaque (magasin, mois calendaire) a son propre flux aléatoire, tiré sur le mois
+        entier puis découpé : le résultat ne dépend ni des bornes, ni du découpage en
+        blocs, ni du filtre ``territoires``, ce qui permet de paralléliser.
+        """
+        if end_date is None:
+            end_date = datetime.now()
+        requested = pd.date_range(start=start_date, end=end_date, freq='D').normalize()
+        if len(requested) == 0:
+            return
+        if isinstance(territoires, str):
+            territoires = [territoires]
+        date_range = pd.date_range(
+            requested[0].replace(day=1), requested[-1] + pd.offsets.MonthEnd(0), freq='D'
+        )
+        keep = np.asarray((date_range >= requested[0]) & (date_range <= requested[-1]))
+        layout = self._transaction_layout
+        
+        # Magasins retenus (index globaux) et leurs attributs
+        selected = [
+            i for i, (territoire, _) in enumerate(self._store_index)
+            if territoires is None or territoire in territoires
+        ]
+        store_keys = list(self._store_index)
+        store_territory = layout['store_territory'][selected]
+        store_type = layout['territory_type'][store_territory]
+        
+        # Multiplicateur territorial moyen, cohérent avec _get_sale_amount
+        type_multiplier = np.array([np.mean(SALE_MULTIPLIERS.get(t, (1.0, 1.0))) for t in TERRITORY_TYPES])
+        multiplier = type_multiplier[store_type]
+        size = np.array([
+            self.store_rng(*store_keys[i]).lognormal(0, 0.25) for i in selected
+        ])
+        
+        departments = list(DEPARTMENT_PROFILES)
+        base_tickets = np.array([DEPARTMENT_PROFILES[d][0] for d in departments], dtype=np.float64)
+        margin_rate = np.array([DEPARTMENT_PROFILES[d][1] for d in departments], dtype=np.float64)
+        ticket_mean = np.array([np.mean(SALE_AMOUNTS[d]) for d in departments], dtype=np.float64)
+        
+        # Saisonnalité journalière à partir des composantes calendaires
+        calendar = self._calendar_features(date_range)
+        month = calendar['month']
+        special = np.select(
+            [np.isin(month, [1, 7]), (month == 12) & (calendar['day'] > 15), np.isin(month, [2, 9])],
+            [0.25, 0.4, -0.1],
+            default=0.0
+        )
+        years = (date_range - pd.Timestamp('2023-01-01')).days.to_numpy() / 365
+        season = (
+            (1 + special + np.where(calendar['weekend'], 0.2, 0.0)
+             + np.sin(calendar['dayofyear'] * 2 * np.pi / 365) * 0.1)
+            * (1 + years * 0.04)
+        )
+        
+        # Découpage par mois calendaires
+        month_key = (date_range.year * 12 + date_range.month - 1).to_numpy()
+        month_starts = np.flatnonzero(np.r_[True, np.diff(month_key) != 0])
+        month_ends = np.r_[month_starts[1:], len(date_range)]
+        n_stores, n_depts = len(selected), len(departments)
+        
+        for c in range(0, len(month_starts), months_per_chunk):
+            first, last = month_starts[c], month_ends[min(c + months_per_chunk, len(month_starts)) - 1]
+            n_days = last - first
+            shape = (n_stores, n_days, n_depts)
+            tickets = np.empty(shape, dtype=np.int32)
+            clients = np.empty(shape, dtype=np.int32)
+            revenue = np.empty(shape, dtype=np.float32)
+            margin = np.empty(shape, dtype=np.float32)
+            
+            for m in range(c, min(c + months_per_chunk, len(month_starts))):
+                days = slice(month_starts[m] - first, month_ends[m] - first)
+                day_season = season[month_starts[m]:month_ends[m], None]
+                for pos, i in enumerate(selected):
+                    rng = self.store_rng(*store_keys[i], month_key[month_starts[m]])
+                    lam = base_tickets * size[pos] * day_season
+                    count = rng.poisson(lam)
+                    sales = count * ticket_mean * multiplier[pos] * rng.lognormal(0, 0.08, lam.shape)
+                    tickets[pos, days] = count
+                    clients[pos, days] = rng.binomial(count, 0.82)
+                    revenue[pos, days] = sales
+                    margin[pos, days] = sales * (margin_rate + rng.normal(0, 0.02, lam.shape))
+            
+            # Jours hors de la période demandée (début et fin de mois partiels) : tirés puis écartés
+            kept = keep[first:last]
+            if not kept.all():
+                tickets, clients, revenue, margin = (a[:, kept] for a in (tickets, clients, revenue, margin))
+                shape = tickets.shape
+            
+            store_codes = np.array(selected, dtype=np.int64)[:, None, None]
+            territory_codes = store_territory[:, None, None]
+            yield pd.DataFrame({
+                'Date': np.broadcast_to(date_range.values[first:last][kept][None, :, None], shape).ravel(),
+                'Type': pd.Categorical.from_codes(
+                    np.broadcast_to(store_type[:, None, None], shape).ravel(), TERRITORY_TYPES
+                ),
+                'Territoire': pd.Categorical.from_codes(
+                    np.broadcast_to(territory_codes, shape).ravel(), layout['territories']
+                ),
+                'Magasin': pd.Categorical.from_codes(
+                    np.broadcast_to(layout['store_name_code'][store_codes], shape).ravel(), layout['stores']
+                ),
+                'Département': pd.Categorical.from_codes(
+                    np.broadcast_to(np.arange(n_depts)[None, None, :], shape).ravel(), departments
+                ),
+                'CA': revenue.ravel(),
+                'Marge': margin.ravel(),
+                'Clients': clients.ravel(),
+                'Transactions': tickets.ravel()
+            })
+    
+    def generate_store_daily_facts(self, start_date='2023-01-01', end_date=None, territoires=None):
+        """Table de faits magasin × jour × département complète (voir iter_store_daily_facts)"""
+        chunks = list(self.iter_store_daily_facts(start_date, end_date, territoires, months_per_chunk=12))
+        if not chunks:
+            return pd.DataFrame()
+        return pd.concat(chunks, ignore_index=True)
+    
+    def get_store_statistics(self, territory_data=None):
         """Retourne les statistiques avancées des magasins"""
+        if territory_data is None:
+            territory_data = self.generate_territory_performance()
+        ca_by_type = territory_data.groupby('Type')['Chiffre_affaires'].sum()
+        
         stats = []
+        rng = self._stream(STREAM_STATS)
         for ter_type, territoires in self.territoires.items():
             total_stores = sum(len(self.stores[t]) for t in territoires)
-            total_ca = sum(self.generate_territory_performance()[
-                self.generate_territory_performance()['Type'] == ter_type
-            ]['Chiffre_affaires'])
+            total_ca = ca_by_type.get(ter_type, 0.0)
             
             stats.append({
                 'Type': ter_type,
@@ -470,20 +991,207 @@ class NinjaGBHDataSimulator:
                 'CA_Total': total_ca,
                 'CA_Moyen_Par_Magasin': total_ca / total_stores,
                 'Magasins_Par_Territoire': total_stores / len(territoires),
-                'Performance_Relative': random.uniform(0.8, 1.2)
+                'Performance_Relative': rng.uniform(0.8, 1.2)
             })
         return pd.DataFrame(stats)
     
-    def get_kpi_summary(self):
+    def get_kpi_summary(self, territory_data=None):
         """Retourne un résumé des KPI pour le header"""
-        territory_data = self.generate_territory_performance()
+        if territory_data is None:
+            territory_data = self.generate_territory_performance()
+        ca_by_type = territory_data.groupby('Type')['Chiffre_affaires'].sum()
         
         return {
             'total_territoires': len(self.territoires['DROM']) + len(self.territoires['COM']) + len(self.territoires['Métropole']),
             'total_magasins': sum(len(magasins) for magasins in self.stores.values()),
-            'ca_total_drom': territory_data[territory_data['Type'] == 'DROM']['Chiffre_affaires'].sum(),
-            'ca_total_com': territory_data[territory_data['Type'] == 'COM']['Chiffre_affaires'].sum(),
-            'ca_total_metro': territory_data[territory_data['Type'] == 'Métropole']['Chiffre_affaires'].sum(),
+            'ca_total_drom': ca_by_type.get('DROM', 0.0),
+            'ca_total_com': ca_by_type.get('COM', 0.0),
+            'ca_total_metro': ca_by_type.get('Métropole', 0.0),
             'satisfaction_moyenne': territory_data['Satisfaction'].mean(),
             'croissance_moyenne': territory_data['Croissance'].mean()
-        }
\ No newline at end of file
+        }
+    
+    def snapshot(self, start_date='2023-01-01', end_date=None, n_transactions=100, now=None):
+        """Retourne un instantané cohérent : une seule génération par rafraîchissement"""
+        return SimulationSnapshot(self, start_date, end_date, n_transactions, now)
+
+
+class SimulationSnapshot:
+    """Tables du simulateur générées une seule fois, agrégats dérivés à la demande
+    
+    Les statistiques magasins et le résumé KPI sont calculés à partir de la même
+    table territoriale que celle affichée, au lieu de la régénérer.
+    """
+    
+    def __init__(self, simulator, start_date='2023-01-01', end_date=None, n_transactions=100, now=None):
+        self.simulator = simulator
+        self.start_date = start_date
+        self.end_date = datetime.now() if end_date is None else end_date
+        self.n_transactions = n_transactions
+        self.now = datetime.now() if now is None else now
+    
+    @cached_property
+    def financial_data(self):
+        return self.simulator.generate_financial_data(self.start_date, self.end_date)
+    
+    @cached_property
+    def territory_data(self):
+        return self.simulator.generate_territory_performance()
+    
+    @cached_property
+    def transactions(self):
+        return self.simulator.generate_real_transactions(self.n_transactions, now=self.now)
+    
+    @cached_property
+    def store_stats(self):
+        return self.simulator.get_store_statistics(self.territory_data)
+    
+    @cached_property
+    def kpi_summary(self):
+        return self.simulator.get_kpi_summary(self.territory_data)
+    
+    @cached_property
+    def territory_cube(self):
+        """Cube Groupe → Type → Territoire : agrégats et sous-tables par simple lecture"""
+        from NinjaGBHCube import OLAPCube
+        return OLAPCube.from_territories(self.territory_data)
+    
+    # Tables sauvegardées au format Arrow IPC (Feather v2 non compressé : mappable en mémoire)
+    _FEATHER_TABLES = {
+        'financial_data': 'financial.arrow',
+        'territory_data': 'territories.arrow',
+        'store_stats': 'store_stats.arrow',
+        'transactions': 'transactions.arrow'
+    }
+    
+    # Pointeur vers la version publiée : remplacé atomiquement, les versions ne sont jamais modifiées
+    _CURRENT = 'CURRENT'
+    # Âge au-delà duquel une version ni publiée ni précédente est supprimée (écriture abandonnée)
+    _PRUNE_AFTER_S = 3600
+    
+    def save(self, path, overwrite=False):
+        """Écrit l'instantané dans une nouvelle version de ``path`` puis la publie
+        
+        Publication atomique par remplacement du pointeur ``CURRENT`` : un lecteur voit
+        l'ancienne ou la nouvelle version, jamais un répertoire partiel ou supprimé.
+        Sans ``overwrite``, une version déjà publiée par un autre processus l'emporte.
+        """
+        from pyarrow import feather
+        
+        version = f"v{time.time_ns()}-{os.getpid()}"
+        version_path = os.path.join(path, version)
+        os.makedirs(version_path)
+        for attribute, filename in self._FEATHER_TABLES.items():
+            frame = getattr(self, attribute)
+            if not isinstance(frame, pd.DataFrame):
+                frame = pd.DataFrame(frame)
+            feather.write_feather(frame, os.path.join(version_path, filename), compression='uncompressed')
+        
+        metadata = {
+            'fingerprint': self.fingerprint(self.simulator, self.start_date, self.n_transactions, self.end_date),
+            'seed': None if getattr(self.simulator, 'seed', None) is None else str(self.simulator.seed),
+            'start_date': str(pd.Timestamp(self.start_date)),
+            'end_date': str(pd.Timestamp(self.end_date)),
+            'n_transactions': self.n_transactions,
+            'now': str(pd.Timestamp(self.now)),
+            'kpi_summary': {k: v.item() if hasattr(v, 'item') else v for k, v in self.kpi_summary.items()}
+        }
+        with open(os.path.join(version_path, 'snapshot.json'), 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        
+        pointer = os.path.join(path, self._CURRENT)
+        previous = self._current_version(path)
+        if previous is not None and not overwrite:
+            # Un autre processus a publié l'instantané entre-temps : on garde le sien
+            shutil.rmtree(version_path, ignore_errors=True)
+            return path
+        tmp_pointer = f"{pointer}.tmp-{os.getpid()}"
+        with open(tmp_pointer, 'w', encoding='utf-8') as f:
+            f.write(version)
+        os.replace(tmp_pointer, pointer)
+        self._prune(path, keep={version, previous})
+        return path
+    
+    @classmethod
+    def _current_version(cls, path):
+        try:
+            with open(os.path.join(path, cls._CURRENT), encoding='utf-8') as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return None
+    
+    @classmethod
+    def _published_path(cls, path):
+        """Répertoire de la version publiée (ou ``path`` lui-même, ancien format sans pointeur)"""
+        version = cls._current_version(path)
+        return path if version is None else os.path.join(path, version)
+    
+    @classmethod
+    def _prune(cls, path, keep):
+        """Supprime les anciennes versions ; la précédente reste pour les lecteurs en cours"""
+        cutoff = time.time_ns() - cls._PRUNE_AFTER_S * 1_000_000_000
+        for name in os.listdir(path):
+            if name in keep or not name.startswith('v') or '-' not in name:
+                continue
+            created = name[1:].split('-')[0]
+            # Versions récentes : peut-être en cours d'écriture par un autre processus
+            if created.isdigit() and int(created) < cutoff:
+                shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+    
+    @classmethod
+    def load(cls, path, memory_map=True, simulator=None):
+        """Recharge un instantané ; avec ``memory_map`` les colonnes numériques pointent
+        directement sur les pages du fichier, partagées entre processus"""
+        from pyarrow import feather
+        
+        path = cls._published_path(path)
+        with open(os.path.join(path, 'snapshot.json'), encoding='utf-8') as f:
+            metadata = json.load(f)
+        
+        snapshot = cls(
+            simulator,
+            start_date=pd.Timestamp(metadata['start_date']),
+            end_date=pd.Timestamp(metadata['end_date']),
+            n_transactions=metadata['n_transactions'],
+            now=pd.Timestamp(metadata['now']).to_pydatetime()
+        )
+        for attribute, filename in cls._FEATHER_TABLES.items():
+            table = feather.read_table(os.path.join(path, filename), memory_map=memory_map)
+            # Pré-remplit le cache des cached_property : aucune régénération
+            snapshot.__dict__[attribute] = table.to_pandas(split_blocks=True)
+        snapshot.__dict__['transactions'] = snapshot.transactions.to_dict('records')
+        snapshot.__dict__['kpi_summary'] = metadata['kpi_summary']
+        return snapshot
+    
+    @staticmethod
+    def fingerprint(source, start_date='2023-01-01', n_transactions=100, end_date=None, **kwargs):
+        """Paramètres dont dépend un instantané (version, source, graine fixée, période au jour près)"""
+        simulator = getattr(source, 'simulator', source)
+        return {
+            'version': SNAPSHOT_VERSION,
+            'source': type(simulator).__name__,
+            # Graine tirée au hasard : n'importe quelle graine convient
+            'seed': str(simulator.seed) if getattr(simulator, 'seed_fixed', False) else None,
+            'start_date': str(pd.Timestamp(start_date)),
+            'end_date': str(pd.Timestamp(datetime.now() if end_date is None else end_date).date()),
+            'n_transactions': n_transactions
+        }
+    
+    @classmethod
+    def load_or_create(cls, path, simulator, **kwargs):
+        """Recharge l'instantané s'il correspond à la source et aux paramètres demandés,
+        sinon le (re)génère puis le publie pour les autres processus"""
+        expected = cls.fingerprint(simulator, **kwargs)
+        metadata_path = os.path.join(cls._published_path(path), 'snapshot.json')
+        stale = False
+        if os.path.exists(metadata_path):
+            with open(metadata_path, encoding='utf-8') as f:
+                saved = json.load(f).get('fingerprint') or {}
+            if expected['seed'] is None:
+                saved = {**saved, 'seed': None}
+            if saved == expected:
+                return cls.load(path, simulator=simulator)
+            stale = True
+        snapshot = simulator.snapshot(**kwargs)
+        snapshot.save(path, overwrite=stale)
+        return snapshot
@@ -0,0 +1,277 @@
+# NinjaGBHFraud.py - Score de fraude par IsolationForest, par lots, avec cache par lot
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from NinjaGBHData import NinjaGBHDataSimulator
+
+# Variables du modèle, dérivées de chaque transaction
+FEATURES = ['Log_montant', 'Ecart_type_op', 'Ecart_magasin', 'Heure', 'Jour_semaine']
+
+# Emplacements par défaut du modèle entraîné et du cache des lots notés
+MODEL_PATH = 'ninja_fraud_model.joblib'
+CACHE_DIR = 'ninja_fraud_scores'
+
+# Tailles par défaut, communes à la ligne de commande et à DashIA : un lancement préalable
+# du script remplit le cache que le tableau de bord relit sans rien noter
+DEFAULT_SEED = 42
+DEFAULT_HISTORY = 100000
+DEFAULT_BATCHES = 5
+DEFAULT_BATCH_SIZE = 50000
+
+# Colonnes conservées dans le cache des lots notés
+SCORED_COLUMNS = [
+    'Timestamp', 'Type', 'Catégorie', 'Magasin', 'Territoire', 'Montant',
+    'ID_Transaction', 'ID_Client', 'Score_fraude', 'Suspecte'
+]
+
+
+def _score_chunk(model, features):
+    """Score d'un bloc (plus il est élevé, plus la transaction est isolée)"""
+    return -model.score_samples(features)
+
+
+class FraudScorer:
+    """IsolationForest entraîné sur l'historique des transactions
+
+    Le montant est comparé à la médiane (échelle log) de son type d'opération et de
+    son couple magasin × catégorie, appris à l'entraînement : une même dépense n'a
+    pas le même sens à Wallis et à Paris. Le seuil de suspicion est le quantile
+    ``1 - contamination`` des scores d'entraînement.
+    """
+
+    def __init__(self, n_estimators=200, max_samples=256, contamination=0.001, n_jobs=-1, random_state=0):
+        self.n_estimators = n_estimators
+        self.max_samples = max_samples
+        self.contamination = contamination
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.model = None
+        self.threshold = None
+        self.type_medians = None
+        self.store_medians = None
+        self.fingerprint = None
+
+    @staticmethod
+    def _store_keys(frame):
+        return frame['Magasin'].astype(str) + '|' + frame['Catégorie'].astype(str)
+
+    def features(self, frame):
+        """Matrice des variables du modèle pour un lot de transactions"""
+        log_amount = np.log1p(np.abs(frame['Montant'].to_numpy(dtype=np.float64)))
+        # Type ou magasin inconnu à l'entraînement : écart nul plutôt qu'une valeur manquante
+        type_median = frame['Type'].astype(str).map(self.type_medians).to_numpy(dtype=np.float64)
+        store_median = self._store_keys(frame).map(self.store_medians).to_numpy(dtype=np.float64)
+        times = pd.to_datetime(frame['Timestamp'].to_numpy(dtype=np.int64), unit='ns')
+        return np.column_stack([
+            log_amount,
+            np.nan_to_num(log_amount - type_median),
+            np.nan_to_num(log_amount - store_median),
+            times.hour + times.minute / 60,
+            times.dayofweek
+        ])
+
+    def fit(self, history):
+        """Apprend les médianes de référence puis la forêt sur l'historique"""
+        from sklearn.ensemble import IsolationForest
+
+        log_amount = pd.Series(np.log1p(np.abs(history['Montant'].to_numpy(dtype=np.float64))))
+        self.type_medians = log_amount.groupby(history['Type'].astype(str).to_numpy()).median().to_dict()
+        self.store_medians = log_amount.groupby(self._store_keys(history).to_numpy()).median().to_dict()
+
+        features = self.features(history)
+        self.model = IsolationForest(
+            n_estimators=self.n_estimators,
+            max_samples=self.max_samples,
+            random_state=self.random_state,
+            n_jobs=self.n_jobs
+        ).fit(features)
+        self.threshold = float(np.quantile(_score_chunk(self.model, features), 1 - self.contamination))
+        # Empreinte du modèle : un cache de lots noté par un autre modèle est invalidé
+        params = [self.n_estimators, self.max_samples, self.contamination, self.random_state, len(history), self.threshold]
+        self.fingerprint = hashlib.sha1(json.dumps(params).encode('utf-8')).hexdigest()[:16]
+        return self
+
+    def score(self, frame, chunk_size=50000):
+        """Scores d'un lot, calculés par blocs de ``chunk_size`` lignes sur ``n_jobs`` processus"""
+        from joblib import Parallel, delayed
+
+        if self.model is None:
+            raise ValueError("Modèle non entraîné : appeler fit() ou FraudScorer.load()")
+        features = self.features(frame)
+        chunks = [features[i:i + chunk_size] for i in range(0, len(features), chunk_size)]
+        if len(chunks) <= 1:
+            return _score_chunk(self.model, features)
+        scores = Parallel(n_jobs=self.n_jobs)(delayed(_score_chunk)(self.model, chunk) for chunk in chunks)
+        return np.concatenate(scores)
+
+    def save(self, path=MODEL_PATH):
+        import joblib
+        joblib.dump(self, path)
+        return path
+
+    @classmethod
+    def load(cls, path=MODEL_PATH):
+        import joblib
+        return joblib.load(path)
+
+
+class ScoredBatches:
+    """Lots notés mis en cache sur disque (un fichier Parquet par identifiant de lot)
+
+    Un lot déjà noté n'est jamais re-noté. Le nombre de lignes et de transactions
+    suspectes de chaque lot est tenu dans un index : une page de résultats ne lit
+    que les lots qu'elle recouvre. L'index porte l'empreinte du modèle ; un cache
+    noté par un autre modèle est vidé à l'ouverture.
+    """
+
+    def __init__(self, scorer, cache_dir=CACHE_DIR):
+        self.scorer = scorer
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index_path = os.path.join(cache_dir, '_index.json')
+        self.index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding='utf-8') as f:
+                saved = json.load(f)
+            if saved.get('model') == getattr(scorer, 'fingerprint', None):
+                self.index = saved['batches']
+            else:
+                for name in os.listdir(cache_dir):
+                    if name.endswith('.parquet'):
+                        os.remove(os.path.join(cache_dir, name))
+                self._write_index()
+
+    def _path(self, batch_id):
+        return os.path.join(self.cache_dir, f"{batch_id}.parquet")
+
+    def _write_index(self):
+        # Fichier temporaire puis remplacement atomique : un lecteur ne voit jamais d'index tronqué
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'model': getattr(self.scorer, 'fingerprint', None), 'batches': self.index},
+                      f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def __contains__(self, batch_id):
+        return batch_id in self.index and os.path.exists(self._path(batch_id))
+
+    def score_batch(self, batch_id, transactions):
+        """Note un lot (ou relit son résultat en cache) ; retourne le DataFrame noté"""
+        if batch_id in self:
+            return self.batch(batch_id)
+        frame = pd.DataFrame(transactions).reset_index(drop=True)
+        scores = self.scorer.score(frame)
+        frame = frame[[c for c in SCORED_COLUMNS if c in frame.columns]].assign(
+            Score_fraude=scores,
+            Suspecte=scores >= self.scorer.threshold
+        )
+        # Lignes suspectes en tête, par score décroissant, pour paginer sans trier à la lecture
+        frame = frame.sort_values(['Suspecte', 'Score_fraude'], ascending=False, ignore_index=True)
+        tmp_path = f"{self._path(batch_id)}.tmp"
+        frame.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, self._path(batch_id))
+        self.index[batch_id] = {'rows': len(frame), 'suspicious': int(frame['Suspecte'].sum())}
+        self._write_index()
+        return frame
+
+    def batch(self, batch_id, columns=None):
+        return pd.read_parquet(self._path(batch_id), columns=columns)
+
+    def summary(self, batch_ids=None):
+        """Lignes et transactions suspectes par lot (tous les lots en cache par défaut)"""
+        batch_ids = list(self.index) if batch_ids is None else batch_ids
+        return pd.DataFrame.from_dict(
+            {b: self.index[b] for b in batch_ids}, orient='index', columns=['rows', 'suspicious']
+        ).rename_axis('batch_id')
+
+    def page(self, page=1, page_size=50, suspicious_only=True, batch_ids=None):
+        """Page de résultats (mêmes clés que la pagination du flux NinjaFeed)"""
+        key = 'suspicious' if suspicious_only else 'rows'
+        batch_ids = list(self.index) if batch_ids is None else batch_ids
+        counts = np.array([self.index[b][key] for b in batch_ids], dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        total = int(offsets[-1])
+        start, stop = (page - 1) * page_size, min(page * page_size, total)
+
+        parts = []
+        if start < stop:
+            # Lots recouverts par [start, stop) : recherche dichotomique sur les effectifs cumulés
+            first = np.searchsorted(offsets, start, side='right') - 1
+            last = np.searchsorted(offsets, stop, side='left')
+            for i in range(first, last):
+                lo, hi = max(start, offsets[i]) - offsets[i], min(stop, offsets[i + 1]) - offsets[i]
+                parts.append(self.batch(batch_ids[i]).iloc[lo:hi].assign(Lot=batch_ids[i]))
+        items = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=SCORED_COLUMNS + ['Lot'])
+        return {
+            'items': items,
+            'page': page,
+            'page_size': page_size,
+            'total': total,
+            'pages': max(1, -(-total // page_size))
+        }
+
+
+def load_or_train(simulator, path=MODEL_PATH, n_history=DEFAULT_HISTORY, n_jobs=-1):
+    """Modèle persisté s'il existe, sinon entraîné sur l'historique simulé puis sauvegardé"""
+    if os.path.exists(path):
+        scorer = FraudScorer.load(path)
+        scorer.n_jobs = n_jobs
+        return scorer
+    scorer = FraudScorer(n_jobs=n_jobs).fit(simulator.generate_transactions_frame(n_history))
+    scorer.save(path)
+    return scorer
+
+
+def score_simulated_batches(batches, simulator, seed, n_batches=DEFAULT_BATCHES, batch_size=DEFAULT_BATCH_SIZE):
+    """Note les lots simulés ``lot-<graine>-<taille>-<i>`` absents du cache ; retourne leurs identifiants"""
+    batch_ids = []
+    for i in range(n_batches):
+        batch_id = f"lot-{seed}-{batch_size}-{i:05d}"
+        batch_ids.append(batch_id)
+        if batch_id in batches:
+            continue
+        # Chaque lot a son propre flux aléatoire : un même identifiant désigne toujours les mêmes transactions
+        rng = np.random.default_rng([seed, i])
+        batches.score_batch(batch_id, simulator.generate_transactions_frame(batch_size, rng=rng))
+    return batch_ids
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Entraînement et notation par lots du modèle de fraude")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help="Graine du simulateur")
+    parser.add_argument('--history', type=int, default=DEFAULT_HISTORY, help="Transactions d'entraînement")
+    parser.add_argument('--batches', type=int, default=DEFAULT_BATCHES, help="Nombre de lots à noter")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="Transactions par lot")
+    parser.add_argument('--model', default=MODEL_PATH, help="Fichier du modèle")
+    parser.add_argument('--cache', default=CACHE_DIR, help="Répertoire du cache des lots")
+    parser.add_argument('--jobs', type=int, default=-1, help="Processus de notation (-1 = tous les cœurs)")
+    args = parser.parse_args(argv)
+
+    simulator = NinjaGBHDataSimulator(args.seed)
+    started = time.perf_counter()
+    trained = not os.path.exists(args.model)
+    scorer = load_or_train(simulator, args.model, args.history, args.jobs)
+    if trained:
+        print(f"🌲 Modèle entraîné sur {args.history:,} transactions en {time.perf_counter() - started:.1f}s")
+    else:
+        print(f"📦 Modèle chargé depuis {args.model}")
+
+    batches = ScoredBatches(scorer, args.cache)
+    batch_ids = score_simulated_batches(batches, simulator, args.seed, args.batches, args.batch_size)
+
+    summary = batches.summary(batch_ids)
+    elapsed = time.perf_counter() - started
+    print(f"✅ {summary['rows'].sum():,} transactions notées, {summary['suspicious'].sum():,} suspectes ({elapsed:.1f}s)")
+
+
+if __name__ == '__main__':
+    # Exécuté via le module importable : le modèle sauvegardé référence NinjaGBHFraud.FraudScorer
+    # et non __main__.FraudScorer, introuvable depuis DashIA
+    import NinjaGBHFraud
+    NinjaGBHFraud.main()
@@ -0,0 +1,302 @@
+# NinjaGBHLive.py - Agrégats glissants du flux de transactions en direct
+import threading
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from NinjaGBHData import TERRITORY_TYPES
+
+# Fenêtres glissantes suivies par défaut (minutes)
+DEFAULT_WINDOWS = (1, 5, 15, 60)
+
+# Seuil fixe des transactions « haute valeur » (€, en valeur absolue), utilisé
+# seulement pour les lots non annotés par un AnomalyDetector
+HIGH_VALUE_THRESHOLD = 10000
+
+# Clé des profils de montants suivis par AnomalyDetector
+ANOMALY_KEY_COLUMNS = ('Territoire', 'Magasin', 'Catégorie')
+
+
+class AnomalyDetector:
+    """Score d'anomalie en ligne par magasin × catégorie (EWMA de moyenne et variance)
+
+    Chaque profil garde la moyenne et le second moment exponentiellement pondérés
+    de log(1 + |Montant|) ; une transaction est anormale si son écart réduit dépasse
+    ``threshold``. Un micro-lot est noté contre l'état antérieur puis intégré en une
+    passe vectorisée : le poids de chaque événement dépend de son rang dans son
+    profil, ce qui équivaut exactement à une mise à jour événement par événement.
+    """
+
+    def __init__(self, alpha=0.02, threshold=4.0, warmup=30, key_columns=ANOMALY_KEY_COLUMNS, keep=200):
+        self.alpha = alpha
+        self.threshold = threshold
+        self.warmup = warmup
+        self.key_columns = list(key_columns)
+        self.profiles = {}
+        self.count = np.zeros(0, dtype=np.int64)
+        self.moment1 = np.zeros(0)
+        self.moment2 = np.zeros(0)
+        self.flagged = deque(maxlen=keep)
+        self.total_flagged = 0
+
+    def _rows(self, frame):
+        """Indice de profil de chaque transaction (les nouveaux profils sont créés)"""
+        keys = frame[self.key_columns[0]].astype(str).to_numpy()
+        for column in self.key_columns[1:]:
+            keys = keys + '|' + frame[column].astype(str).to_numpy()
+        codes, uniques = pd.factorize(keys)
+        for key in uniques:
+            if key not in self.profiles:
+                self.profiles[key] = len(self.profiles)
+        n_profiles = len(self.profiles)
+        if n_profiles > len(self.count):
+            grow = n_profiles - len(self.count)
+            self.count = np.concatenate((self.count, np.zeros(grow, dtype=np.int64)))
+            self.moment1 = np.concatenate((self.moment1, np.zeros(grow)))
+            self.moment2 = np.concatenate((self.moment2, np.zeros(grow)))
+        lookup = np.fromiter((self.profiles[key] for key in uniques), dtype=np.int64, count=len(uniques))
+        return lookup[codes]
+
+    def _score(self, values, rows):
+        count = self.count[rows]
+        # Correction du biais de démarrage des moyennes exponentielles (état initial nul)
+        weight = 1.0 - (1.0 - self.alpha) ** count
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = self.moment1[rows] / weight
+            variance = np.maximum(self.moment2[rows] / weight - mean ** 2, 1e-6)
+            scores = (values - mean) / np.sqrt(variance)
+        return np.where(count >= self.warmup, scores, np.nan)
+
+    def _learn(self, values, rows):
+        decay = 1.0 - self.alpha
+        n_profiles = len(self.count)
+        order = np.argsort(rows, kind='stable')
+        sorted_rows = rows[order]
+        sizes = np.bincount(rows, minlength=n_profiles)
+        starts = np.cumsum(sizes) - sizes
+        # Rang (0..n-1) de chaque événement dans son profil, dans l'ordre d'arrivée
+        ranks = np.empty(len(rows), dtype=np.int64)
+        ranks[order] = np.arange(len(rows)) - starts[sorted_rows]
+        weights = self.alpha * decay ** (sizes[rows] - 1 - ranks)
+        self.moment1 = decay ** sizes * self.moment1 + np.bincount(rows, weights * values, n_profiles)
+        self.moment2 = decay ** sizes * self.moment2 + np.bincount(rows, weights * values ** 2, n_profiles)
+        self.count += sizes
+
+    def annotate(self, transactions):
+        """Note un micro-lot puis l'intègre ; ajoute les colonnes Score_anomalie et Anomalie"""
+        frame = pd.DataFrame(transactions)
+        if frame.empty:
+            return frame.assign(Score_anomalie=np.zeros(0), Anomalie=np.zeros(0, dtype=bool))
+        values = np.log1p(np.abs(frame['Montant'].to_numpy(dtype=np.float64)))
+        rows = self._rows(frame)
+        scores = self._score(values, rows)
+        self._learn(values, rows)
+
+        flags = np.abs(np.nan_to_num(scores)) > self.threshold
+        frame = frame.assign(Score_anomalie=scores, Anomalie=flags)
+        if flags.any():
+            self.flagged.extend(frame[flags].to_dict('records'))
+            self.total_flagged += int(flags.sum())
+        return frame
+
+    def recent(self, n=20):
+        """Les ``n`` dernières transactions signalées (la plus récente en tête)"""
+        return pd.DataFrame(list(self.flagged)[::-1][:n])
+
+    def profile(self):
+        """Moyenne et écart-type courants (échelle log) de chaque profil"""
+        weight = 1.0 - (1.0 - self.alpha) ** self.count
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = self.moment1 / weight
+            std = np.sqrt(np.maximum(self.moment2 / weight - mean ** 2, 0.0))
+        keys = [key.split('|') for key in self.profiles]
+        frame = pd.DataFrame(keys, columns=self.key_columns)
+        return frame.assign(Nombre=self.count, Moyenne_log=mean, Ecart_type_log=std)
+
+
+class SlidingWindowAggregator:
+    """Compteurs glissants sur 1/5/15/60 minutes, indexés par l'heure de l'événement
+
+    Les événements sont cumulés dans un anneau d'intervalles de ``slot_seconds``
+    couvrant la plus grande fenêtre. Chaque fenêtre garde ses totaux courants :
+    un événement les met à jour en O(1) et les intervalles expirés n'en sont
+    soustraits qu'au moment où l'horloge avance (éviction paresseuse). Le coût ne
+    dépend donc pas du débit du flux.
+    """
+
+    def __init__(self, windows=DEFAULT_WINDOWS, slot_seconds=5, high_value=HIGH_VALUE_THRESHOLD,
+                 territory_types=TERRITORY_TYPES):
+        self.windows = tuple(sorted(windows))
+        self.slot_ns = int(slot_seconds * 1_000_000_000)
+        self.high_value = high_value
+        self.territory_types = list(territory_types)
+        self.widths = {w: int(w * 60 * 1_000_000_000 // self.slot_ns) for w in self.windows}
+
+        # Vecteur par intervalle : nombre, somme, anomalies, puis nombre et somme par type
+        n_types = len(self.territory_types)
+        self.n_features = 3 + 2 * n_types
+        self.n_slots = max(self.widths.values()) + 1
+        self.ring = np.zeros((self.n_slots, self.n_features))
+        self.ring_slot = np.full(self.n_slots, -1, dtype=np.int64)
+        self.totals = {w: np.zeros(self.n_features) for w in self.windows}
+        self.head = None
+        self.total_events = 0
+        self._lock = threading.Lock()
+
+    def _features(self, amounts, type_codes, flags=None):
+        n_types = len(self.territory_types)
+        features = np.zeros((len(amounts), self.n_features))
+        features[:, 0] = 1.0
+        features[:, 1] = amounts
+        features[:, 2] = np.abs(amounts) > self.high_value if flags is None else flags
+        known = type_codes >= 0
+        rows = np.flatnonzero(known)
+        features[rows, 3 + type_codes[known]] = 1.0
+        features[rows, 3 + n_types + type_codes[known]] = amounts[known]
+        return features
+
+    def _advance(self, slot):
+        """Avance l'horloge jusqu'à ``slot`` : soustrait les intervalles sortis de chaque fenêtre"""
+        if self.head is None or slot - self.head >= self.n_slots:
+            # Premier lot, ou saut plus long que l'anneau (flux inactif) : tout a expiré.
+            # Chaque case reçoit son intervalle pour que les événements antérieurs du lot
+            # soient soustraits à leur expiration
+            for totals in self.totals.values():
+                totals[:] = 0.0
+            self.ring[:] = 0.0
+            fresh = np.arange(slot - self.n_slots + 1, slot + 1)
+            self.ring_slot[fresh % self.n_slots] = fresh
+            self.head = slot
+            return
+        if slot <= self.head:
+            return
+        for w, width in self.widths.items():
+            # Intervalles (head - width, slot - width] : sortent de la fenêtre w
+            for expired in range(self.head - width + 1, slot - width + 1):
+                index = expired % self.n_slots
+                if self.ring_slot[index] == expired:
+                    self.totals[w] -= self.ring[index]
+        # Recyclage des cases de l'anneau pour les nouveaux intervalles
+        for fresh in range(max(self.head + 1, slot - self.n_slots + 1), slot + 1):
+            index = fresh % self.n_slots
+            self.ring[index] = 0.0
+            self.ring_slot[index] = fresh
+        self.head = slot
+
+    def add_batch(self, timestamps, amounts, territory_types, flags=None):
+        """Ajoute un micro-lot (horodatages int64 ns, montants, types de territoire)
+
+        ``flags`` marque les transactions anormales ; à défaut, le seuil ``high_value``.
+        """
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        if len(timestamps) == 0:
+            return 0
+        amounts = np.asarray(amounts, dtype=np.float64)
+        type_codes = pd.Categorical(np.asarray(territory_types), categories=self.territory_types).codes
+        slots = timestamps // self.slot_ns
+        features = self._features(amounts, type_codes.astype(np.int64), flags)
+
+        with self._lock:
+            self._advance(int(slots.max()))
+            # Événements plus anciens que la plus grande fenêtre : ignorés
+            live = slots > self.head - self.n_slots + 1
+            if not live.all():
+                slots, features = slots[live], features[live]
+            np.add.at(self.ring, slots % self.n_slots, features)
+            for w, width in self.widths.items():
+                inside = slots > self.head - width
+                self.totals[w] += features[inside].sum(axis=0)
+            self.total_events += len(slots)
+        return len(slots)
+
+    def add(self, timestamp, amount, territory_type):
+        """Ajoute un événement isolé"""
+        return self.add_batch([timestamp], [amount], [territory_type])
+
+    def add_frame(self, transactions):
+        """Ajoute un lot de transactions (DataFrame en colonnes ou liste de dicts)"""
+        frame = pd.DataFrame(transactions)
+        if frame.empty:
+            return 0
+        flags = frame['Anomalie'].to_numpy() if 'Anomalie' in frame.columns else None
+        return self.add_batch(frame['Timestamp'], frame['Montant'], frame['Type_Territoire'], flags)
+
+    def window(self, minutes, now=None):
+        """Totaux d'une fenêtre se terminant à ``now`` (les intervalles expirés sont évincés)"""
+        with self._lock:
+            if now is not None:
+                self._advance(int(pd.Timestamp(now).value // self.slot_ns))
+            totals = self.totals[minutes].copy()
+
+        n_types = len(self.territory_types)
+        # Arrondi : les soustractions successives laissent un bruit flottant
+        totals = np.round(totals, 6)
+        distribution = pd.DataFrame({
+            'Montant': totals[3 + n_types:],
+            'Timestamp': totals[3:3 + n_types].astype(np.int64)
+        }, index=pd.Index(self.territory_types, name='Type_Territoire'))
+        return {
+            'count': int(totals[0]),
+            'revenue': totals[1],
+            'anomaly_count': int(totals[2]),
+            'territory_distribution': distribution[distribution['Timestamp'] > 0]
+        }
+
+    def stats(self, now=None):
+        """Totaux de toutes les fenêtres : {minutes: totaux}"""
+        now = datetime.now() if now is None else now
+        return {minutes: self.window(minutes, now) for minutes in self.windows}
+
+
+class LiveTransactionFeed:
+    """Flux simulé rattrapé jusqu'à l'heure courante à chaque lecture
+
+    Les micro-lots de ``stream_transactions`` sont consommés sans attente jusqu'à
+    maintenant, annotés par le détecteur d'anomalies puis transmis aux consommateurs
+    nommés (tout objet doté de ``add_frame``) ; les derniers lots restent disponibles
+    pour l'affichage des transactions récentes. Les lectures concurrentes se font
+    sous ``feed.lock``.
+    """
+
+    def __init__(self, simulator, events_per_second=20, batch_seconds=5.0, warmup_minutes=60,
+                 consumers=None, keep_batches=64, detector=None):
+        self.batch_ns = int(batch_seconds * 1_000_000_000)
+        self.clock = pd.Timestamp(datetime.now()).value - warmup_minutes * 60_000_000_000
+        self.batches = simulator.stream_transactions(
+            events_per_second=events_per_second, batch_seconds=batch_seconds,
+            start=pd.Timestamp(self.clock), realtime=False
+        )
+        self.detector = detector or AnomalyDetector()
+        self.window = SlidingWindowAggregator()
+        self.consumers = {'window': self.window, **(consumers or {})}
+        self.recent_batches = deque(maxlen=keep_batches)
+        self.lock = threading.RLock()
+
+    def poll(self, now=None):
+        """Consomme les micro-lots dont l'intervalle est terminé ; retourne le nombre d'événements"""
+        now = pd.Timestamp(datetime.now() if now is None else now).value
+        events = 0
+        with self.lock:
+            while self.clock + self.batch_ns <= now:
+                batch = self.detector.annotate(next(self.batches))
+                self.clock += self.batch_ns
+                for consumer in self.consumers.values():
+                    consumer.add_frame(batch)
+                self.recent_batches.append(batch)
+                events += len(batch)
+        return events
+
+    def recent(self, n=20):
+        """Les ``n`` transactions les plus récentes (Timestamp décroissant)"""
+        with self.lock:
+            batches, rows = [], 0
+            for batch in reversed(self.recent_batches):
+                batches.append(batch)
+                rows += len(batch)
+                if rows >= n:
+                    break
+        if not batches:
+            return pd.DataFrame()
+        return pd.concat(batches[::-1], ignore_index=True).iloc[::-1].head(n).reset_index(drop=True)
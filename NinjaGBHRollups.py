@@ -0,0 +1,159 @@
+# NinjaGBHRollups.py - Agrégats matérialisés jour/semaine/mois, mis à jour incrémentalement
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Granularités temporelles : chaque date est ramenée au début de son seau
+GRAINS = ['day', 'week', 'month']
+
+# Niveaux d'agrégation (colonnes clés, du plus fin au plus agrégé)
+LEVELS = {
+    'store': ['Type', 'Territoire', 'Magasin'],
+    'territory': ['Type', 'Territoire'],
+    'type': ['Type'],
+    'group': []
+}
+
+
+def bucket_starts(dates, grain):
+    """Début du jour, de la semaine (lundi) ou du mois de chaque date, vectorisé"""
+    days = pd.DatetimeIndex(dates).to_numpy().astype('datetime64[D]')
+    if grain == 'day':
+        return days
+    if grain == 'week':
+        # 1970-01-01 est un jeudi : (jours + 3) % 7 donne 0 pour un lundi
+        return days - (days.astype(np.int64) + 3) % 7
+    if grain == 'month':
+        return days.astype('datetime64[M]').astype('datetime64[D]')
+    raise ValueError(f"Granularité inconnue : {grain}")
+
+
+class Rollup:
+    """Agrégats par (seau temporel, clé) pour chaque granularité et niveau
+
+    ``update`` n'agrège que le bloc reçu puis l'ajoute aux seaux existants : le coût
+    dépend de la taille du bloc, et la lecture du nombre de seaux, jamais du nombre
+    de faits déjà ingérés. Chaque seau garde les sommes, le nombre de lignes et
+    l'ensemble de ses jours : un jour réparti sur plusieurs blocs n'est compté
+    qu'une fois dans ``Jours``.
+    """
+
+    def __init__(self, time_column, measures, levels=('store', 'territory', 'type', 'group'), key_columns=None):
+        self.time_column = time_column
+        self.measures = list(measures)
+        self.levels = list(levels)
+        # Renommage des colonnes sources vers les clés de LEVELS (ex. Type_Territoire → Type)
+        self.key_columns = key_columns or {}
+        self.columns = self.measures + ['Lignes', 'Jours']
+        self.buckets = {(grain, level): {} for grain in GRAINS for level in self.levels}
+        self.days = {(grain, level): {} for grain in GRAINS for level in self.levels}
+        self.watermark = None
+        # Un même rollup peut être partagé entre sessions (st.cache_resource)
+        self._lock = threading.Lock()
+
+    def update(self, frame, since_watermark=False):
+        """Ajoute un bloc de faits ; since_watermark ignore les dates déjà ingérées"""
+        if frame is None or len(frame) == 0:
+            return 0
+        frame = pd.DataFrame(frame).rename(columns=self.key_columns)
+        times = pd.to_datetime(frame[self.time_column])
+        with self._lock:
+            if since_watermark and self.watermark is not None:
+                keep = (times > self.watermark).to_numpy()
+                frame, times = frame[keep], times[keep]
+                if len(frame) == 0:
+                    return 0
+            self._merge(frame, times)
+        return len(frame)
+
+    def _merge(self, frame, times):
+        days = times.to_numpy().astype('datetime64[D]')
+        values = frame[self.measures].to_numpy(dtype=np.float64)
+        for grain in GRAINS:
+            buckets = bucket_starts(times, grain)
+            for level in self.levels:
+                keys = LEVELS[level]
+                grouped = pd.DataFrame(values, columns=self.measures).assign(
+                    _bucket=buckets,
+                    _day=days,
+                    **{key: frame[key].astype(str).to_numpy() for key in keys}
+                ).groupby(['_bucket'] + keys, sort=False, observed=True)
+                sums = grouped[self.measures].sum()
+                sums['Lignes'] = grouped.size()
+                block_days = grouped['_day'].unique()
+
+                table = self.buckets[(grain, level)]
+                seen = self.days[(grain, level)]
+                for key, row, bucket_days in zip(sums.index, sums.to_numpy(), block_days.to_numpy()):
+                    key = key if isinstance(key, tuple) else (key,)
+                    if key in table:
+                        table[key] += row
+                    else:
+                        table[key] = row.copy()
+                    # Jours distincts : union avec les jours déjà vus du seau
+                    seen.setdefault(key, set()).update(bucket_days.tolist())
+
+        latest = times.max()
+        self.watermark = latest if self.watermark is None else max(self.watermark, latest)
+
+    def table(self, grain='month', level='territory', start=None, end=None):
+        """Seaux d'une granularité et d'un niveau, éventuellement bornés dans le temps"""
+        keys = LEVELS[level]
+        with self._lock:
+            table = self.buckets[(grain, level)]
+            if not table:
+                return pd.DataFrame(columns=['Période'] + keys + self.columns)
+            index = pd.MultiIndex.from_tuples(list(table), names=['Période'] + keys)
+            seen = self.days[(grain, level)]
+            values = np.column_stack([
+                np.vstack(list(table.values())),
+                [len(seen[key]) for key in table]
+            ])
+        result = pd.DataFrame(values, index=index, columns=self.columns).reset_index()
+        result['Période'] = pd.to_datetime(result['Période'])
+        if start is not None:
+            result = result[result['Période'] >= bucket_starts([start], grain)[0]]
+        if end is not None:
+            result = result[result['Période'] <= pd.Timestamp(end)]
+        return result.sort_values(['Période'] + keys).reset_index(drop=True)
+
+    def mean(self, measure, grain='month', level='group', per='Jours', start=None, end=None):
+        """Moyenne d'une mesure par seau (par jour par défaut, ou par ligne avec per='Lignes')"""
+        table = self.table(grain, level, start, end)
+        table[f"{measure}_moyen"] = table[measure] / table[per]
+        return table
+
+
+class _TransactionsRollup(Rollup):
+    """Rollup des transactions : Timestamp en int64 ns et colonne Ventes dérivée du Montant"""
+
+    def update(self, frame, since_watermark=False):
+        if frame is None or len(frame) == 0:
+            return 0
+        # « Type » désigne ici le type de transaction : le niveau Type vient de Type_Territoire
+        frame = pd.DataFrame(frame).drop(columns=['Type'], errors='ignore')
+        if pd.api.types.is_integer_dtype(frame['Timestamp']):
+            frame['Timestamp'] = pd.to_datetime(frame['Timestamp'], unit='ns')
+        frame['Ventes'] = frame['Montant'].clip(lower=0)
+        return super().update(frame, since_watermark)
+
+
+def store_facts_rollup():
+    """Agrégats des faits magasin × jour × département (iter_store_daily_facts)"""
+    return Rollup('Date', ['CA', 'Marge', 'Clients', 'Transactions'])
+
+
+def transactions_rollup():
+    """Agrégats du flux de transactions (Montant signé, ventes seules et volume)"""
+    return _TransactionsRollup(
+        'Timestamp', ['Montant', 'Ventes'], key_columns={'Type_Territoire': 'Type'}
+    )
+
+
+def financial_rollup():
+    """Agrégats de la série financière quotidienne du groupe"""
+    return Rollup(
+        'Date', ['CA_Quotidien', 'Dépenses', 'Nouveaux_clients'], levels=('group',)
+    )
+
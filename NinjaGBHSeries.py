@@ -0,0 +1,96 @@
+# NinjaGBHSeries.py - Sommes sur fenêtres arbitraires à partir de séries cumulées
+import numpy as np
+import pandas as pd
+
+# Colonnes déjà cumulées par le simulateur (somme depuis le début de la série)
+CUMULATIVE_COLUMNS = ['Chiffre_d_affaires', 'Dépenses', 'Bénéfice_net']
+
+# Montant quotidien correspondant à une colonne cumulée, quand la série le fournit
+DAILY_COLUMNS = {'Chiffre_d_affaires': 'CA_Quotidien'}
+
+
+class RangeSeries:
+    """Sommes, moyennes et variations sur n'importe quelle fenêtre de dates en O(log n)
+
+    Chaque métrique est stockée sous forme de somme préfixe ``P`` : la somme des
+    lignes ``i..j`` vaut ``P[j + 1] - P[i]`` et les bornes se trouvent par
+    ``searchsorted`` sur les dates triées. Les colonnes de CUMULATIVE_COLUMNS sont
+    déjà des sommes préfixes ; les autres colonnes numériques sont cumulées une fois.
+
+    Une série filtrée par date commence en cours de cumul : ``P[0]`` vaut alors le
+    cumul de la première ligne moins son montant du jour (lu dans DAILY_COLUMNS,
+    sinon estimé par l'accroissement du lendemain).
+    """
+
+    def __init__(self, frame, date_column='Date', cumulative=CUMULATIVE_COLUMNS, daily=DAILY_COLUMNS):
+        frame = frame.sort_values(date_column) if not frame[date_column].is_monotonic_increasing else frame
+        self.dates = frame[date_column].to_numpy(dtype='datetime64[ns]')
+        self.prefix = {}
+        # Cumul antérieur à la première ligne, connu exactement quand le montant du jour est fourni
+        bases = {
+            column: float(frame[column].iloc[0] - frame[daily_column].iloc[0])
+            for column, daily_column in daily.items()
+            if column in frame.columns and daily_column in frame.columns and len(frame)
+        }
+        mid_series = any(not np.isclose(base, 0.0) for base in bases.values())
+        for column in frame.select_dtypes(include=[np.number]).columns:
+            values = frame[column].to_numpy(dtype=np.float64)
+            if column not in cumulative:
+                self.prefix[column] = np.concatenate(([0.0], np.cumsum(values)))
+                continue
+            base = bases.get(column, 0.0)
+            if column not in bases and mid_series and len(values) > 1:
+                base = values[0] - (values[1] - values[0])
+            self.prefix[column] = np.concatenate(([base], values))
+
+    def __len__(self):
+        return len(self.dates)
+
+    def _bounds(self, start=None, end=None):
+        """Indices [i, j) des lignes dont la date est dans [start, end]"""
+        i = 0 if start is None else np.searchsorted(self.dates, pd.Timestamp(start).to_datetime64(), side='left')
+        j = len(self.dates) if end is None else np.searchsorted(self.dates, pd.Timestamp(end).to_datetime64(), side='right')
+        return i, max(i, j)
+
+    def sum(self, metric, start=None, end=None):
+        """Somme d'une métrique sur [start, end] (bornes incluses, None = extrémité)"""
+        i, j = self._bounds(start, end)
+        prefix = self.prefix[metric]
+        return prefix[j] - prefix[i]
+
+    def count(self, start=None, end=None):
+        """Nombre de jours (lignes) dans la fenêtre"""
+        i, j = self._bounds(start, end)
+        return j - i
+
+    def mean(self, metric, start=None, end=None):
+        """Moyenne quotidienne d'une métrique sur la fenêtre"""
+        n = self.count(start, end)
+        return self.sum(metric, start, end) / n if n else np.nan
+
+    def ratio(self, numerator, denominator, start=None, end=None):
+        """Rapport de deux sommes sur la même fenêtre (ex. marge nette)"""
+        total = self.sum(denominator, start, end)
+        return self.sum(numerator, start, end) / total if total else np.nan
+
+    def trailing_window(self, days=1, end=None):
+        """Bornes (start, end) des ``days`` derniers jours se terminant à ``end``"""
+        end = pd.Timestamp(self.dates[-1] if end is None else end)
+        return end - pd.Timedelta(days=days) + pd.Timedelta(1, 'ns'), end
+
+    def trailing(self, metric, days=1, end=None):
+        """Somme sur les ``days`` derniers jours (par défaut jusqu'à la dernière date)"""
+        return self.sum(metric, *self.trailing_window(days, end))
+
+    def period_over_period(self, metric, start, end):
+        """Fenêtre [start, end] comparée à la fenêtre précédente de même durée"""
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        length = end - start + pd.Timedelta(1, 'ns')
+        current = self.sum(metric, start, end)
+        previous = self.sum(metric, start - length, start - pd.Timedelta(1, 'ns'))
+        return {
+            'current': current,
+            'previous': previous,
+            'delta': current - previous,
+            'delta_pct': (current - previous) / previous * 100 if previous else np.nan
+        }
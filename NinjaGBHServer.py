@@ -0,0 +1,288 @@
+# NinjaGBHServer.py - Serveur local de substitution du flux « société Ninja » et client asynchrone
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import numpy as np
+import pandas as pd
+
+from NinjaGBHData import NinjaGBHDataSimulator, format_transactions
+from NinjaGBHSources import frame_from_payload, frame_to_payload
+
+
+# ========== SERVEUR ==========
+class NinjaFeed:
+    """Données servies : un instantané du simulateur et un stock de transactions paginable"""
+
+    def __init__(self, seed=None, start_date='2023-01-01', n_transactions=100000):
+        self.simulator = NinjaGBHDataSimulator(seed)
+        self.snapshot = self.simulator.snapshot(start_date=start_date, n_transactions=0)
+        self.transactions = self.simulator.generate_transactions_frame(n_transactions)
+
+    def financial(self, start=None, end=None):
+        financial = self.snapshot.financial_data
+        dates = financial['Date'].to_numpy()
+        # Dates triées : la fenêtre est une simple tranche
+        first = 0 if start is None else np.searchsorted(dates, np.datetime64(pd.Timestamp(start)), side='left')
+        last = len(dates) if end is None else np.searchsorted(dates, np.datetime64(pd.Timestamp(end)), side='right')
+        return frame_to_payload(financial.iloc[first:last])
+
+    def transactions_page(self, page=1, page_size=1000):
+        total = len(self.transactions)
+        page, page_size = max(int(page), 1), min(max(int(page_size), 1), 50000)
+        rows = self.transactions.iloc[(page - 1) * page_size:page * page_size].copy()
+        rows['ID_Transaction'] = 'GBH' + rows['ID_Transaction'].astype(str)
+        for column in rows.select_dtypes('category').columns:
+            rows[column] = rows[column].astype(str)
+        return {
+            'items': rows.to_dict('records'),
+            'page': page,
+            'page_size': page_size,
+            'total': total,
+            'pages': (total + page_size - 1) // page_size
+        }
+
+
+class NinjaRequestHandler(BaseHTTPRequestHandler):
+    """Routes JSON : /financial, /territories, /transactions, /store_stats, /kpis"""
+
+    # HTTP/1.1 : connexions keep-alive réutilisables par les clients
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        feed = self.server.feed
+
+        try:
+            if url.path == '/financial':
+                body = feed.financial(params.get('start'), params.get('end'))
+            elif url.path == '/territories':
+                body = frame_to_payload(feed.snapshot.territory_data)
+            elif url.path == '/store_stats':
+                body = frame_to_payload(feed.snapshot.store_stats)
+            elif url.path == '/kpis':
+                body = feed.snapshot.kpi_summary
+            elif url.path == '/transactions':
+                body = feed.transactions_page(params.get('page', 1), params.get('page_size', 1000))
+            elif url.path == '/health':
+                body = {'status': 'ok'}
+            else:
+                self._send(404, {'error': f"Route inconnue : {url.path}"})
+                return
+        except (ValueError, KeyError) as e:
+            self._send(400, {'error': str(e)})
+            return
+        self._send(200, body)
+
+    def _send(self, status, body):
+        payload = json.dumps(body, ensure_ascii=False, default=float).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        # Pas de journal par requête : le serveur sert de banc de mesure
+        pass
+
+
+def create_server(host='127.0.0.1', port=8765, seed=None, n_transactions=100000):
+    """Crée (sans le démarrer) le serveur de substitution du flux Ninja"""
+    server = ThreadingHTTPServer((host, port), NinjaRequestHandler)
+    server.daemon_threads = True
+    server.feed = NinjaFeed(seed=seed, n_transactions=n_transactions)
+    return server
+
+
+def serve_in_background(host='127.0.0.1', port=0, seed=None, n_transactions=100000):
+    """Démarre le serveur dans un thread ; retourne (serveur, URL de base)"""
+    server = create_server(host, port, seed, n_transactions)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+# ========== CLIENT ASYNCHRONE ==========
+class AsyncNinjaClient:
+    """Client asyncio : pool de connexions keep-alive, pages concurrentes, reprises avec backoff"""
+
+    def __init__(self, base_url, pool_size=8, retries=3, backoff=0.2, timeout=10):
+        parsed = urlparse(base_url)
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self.prefix = parsed.path.rstrip('/')
+        self.retries, self.backoff, self.timeout = retries, backoff, timeout
+        self.pool_size = pool_size
+        self._idle = []
+        self._slots = None
+
+    async def _acquire(self):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.pool_size)
+        await self._slots.acquire()
+        if self._idle:
+            return self._idle.pop()
+        try:
+            return await asyncio.open_connection(self.host, self.port)
+        except BaseException:
+            # Connexion refusée ou annulée (timeout) : la place du pool est rendue
+            self._slots.release()
+            raise
+
+    def _release(self, connection, reusable):
+        if reusable:
+            self._idle.append(connection)
+        else:
+            connection[1].close()
+        self._slots.release()
+
+    async def _request(self, path):
+        reader, writer = connection = await self._acquire()
+        reusable = False
+        try:
+            writer.write(
+                f"GET {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+                f"Accept: application/json\r\nConnection: keep-alive\r\n\r\n".encode('latin-1')
+            )
+            await writer.drain()
+
+            status_line = await reader.readline()
+            if not status_line:
+                raise ConnectionError("Connexion fermée par le serveur")
+            status = int(status_line.split()[1])
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                key, _, value = line.decode('latin-1').partition(':')
+                headers[key.strip().lower()] = value.strip()
+
+            body = await reader.readexactly(int(headers['content-length']))
+            reusable = headers.get('connection', '').lower() != 'close'
+            return status, body
+        finally:
+            self._release(connection, reusable)
+
+    async def get_json(self, endpoint, **params):
+        """GET JSON avec reprises (erreurs réseau et 5xx) et backoff exponentiel avec gigue"""
+        path = f"{self.prefix}/{endpoint}" + (f"?{urlencode(params)}" if params else '')
+        for attempt in range(self.retries + 1):
+            try:
+                status, body = await asyncio.wait_for(self._request(path), self.timeout)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+                error = e
+            else:
+                if status == 200:
+                    return json.loads(body)
+                error = ConnectionError(f"GET {path} → HTTP {status}")
+                # Erreur du client (4xx) : une nouvelle tentative donnerait la même réponse
+                if status < 500:
+                    raise error
+            if attempt < self.retries:
+                await asyncio.sleep(self.backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+        raise error
+
+    async def financial(self, start_date='2023-01-01', end_date=None):
+        end_date = datetime.now() if end_date is None else end_date
+        return frame_from_payload(await self.get_json(
+            'financial', start=str(pd.Timestamp(start_date).date()), end=str(pd.Timestamp(end_date).date())
+        ))
+
+    async def territories(self):
+        return frame_from_payload(await self.get_json('territories'))
+
+    async def store_stats(self):
+        return frame_from_payload(await self.get_json('store_stats'))
+
+    async def kpis(self):
+        return await self.get_json('kpis')
+
+    async def transactions(self, page_size=5000, max_pages=None):
+        """Récupère toutes les pages de transactions, les suivantes en parallèle"""
+        first = await self.get_json('transactions', page=1, page_size=page_size)
+        pages = first['pages'] if max_pages is None else min(first['pages'], max_pages)
+        rest = await asyncio.gather(*(
+            self.get_json('transactions', page=page, page_size=page_size) for page in range(2, pages + 1)
+        ))
+        items = first['items'] + [item for page in rest for item in page['items']]
+        return pd.DataFrame(items)
+
+    async def close(self):
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+
+async def run_benchmark(base_url, page_size=5000, pool_size=8, rounds=5, max_pages=None):
+    """Mesure la latence bout en bout (récupération → tableau prêt à afficher)"""
+    client = AsyncNinjaClient(base_url, pool_size=pool_size)
+    latencies, rows = [], 0
+    try:
+        for _ in range(rounds):
+            started = time.perf_counter()
+            financial, territories, kpis, transactions = await asyncio.gather(
+                client.financial(), client.territories(), client.kpis(),
+                client.transactions(page_size=page_size, max_pages=max_pages)
+            )
+            # « Rendu » : agrégats des cartes KPI et table des 20 dernières transactions
+            transactions.groupby('Type_Territoire')['Montant'].sum()
+            format_transactions(transactions, limit=20, amounts=True)
+            latencies.append(time.perf_counter() - started)
+            rows += len(transactions)
+    finally:
+        await client.close()
+
+    latencies = np.array(latencies)
+    return {
+        'rounds': rounds,
+        'p50_s': float(np.percentile(latencies, 50)),
+        'p95_s': float(np.percentile(latencies, 95)),
+        'rows_per_s': rows / float(latencies.sum())
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Flux Ninja local : serveur JSON et banc de mesure")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve = commands.add_parser('serve', help="Démarre le serveur")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--seed', type=int, default=None)
+    serve.add_argument('--transactions', type=int, default=100000)
+
+    bench = commands.add_parser('bench', help="Mesure la latence récupération → rendu")
+    bench.add_argument('--url', default=None, help="Serveur existant (sinon un serveur local est démarré)")
+    bench.add_argument('--page-size', type=int, default=5000)
+    bench.add_argument('--pool-size', type=int, default=8)
+    bench.add_argument('--rounds', type=int, default=5)
+    bench.add_argument('--transactions', type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        server = create_server(args.host, args.port, args.seed, args.transactions)
+        print(f"🥷 Flux Ninja local sur http://{args.host}:{args.port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.shutdown()
+    else:
+        server = None
+        url = args.url
+        if url is None:
+            server, url = serve_in_background(n_transactions=args.transactions)
+        results = asyncio.run(run_benchmark(url, args.page_size, args.pool_size, args.rounds))
+        print(json.dumps(results, indent=2))
+        if server is not None:
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
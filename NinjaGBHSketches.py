@@ -0,0 +1,461 @@
+# NinjaGBHSketches.py - Résumés probabilistes fusionnables du flux de transactions
+import numpy as np
+import pandas as pd
+
+# Quantiles affichés par défaut
+DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+
+
+class TDigest:
+    """t-digest fusionnable : quantiles approchés en mémoire bornée
+
+    Les valeurs sont regroupées en centroïdes (moyenne, poids) d'autant plus fins
+    qu'ils sont proches des extrémités, où la précision compte le plus. Ajouts et
+    fusions concatènent les centroïdes puis recompressent, en NumPy vectorisé ; le
+    nombre de centroïdes reste de l'ordre de ``compression``.
+    """
+
+    def __init__(self, compression=200, buffer_size=None):
+        self.compression = compression
+        self.buffer_size = buffer_size or 10 * compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min, self.max = np.inf, -np.inf
+        self._buffer = []
+        self._buffered = 0
+
+    @property
+    def count(self):
+        return float(self.weights.sum()) + self._buffered
+
+    def update(self, values):
+        """Ajoute un lot de valeurs (compression différée par paquets)"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return self
+        self.min, self.max = min(self.min, values.min()), max(self.max, values.max())
+        self._buffer.append(values)
+        self._buffered += len(values)
+        if self._buffered >= self.buffer_size:
+            self._flush()
+        return self
+
+    def merge(self, other):
+        """Fusionne un autre digest (autre processus, autre seau temporel)"""
+        other._flush()
+        self._flush()
+        if len(other.weights):
+            self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+            self._compress(np.concatenate([self.means, other.means]), np.concatenate([self.weights, other.weights]))
+        return self
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        values = np.concatenate(self._buffer)
+        self._buffer, self._buffered = [], 0
+        self._compress(
+            np.concatenate([self.means, values]),
+            np.concatenate([self.weights, np.ones(len(values))])
+        )
+
+    def _compress(self, means, weights):
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        # Échelle k1 : un centroïde couvre au plus une unité de k = δ/π · asin(2q − 1),
+        # soit au plus ~δ centroïdes, très fins près des quantiles extrêmes
+        q_mid = (np.cumsum(weights) - weights / 2) / total
+        k = np.floor(self.compression / np.pi * np.arcsin(2 * q_mid - 1))
+        starts = np.flatnonzero(np.r_[True, np.diff(k) != 0])
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+
+    def quantile(self, q):
+        """Quantile(s) approché(s) ; q scalaire ou tableau dans [0, 1]"""
+        self._flush()
+        if len(self.weights) == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        positions = np.cumsum(self.weights) - self.weights / 2
+        total = self.weights.sum()
+        return np.interp(
+            np.asarray(q) * total,
+            np.r_[0.0, positions, total],
+            np.r_[self.min, self.means, self.max]
+        )
+
+    def cdf(self, x):
+        """Part des valeurs inférieures ou égales à x"""
+        self._flush()
+        if len(self.weights) == 0:
+            return np.full(np.shape(x), np.nan) if np.ndim(x) else np.nan
+        positions = np.cumsum(self.weights) - self.weights / 2
+        total = self.weights.sum()
+        return np.interp(
+            np.asarray(x, dtype=np.float64),
+            np.r_[self.min, self.means, self.max],
+            np.r_[0.0, positions, total]
+        ) / total
+
+    def histogram(self, bins=20, range=None):
+        """Effectifs approchés par classe : (effectifs, bornes)"""
+        self._flush()
+        if range is None:
+            range = (self.min, self.max)
+        edges = np.linspace(range[0], range[1], bins + 1) if np.isscalar(bins) else np.asarray(bins)
+        return np.diff(self.cdf(edges)) * self.weights.sum(), edges
+
+
+class AmountSketches:
+    """Distributions des montants par territoire et par département, fusionnables
+
+    Deux mesures sont suivies : ``panier`` (montant des ventes) et ``transaction``
+    (montant absolu de toutes les opérations). Chaque (mesure, dimension, clé) a son
+    t-digest ; la dimension ``Groupe`` couvre l'ensemble du flux.
+    """
+
+    def __init__(self, compression=200):
+        self.compression = compression
+        self.digests = {}
+
+    def digest(self, measure, dimension, key):
+        """Digest d'une (mesure, dimension, clé), créé à la première utilisation"""
+        index = (measure, dimension, key)
+        if index not in self.digests:
+            self.digests[index] = TDigest(self.compression)
+        return self.digests[index]
+
+    def _update_groups(self, measure, dimension, keys, values):
+        order = np.argsort(keys, kind='stable')
+        keys, values = keys[order], values[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        for key, chunk in zip(keys[starts], np.split(values, starts[1:])):
+            self.digest(measure, dimension, key).update(chunk)
+
+    def update(self, transactions):
+        """Ajoute un micro-lot de transactions (DataFrame en colonnes ou liste de dicts)"""
+        frame = pd.DataFrame(transactions)
+        if frame.empty:
+            return 0
+        amounts = frame['Montant'].to_numpy(dtype=np.float64)
+        territories = frame['Territoire'].astype(str).to_numpy()
+        types = frame['Type'].astype(str).to_numpy()
+        sales = frame['Catégorie'].astype(str).to_numpy() == 'Vente'
+
+        self.digest('transaction', 'Groupe', 'GBH').update(np.abs(amounts))
+        self.digest('panier', 'Groupe', 'GBH').update(amounts[sales])
+        self._update_groups('transaction', 'Territoire', territories, np.abs(amounts))
+        self._update_groups('panier', 'Territoire', territories[sales], amounts[sales])
+        # Département = sous-catégorie de vente (« Vente Alimentation » → « Alimentation »)
+        departments = np.char.replace(types[sales].astype(str), 'Vente ', '')
+        self._update_groups('panier', 'Département', departments, amounts[sales])
+        return len(frame)
+
+    add_frame = update
+
+    def merge(self, other):
+        """Fusionne les digests d'un autre ensemble (processus ou période)"""
+        for index, digest in other.digests.items():
+            self.digest(*index).merge(digest)
+        return self
+
+    def quantiles(self, measure='panier', dimension='Territoire', quantiles=DEFAULT_QUANTILES):
+        """Tableau p50/p95/p99 (par défaut) pour chaque clé d'une dimension"""
+        rows = {
+            key: [digest.count] + list(digest.quantile(np.asarray(quantiles)))
+            for (m, d, key), digest in self.digests.items()
+            if m == measure and d == dimension
+        }
+        columns = ['Nombre'] + [f"p{q * 100:g}" for q in quantiles]
+        return pd.DataFrame.from_dict(rows, orient='index', columns=columns).rename_axis(dimension).sort_index()
+
+    def histogram(self, measure='panier', dimension='Groupe', key='GBH', bins=20, range=None):
+        """Histogramme approché (effectifs, bornes) d'une clé"""
+        return self.digest(measure, dimension, key).histogram(bins, range)
+
+
+def hash64(values):
+    """Hachage 64 bits vectorisé (finaliseur splitmix64) d'identifiants entiers"""
+    x = np.asarray(values).astype(np.uint64)
+    with np.errstate(over='ignore'):
+        x = x + np.uint64(0x9E3779B97F4A7C15)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+class HyperLogLog:
+    """Comptage approché d'éléments distincts, fusionnable (max registre par registre)
+
+    ``2 ** precision`` registres d'un octet ; erreur relative ≈ 1.04 / √(2 ** precision),
+    soit ~1.6 % pour 4 Ko avec la précision 12 par défaut.
+    """
+
+    def __init__(self, precision=12):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, ids):
+        """Ajoute un lot d'identifiants entiers"""
+        ids = np.asarray(ids)
+        if len(ids) == 0:
+            return self
+        p = self.precision
+        hashed = hash64(ids)
+        index = (hashed >> np.uint64(64 - p)).astype(np.int64)
+        rest = hashed << np.uint64(p)
+        # Rang = position du premier bit à 1 dans les 64 - p bits restants
+        bit_length = np.frexp(rest.astype(np.float64))[1]
+        rank = np.minimum(65 - bit_length, 65 - p).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other):
+        """Union avec un autre sketch de même précision"""
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def copy(self):
+        clone = HyperLogLog(self.precision)
+        clone.registers = self.registers.copy()
+        return clone
+
+    def count(self):
+        """Estimation du nombre d'identifiants distincts"""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = np.count_nonzero(self.registers == 0)
+        # Petites cardinalités : comptage linéaire sur les registres vides
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+        return float(estimate)
+
+
+class CustomerSketches:
+    """Clients distincts par territoire et par magasin, un HyperLogLog par jour
+
+    Les KPI d'une période quelconque s'obtiennent en fusionnant les sketches
+    journaliers, sans relire les transactions. Seules les ventes portent un
+    identifiant client (``ID_Client`` ≥ 0).
+    """
+
+    def __init__(self, precision=12, retention_days=None):
+        self.precision = precision
+        self.retention_days = retention_days
+        self.sketches = {}
+
+    def _update_groups(self, level, keys, days, ids):
+        frame = pd.DataFrame({'key': keys, 'day': days})
+        for (key, day), positions in frame.groupby(['key', 'day'], sort=False).indices.items():
+            index = (level, key, day)
+            if index not in self.sketches:
+                self.sketches[index] = HyperLogLog(self.precision)
+            self.sketches[index].update(ids[positions])
+
+    def update(self, transactions):
+        """Ajoute un micro-lot de transactions"""
+        frame = pd.DataFrame(transactions)
+        if frame.empty or 'ID_Client' not in frame.columns:
+            return 0
+        frame = frame[frame['ID_Client'].to_numpy() >= 0]
+        if frame.empty:
+            return 0
+        ids = frame['ID_Client'].to_numpy(dtype=np.int64)
+        days = frame['Timestamp'].to_numpy(dtype=np.int64).astype('datetime64[ns]').astype('datetime64[D]')
+        territories = frame['Territoire'].astype(str).to_numpy()
+        stores = territories + ' / ' + frame['Magasin'].astype(str).to_numpy()
+
+        self._update_groups('Groupe', np.full(len(ids), 'GBH'), days, ids)
+        self._update_groups('Territoire', territories, days, ids)
+        self._update_groups('Magasin', stores, days, ids)
+        if self.retention_days is not None:
+            self.prune(days.max() - np.timedelta64(self.retention_days, 'D'))
+        return len(frame)
+
+    add_frame = update
+
+    def prune(self, before):
+        """Supprime les sketches des jours antérieurs à ``before``"""
+        before = np.datetime64(pd.Timestamp(before), 'D')
+        for index in [index for index in self.sketches if index[2] < before]:
+            del self.sketches[index]
+
+    def merge(self, other):
+        """Fusionne les sketches d'un autre ensemble (processus ou période)"""
+        for index, sketch in other.sketches.items():
+            if index in self.sketches:
+                self.sketches[index].merge(sketch)
+            else:
+                self.sketches[index] = sketch.copy()
+        return self
+
+    def union(self, level='Groupe', key='GBH', start=None, end=None):
+        """Sketch des clients d'une clé sur [start, end] (fusion des jours)"""
+        start = None if start is None else np.datetime64(pd.Timestamp(start), 'D')
+        end = None if end is None else np.datetime64(pd.Timestamp(end), 'D')
+        merged = HyperLogLog(self.precision)
+        for (lvl, k, day), sketch in self.sketches.items():
+            if lvl == level and k == key and (start is None or day >= start) and (end is None or day <= end):
+                merged.merge(sketch)
+        return merged
+
+    def distinct(self, level='Groupe', key='GBH', start=None, end=None):
+        """Nombre approché de clients distincts sur la période"""
+        return self.union(level, key, start, end).count()
+
+    def returning(self, level='Groupe', key='GBH', start=None, end=None, lookback_days=30):
+        """Clients de la période déjà venus dans les ``lookback_days`` jours précédents
+
+        |A ∩ B| = |A| + |B| − |A ∪ B| sur les unions de sketches journaliers.
+        """
+        start = pd.Timestamp(start).normalize()
+        end = pd.Timestamp(end if end is not None else start).normalize()
+        current = self.union(level, key, start, end)
+        previous = self.union(level, key, start - pd.Timedelta(days=lookback_days), start - pd.Timedelta(days=1))
+        n_current, n_previous = current.count(), previous.count()
+        both = max(0.0, n_current + n_previous - current.copy().merge(previous).count())
+        return {
+            'distinct': n_current,
+            'returning': min(both, n_current),
+            'returning_rate': min(both, n_current) / n_current * 100 if n_current else 0.0
+        }
+
+    def daily(self, level='Territoire', start=None, end=None):
+        """Clients distincts par jour et par clé (une ligne par sketch journalier)"""
+        rows = [
+            (pd.Timestamp(day), key, sketch.count())
+            for (lvl, key, day), sketch in self.sketches.items()
+            if lvl == level and (start is None or day >= np.datetime64(pd.Timestamp(start), 'D'))
+            and (end is None or day <= np.datetime64(pd.Timestamp(end), 'D'))
+        ]
+        return pd.DataFrame(rows, columns=['Date', level, 'Clients_distincts']).sort_values(['Date', level])
+
+
+class SpaceSaving:
+    """Top-K pondéré en mémoire bornée (Space-Saving de Metwally et al.)
+
+    Au plus ``capacity`` compteurs. Une clé absente remplace le plus petit compteur
+    et hérite de sa valeur, gardée comme erreur maximale : l'estimation surestime
+    la valeur réelle d'au plus ``erreur`` et toute clé pesant plus que le plus
+    petit compteur est présente.
+    """
+
+    def __init__(self, capacity=32):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.total = 0.0
+
+    def _add(self, key, weight):
+        if key in self.counts:
+            self.counts[key] += weight
+        elif len(self.counts) < self.capacity:
+            self.counts[key] = weight
+            self.errors[key] = 0.0
+        else:
+            victim = min(self.counts, key=self.counts.get)
+            floor = self.counts.pop(victim)
+            del self.errors[victim]
+            self.counts[key] = floor + weight
+            self.errors[key] = floor
+
+    def update(self, keys, weights=None):
+        """Ajoute un lot ; les poids (positifs) sont d'abord sommés par clé"""
+        keys = np.asarray(keys)
+        if len(keys) == 0:
+            return self
+        weights = np.ones(len(keys)) if weights is None else np.asarray(weights, dtype=np.float64)
+        # Un lot se réduit à une mise à jour par clé distincte, quel que soit le débit
+        grouped = pd.Series(weights).groupby(keys, sort=False).sum()
+        for key, weight in zip(grouped.index, grouped.to_numpy()):
+            self._add(key, float(weight))
+        self.total += float(weights.sum())
+        return self
+
+    def merge(self, other):
+        """Fusionne un autre résumé ; une clé absente d'un résumé plein y vaut son minimum"""
+        floors = [min(s.counts.values()) if len(s.counts) >= s.capacity else 0.0 for s in (self, other)]
+        counts, errors = {}, {}
+        for key in set(self.counts) | set(other.counts):
+            counts[key] = self.counts.get(key, floors[0]) + other.counts.get(key, floors[1])
+            errors[key] = self.errors.get(key, floors[0]) + other.errors.get(key, floors[1])
+        kept = sorted(counts, key=counts.get, reverse=True)[:self.capacity]
+        self.counts = {key: counts[key] for key in kept}
+        self.errors = {key: errors[key] for key in kept}
+        self.total += other.total
+        return self
+
+    def top(self, n=10):
+        """Les ``n`` premières clés : estimation, erreur maximale et rang garanti"""
+        ranked = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)
+        frame = pd.DataFrame(ranked[:n], columns=['Clé', 'Estimation'])
+        frame['Erreur_max'] = [self.errors[key] for key in frame['Clé']]
+        frame['Part'] = frame['Estimation'] / self.total * 100 if self.total else 0.0
+        # Rang sûr : la borne basse dépasse l'estimation de la clé suivante
+        following = ranked[n][1] if len(ranked) > n else 0.0
+        lower = frame['Estimation'] - frame['Erreur_max']
+        frame['Garanti'] = lower >= np.r_[frame['Estimation'].to_numpy()[1:], following]
+        return frame
+
+
+# Classements suivis par LiveLeaderboards : dimension → colonnes de la clé
+LEADERBOARD_DIMENSIONS = {
+    'Magasin': ['Territoire', 'Magasin'],
+    'Territoire': ['Territoire'],
+    'Type': ['Type']
+}
+
+
+class LiveLeaderboards:
+    """Classements en direct des magasins, territoires et types d'opération
+
+    Deux mesures par dimension : ``CA`` (montant des ventes) et ``Transactions``
+    (nombre d'opérations). La lecture d'un classement ne dépend que de
+    ``capacity``, jamais du nombre d'événements reçus ; la capacité par défaut
+    couvre tout le réseau de magasins, les classements sont alors exacts.
+    """
+
+    def __init__(self, capacity=128, dimensions=LEADERBOARD_DIMENSIONS):
+        self.dimensions = dict(dimensions)
+        self.boards = {
+            (dimension, measure): SpaceSaving(capacity)
+            for dimension in self.dimensions for measure in ('CA', 'Transactions')
+        }
+
+    def _keys(self, frame, dimension):
+        columns = self.dimensions[dimension]
+        keys = frame[columns[0]].astype(str).to_numpy()
+        for column in columns[1:]:
+            keys = keys + ' / ' + frame[column].astype(str).to_numpy()
+        return keys
+
+    def update(self, transactions):
+        """Ajoute un micro-lot de transactions"""
+        frame = pd.DataFrame(transactions)
+        if frame.empty:
+            return 0
+        sales = frame['Catégorie'].astype(str).to_numpy() == 'Vente'
+        amounts = frame['Montant'].to_numpy(dtype=np.float64)
+        for dimension in self.dimensions:
+            keys = self._keys(frame, dimension)
+            self.boards[(dimension, 'Transactions')].update(keys)
+            self.boards[(dimension, 'CA')].update(keys[sales], amounts[sales])
+        return len(frame)
+
+    add_frame = update
+
+    def merge(self, other):
+        for index, board in other.boards.items():
+            self.boards[index].merge(board)
+        return self
+
+    def top(self, dimension='Magasin', measure='CA', n=10):
+        """Classement d'une dimension (colonne ``dimension`` au lieu de ``Clé``)"""
+        return self.boards[(dimension, measure)].top(n).rename(columns={'Clé': dimension})
+
+    def leader(self, dimension='Territoire', measure='CA'):
+        """Clé en tête du classement (None tant que le flux est vide)"""
+        counts = self.boards[(dimension, measure)].counts
+        return max(counts, key=counts.get) if counts else None
@@ -0,0 +1,504 @@
+# NinjaGBHSources.py - Sources de données interchangeables pour les dashboards GBH
+import http.client
+import json
+import os
+import queue
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from functools import cached_property
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import pandas as pd
+
+from NinjaGBHData import NinjaGBHDataSimulator, SimulationSnapshot
+
+# Format texte des dates en base (ordre lexicographique = ordre chronologique)
+SQL_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Sous-répertoire des faits magasin × jour × département (écrits par NinjaGBHBackfill)
+STORE_FACTS_DIR = 'store_facts'
+
+# Couleurs par défaut des types de territoire (identiques au simulateur)
+DEFAULT_TERRITORY_COLORS = {
+    'DROM': '#FF6B6B',
+    'COM': '#FFA500',
+    'Métropole': '#00CED1',
+    'success': '#00D26A',
+    'warning': '#FFB800',
+    'info': '#0095FF'
+}
+
+# Nom des tables communes à tous les backends
+TABLES = {
+    'financial': 'financial',
+    'territories': 'territories',
+    'transactions': 'transactions',
+    'store_stats': 'store_stats'
+}
+
+# Faits magasin × jour × département en base SQLite (colonnes autorisées dans les requêtes)
+STORE_FACT_COLUMNS = [
+    'Date', 'Type', 'Territoire', 'Magasin', 'Département', 'CA', 'Marge', 'Clients', 'Transactions'
+]
+
+# Schéma et index SQLite : chaque requête ne lit que la tranche territoire/date ou magasin/horodatage demandée
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS store_facts (
+    Date TEXT NOT NULL, Type TEXT NOT NULL, Territoire TEXT NOT NULL, Magasin TEXT NOT NULL,
+    Département TEXT NOT NULL, CA REAL, Marge REAL, Clients INTEGER, Transactions INTEGER,
+    PRIMARY KEY (Territoire, Date, Magasin, Département)
+);
+CREATE INDEX IF NOT EXISTS store_facts_type_date ON store_facts (Type, Date);
+CREATE INDEX IF NOT EXISTS store_facts_store_date ON store_facts (Magasin, Date);
+"""
+SQLITE_INDEXES = """
+CREATE INDEX IF NOT EXISTS financial_date ON financial (Date);
+CREATE INDEX IF NOT EXISTS transactions_ts ON transactions (Timestamp);
+CREATE INDEX IF NOT EXISTS transactions_store_ts ON transactions (Magasin, Timestamp);
+CREATE INDEX IF NOT EXISTS transactions_territory_ts ON transactions (Territoire, Timestamp);
+"""
+
+
+def frame_to_payload(frame):
+    """Sérialise un DataFrame en dict JSON compact (colonnes + lignes, dates en ns)"""
+    payload = json.loads(frame.to_json(orient='split', index=False, date_unit='ns'))
+    payload['datetime_columns'] = [
+        column for column in frame.columns if pd.api.types.is_datetime64_any_dtype(frame[column])
+    ]
+    return payload
+
+
+def frame_from_payload(payload):
+    """Reconstruit un DataFrame sérialisé par frame_to_payload"""
+    frame = pd.DataFrame(payload['data'], columns=payload['columns'])
+    for column in payload.get('datetime_columns', []):
+        frame[column] = pd.to_datetime(frame[column], unit='ns')
+    return frame
+
+
+class DataSource:
+    """Interface commune : mêmes données, quel que soit le backend"""
+
+    territory_colors = DEFAULT_TERRITORY_COLORS
+
+    def financial(self, start_date='2023-01-01', end_date=None):
+        """Série financière quotidienne du groupe"""
+        raise NotImplementedError
+
+    def territories(self):
+        """Performances par territoire"""
+        raise NotImplementedError
+
+    def transactions(self, n_transactions=100):
+        """Transactions les plus récentes (liste de dicts, Timestamp décroissant)"""
+        raise NotImplementedError
+
+    def store_stats(self):
+        """Statistiques magasins par type de territoire"""
+        raise NotImplementedError
+
+    def kpis(self):
+        """Résumé des KPI pour l'en-tête"""
+        raise NotImplementedError
+
+    def store_facts(self, start_date='2023-01-01', end_date=None, types=None, territoires=None):
+        """Faits magasin × jour × département (CA, Marge, Clients, Transactions)"""
+        raise NotImplementedError
+
+    def snapshot(self, start_date='2023-01-01', end_date=None, n_transactions=100, now=None):
+        """Instantané paresseux de toutes les tables (une lecture par table et par rafraîchissement)"""
+        return SourceSnapshot(self, start_date, end_date, n_transactions, now)
+
+    def close(self):
+        """Libère les ressources du backend (connexions, fichiers)"""
+
+
+class SourceSnapshot(SimulationSnapshot):
+    """Instantané alimenté par une DataSource quelconque (même API que SimulationSnapshot)"""
+
+    @cached_property
+    def financial_data(self):
+        return self.simulator.financial(self.start_date, self.end_date)
+
+    @cached_property
+    def territory_data(self):
+        return self.simulator.territories()
+
+    @cached_property
+    def transactions(self):
+        return self.simulator.transactions(self.n_transactions)
+
+    @cached_property
+    def store_stats(self):
+        return self.simulator.store_stats()
+
+    @cached_property
+    def kpi_summary(self):
+        return self.simulator.kpis()
+
+
+class SimulatorSource(DataSource):
+    """Backend synthétique : NinjaGBHDataSimulator"""
+
+    def __init__(self, simulator=None, seed=None):
+        self.simulator = NinjaGBHDataSimulator(seed) if simulator is None else simulator
+        self.territory_colors = self.simulator.territory_colors
+
+    def financial(self, start_date='2023-01-01', end_date=None):
+        return self.simulator.generate_financial_data(start_date, end_date)
+
+    def territories(self):
+        return self.simulator.generate_territory_performance()
+
+    def transactions(self, n_transactions=100):
+        return self.simulator.generate_real_transactions(n_transactions)
+
+    def store_stats(self):
+        return self.simulator.get_store_statistics()
+
+    def kpis(self):
+        return self.simulator.get_kpi_summary()
+
+    def store_facts(self, start_date='2023-01-01', end_date=None, types=None, territoires=None):
+        # Tirages par mois calendaire : mêmes valeurs que les partitions mensuelles du backfill
+        facts = self.simulator.generate_store_daily_facts(start_date, end_date, territoires)
+        if types is not None:
+            facts = facts[facts['Type'].isin([types] if isinstance(types, str) else types)]
+        return facts.reset_index(drop=True)
+
+    def snapshot(self, start_date='2023-01-01', end_date=None, n_transactions=100, now=None):
+        # Le simulateur dérive stats et KPI de la même table territoriale
+        return self.simulator.snapshot(start_date, end_date, n_transactions, now)
+
+
+class ParquetSource(DataSource):
+    """Backend fichiers : un répertoire <table>.parquet + kpis.json (voir write_parquet)
+
+    Les faits magasins de NinjaGBHBackfill sont lus dans le sous-répertoire
+    STORE_FACTS_DIR (partitions Type=/Territoire=/year=/month=).
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def _read(self, table, **kwargs):
+        return pd.read_parquet(os.path.join(self.path, f"{TABLES[table]}.parquet"), **kwargs)
+
+    def financial(self, start_date='2023-01-01', end_date=None):
+        end_date = datetime.now() if end_date is None else end_date
+        # Filtre poussé au lecteur Parquet : seuls les row groups utiles sont lus
+        return self._read('financial', filters=[
+            ('Date', '>=', pd.Timestamp(start_date)),
+            ('Date', '<=', pd.Timestamp(end_date))
+        ]).reset_index(drop=True)
+
+    def territories(self):
+        return self._read('territories')
+
+    def transactions(self, n_transactions=100):
+        return self._read('transactions').head(n_transactions).to_dict('records')
+
+    def store_stats(self):
+        return self._read('store_stats')
+
+    def kpis(self):
+        with open(os.path.join(self.path, 'kpis.json'), encoding='utf-8') as f:
+            return json.load(f)
+
+    def store_facts(self, start_date='2023-01-01', end_date=None, types=None, territoires=None):
+        end_date = datetime.now() if end_date is None else end_date
+        filters = [('Date', '>=', pd.Timestamp(start_date)), ('Date', '<=', pd.Timestamp(end_date))]
+        # Filtres sur les colonnes de partition : seuls les répertoires concernés sont lus
+        if types is not None:
+            filters.append(('Type', 'in', [types] if isinstance(types, str) else list(types)))
+        if territoires is not None:
+            filters.append(('Territoire', 'in', [territoires] if isinstance(territoires, str) else list(territoires)))
+        facts = pd.read_parquet(os.path.join(self.path, STORE_FACTS_DIR), filters=filters)
+        facts = facts.drop(columns=['year', 'month'], errors='ignore')
+        return facts.sort_values(['Date', 'Territoire', 'Magasin'], ignore_index=True)
+
+
+def _sqlite_connect(path):
+    # Connexion passée d'un thread à l'autre par le pool de SQLiteSource, jamais partagée en même temps
+    connection = sqlite3.connect(path, check_same_thread=False)
+    # WAL : lecteurs des sessions Streamlit non bloqués pendant les écritures
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+def _sql_date(value):
+    return pd.Timestamp(value).strftime(SQL_DATE_FORMAT)
+
+
+def _where(conditions):
+    """Assemble une clause WHERE à partir de (expression, valeur) ; valeur None = filtre ignoré"""
+    kept = [(expression, value) for expression, value in conditions if value is not None]
+    if not kept:
+        return '', ()
+    clause = ' WHERE ' + ' AND '.join(expression for expression, _ in kept)
+    params = []
+    for expression, value in kept:
+        if ' IN ' in expression:
+            params.extend(value)
+        else:
+            params.append(value)
+    return clause, tuple(params)
+
+
+def _in(column, values):
+    """Condition « colonne IN (...) » ; accepte une valeur seule ou une liste"""
+    if values is None:
+        return (column, None)
+    values = [values] if isinstance(values, str) else list(values)
+    return (f"{column} IN ({', '.join('?' * len(values))})", values)
+
+
+class SQLiteSource(DataSource):
+    """Backend base embarquée : tables financial, territories, transactions, store_stats, kpis
+    et store_facts (voir write_sqlite), indexées et ouvertes en mode WAL
+
+    Source partagée entre les sessions Streamlit : chaque requête emprunte une
+    connexion au pool, jamais utilisée par deux threads à la fois.
+    """
+
+    def __init__(self, path, pool_size=4):
+        self.path = path
+        self.idle = queue.LifoQueue(maxsize=pool_size)
+        with self._connection() as connection:
+            connection.executescript(SQLITE_SCHEMA)
+
+    @contextmanager
+    def _connection(self):
+        try:
+            connection = self.idle.get_nowait()
+        except queue.Empty:
+            connection = _sqlite_connect(self.path)
+        try:
+            yield connection
+        finally:
+            try:
+                self.idle.put_nowait(connection)
+            except queue.Full:
+                connection.close()
+
+    def _query(self, sql, params=(), parse_dates=None):
+        with self._connection() as connection:
+            return pd.read_sql_query(sql, connection, params=params, parse_dates=parse_dates)
+
+    def financial(self, start_date='2023-01-01', end_date=None):
+        end_date = datetime.now() if end_date is None else end_date
+        return self._query(
+            f"SELECT * FROM {TABLES['financial']} WHERE Date BETWEEN ? AND ? ORDER BY Date",
+            (_sql_date(start_date), _sql_date(end_date)),
+            parse_dates=['Date']
+        )
+
+    def territories(self):
+        return self._query(f"SELECT * FROM {TABLES['territories']}")
+
+    def transactions(self, n_transactions=100, start=None, end=None, territoires=None, magasins=None):
+        """Transactions les plus récentes d'abord ; start/end en dates ou int64 ns"""
+        where, params = _where([
+            ('Timestamp >= ?', None if start is None else pd.Timestamp(start).value),
+            ('Timestamp <= ?', None if end is None else pd.Timestamp(end).value),
+            _in('Territoire', territoires),
+            _in('Magasin', magasins)
+        ])
+        return self._query(
+            f"SELECT * FROM {TABLES['transactions']}{where} ORDER BY Timestamp DESC LIMIT ?",
+            params + (int(n_transactions),)
+        ).to_dict('records')
+
+    def store_stats(self):
+        return self._query(f"SELECT * FROM {TABLES['store_stats']}")
+
+    def kpis(self):
+        with self._connection() as connection:
+            rows = connection.execute("SELECT key, value FROM kpis").fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def store_facts(self, start_date='2023-01-01', end_date=None, types=None, territoires=None,
+                    magasins=None, departements=None, columns=None):
+        """Faits magasin × jour × département filtrés (listes ou valeur seule)"""
+        columns = list(STORE_FACT_COLUMNS if columns is None else columns)
+        unknown = [column for column in columns if column not in STORE_FACT_COLUMNS]
+        if unknown:
+            raise ValueError(f"Colonnes inconnues dans store_facts : {unknown}")
+        where, params = _where([
+            ('Date >= ?', None if start_date is None else _sql_date(start_date)),
+            ('Date <= ?', _sql_date(datetime.now() if end_date is None else end_date)),
+            _in('Type', types),
+            _in('Territoire', territoires),
+            _in('Magasin', magasins),
+            _in('Département', departements)
+        ])
+        return self._query(
+            f"SELECT {', '.join(columns)} FROM store_facts{where} ORDER BY Date, Territoire, Magasin",
+            params,
+            parse_dates=['Date'] if 'Date' in columns else None
+        )
+
+    def territory_summary(self, start_date=None, end_date=None, types=None):
+        """CA, marge, clients et transactions agrégés par territoire (calculés en SQL)"""
+        where, params = _where([
+            ('Date >= ?', None if start_date is None else _sql_date(start_date)),
+            ('Date <= ?', None if end_date is None else _sql_date(end_date)),
+            _in('Type', types)
+        ])
+        return self._query(
+            "SELECT Type, Territoire, COUNT(DISTINCT Magasin) AS Magasins, SUM(CA) AS CA, SUM(Marge) AS Marge, "
+            f"SUM(Clients) AS Clients, SUM(Transactions) AS Transactions FROM store_facts{where} "
+            "GROUP BY Type, Territoire ORDER BY CA DESC",
+            params
+        )
+
+    def close(self):
+        while not self.idle.empty():
+            self.idle.get_nowait().close()
+
+
+class _ConnectionPool:
+    """Pool de connexions HTTP/1.1 keep-alive réutilisées entre requêtes"""
+
+    def __init__(self, host, port, size=4, timeout=10, https=False):
+        self.host, self.port, self.timeout = host, port, timeout
+        self.connection_class = http.client.HTTPSConnection if https else http.client.HTTPConnection
+        self.idle = queue.LifoQueue(maxsize=size)
+
+    def request(self, path):
+        try:
+            connection = self.idle.get_nowait()
+        except queue.Empty:
+            connection = self.connection_class(self.host, self.port, timeout=self.timeout)
+        try:
+            connection.request('GET', path, headers={'Accept': 'application/json'})
+            response = connection.getresponse()
+            body = response.read()
+        except (http.client.HTTPException, OSError):
+            # Connexion fermée côté serveur : on la jette et on réessaie une fois à neuf
+            connection.close()
+            connection = self.connection_class(self.host, self.port, timeout=self.timeout)
+            connection.request('GET', path, headers={'Accept': 'application/json'})
+            response = connection.getresponse()
+            body = response.read()
+
+        if response.status != 200:
+            connection.close()
+            raise ConnectionError(f"GET {path} → HTTP {response.status}")
+        try:
+            self.idle.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+        return json.loads(body)
+
+    def close(self):
+        while not self.idle.empty():
+            self.idle.get_nowait().close()
+
+
+class HTTPSource(DataSource):
+    """Backend HTTP/JSON (flux « société Ninja » ou son serveur local de substitution)"""
+
+    def __init__(self, base_url, pool_size=4, timeout=10):
+        parsed = urlparse(base_url)
+        self.prefix = parsed.path.rstrip('/')
+        self.pool = _ConnectionPool(
+            parsed.hostname, parsed.port, size=pool_size, timeout=timeout, https=parsed.scheme == 'https'
+        )
+
+    def _get(self, endpoint, **params):
+        query = f"?{urlencode(params)}" if params else ''
+        return self.pool.request(f"{self.prefix}/{endpoint}{query}")
+
+    def financial(self, start_date='2023-01-01', end_date=None):
+        end_date = datetime.now() if end_date is None else end_date
+        return frame_from_payload(self._get(
+            'financial', start=str(pd.Timestamp(start_date).date()), end=str(pd.Timestamp(end_date).date())
+        ))
+
+    def territories(self):
+        return frame_from_payload(self._get('territories'))
+
+    def transactions(self, n_transactions=100):
+        return self._get('transactions', page=1, page_size=int(n_transactions))['items']
+
+    def store_stats(self):
+        return frame_from_payload(self._get('store_stats'))
+
+    def kpis(self):
+        return self._get('kpis')
+
+    def close(self):
+        self.pool.close()
+
+
+def write_parquet(snapshot, path):
+    """Exporte un instantané au format lu par ParquetSource"""
+    os.makedirs(path, exist_ok=True)
+    snapshot.financial_data.to_parquet(os.path.join(path, 'financial.parquet'), index=False)
+    snapshot.territory_data.to_parquet(os.path.join(path, 'territories.parquet'), index=False)
+    pd.DataFrame(snapshot.transactions).to_parquet(os.path.join(path, 'transactions.parquet'), index=False)
+    snapshot.store_stats.to_parquet(os.path.join(path, 'store_stats.parquet'), index=False)
+    with open(os.path.join(path, 'kpis.json'), 'w', encoding='utf-8') as f:
+        json.dump(snapshot.kpi_summary, f, ensure_ascii=False, indent=2, default=float)
+    return path
+
+
+def write_sqlite(snapshot, path, store_facts=None):
+    """Exporte un instantané au format lu par SQLiteSource
+
+    ``store_facts`` : blocs de faits magasin × jour × département (par exemple
+    ``simulator.iter_store_daily_facts(...)``), insérés bloc par bloc et idempotents.
+    """
+    connection = _sqlite_connect(path)
+    with connection:
+        financial = snapshot.financial_data.copy()
+        financial['Date'] = financial['Date'].dt.strftime(SQL_DATE_FORMAT)
+        financial.to_sql(TABLES['financial'], connection, if_exists='replace', index=False)
+        snapshot.territory_data.to_sql(TABLES['territories'], connection, if_exists='replace', index=False)
+        pd.DataFrame(snapshot.transactions).to_sql(TABLES['transactions'], connection, if_exists='replace', index=False)
+        snapshot.store_stats.to_sql(TABLES['store_stats'], connection, if_exists='replace', index=False)
+        connection.execute("DROP TABLE IF EXISTS kpis")
+        connection.execute("CREATE TABLE kpis (key TEXT PRIMARY KEY, value TEXT)")
+        connection.executemany(
+            "INSERT INTO kpis VALUES (?, ?)",
+            [(key, json.dumps(value, default=float)) for key, value in snapshot.kpi_summary.items()]
+        )
+        connection.executescript(SQLITE_INDEXES + SQLITE_SCHEMA)
+    if isinstance(store_facts, pd.DataFrame):
+        store_facts = [store_facts]
+    for facts in store_facts or []:
+        frame = facts[STORE_FACT_COLUMNS].astype({
+            'Type': str, 'Territoire': str, 'Magasin': str, 'Département': str
+        })
+        frame['Date'] = frame['Date'].dt.strftime(SQL_DATE_FORMAT)
+        with connection:
+            connection.executemany(
+                f"INSERT OR REPLACE INTO store_facts VALUES ({', '.join('?' * len(STORE_FACT_COLUMNS))})",
+                frame.astype(object).itertuples(index=False, name=None)
+            )
+    connection.execute("ANALYZE")
+    connection.close()
+    return path
+
+
+def get_data_source(url=None):
+    """Crée la source décrite par une URL (variable GBH_DATA_SOURCE par défaut)
+
+    simulator://[?seed=42]  parquet:///chemin  sqlite:///chemin.db  http://hôte:port
+    """
+    url = url or os.environ.get('GBH_DATA_SOURCE', 'simulator://')
+    parsed = urlparse(url)
+
+    if parsed.scheme == 'simulator':
+        seed = parse_qs(parsed.query).get('seed', [None])[0]
+        return SimulatorSource(seed=None if seed is None else int(seed))
+    if parsed.scheme == 'parquet':
+        return ParquetSource(parsed.netloc + parsed.path)
+    if parsed.scheme == 'sqlite':
+        return SQLiteSource(parsed.netloc + parsed.path)
+    if parsed.scheme in ('http', 'https'):
+        return HTTPSource(url)
+    raise ValueError(f"Source de données inconnue : {url}")
@@ -1,5 +1,4 @@
 import streamlit as st
-import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 from datetime import datetime
@@ -7,7 +6,8 @@ import warnings
 warnings.filterwarnings('ignore')
 
 # Import du simulateur
-from NinjaGBHData import NinjaGBHDataSimulator
+from NinjaGBHData import format_transactions
+from NinjaGBHSources import get_data_source
 
 # Configuration de la page
 st.set_page_config(
@@ -29,21 +29,18 @@ COLORS = {
 
 # Cache des données pour de meilleures performances
 @st.cache_resource
-def get_simulator():
-    return NinjaGBHDataSimulator()
+def get_source():
+    return get_data_source()
 
 @st.cache_data(ttl=3600)  # Cache pour 1 heure
 def get_data():
-    simulator = get_simulator()
-    financial_data = simulator.generate_financial_data()
-    territory_data = simulator.generate_territory_performance()
-    kpi_summary = simulator.get_kpi_summary()
-    transactions = simulator.generate_real_transactions(20)
-    return financial_data, territory_data, kpi_summary, transactions
+    snapshot = get_source().snapshot(n_transactions=20)
+    return (snapshot.financial_data, snapshot.territory_data, snapshot.territory_cube,
+            snapshot.kpi_summary, snapshot.transactions)
 
 # Initialisation
-ninja_simulator = get_simulator()
-financial_data, territory_data, kpi_summary, transactions_data = get_data()
+data_source = get_source()
+financial_data, territory_data, territory_cube, kpi_summary, transactions_data = get_data()
 
 # CSS personnalisé
 st.markdown("""
@@ -167,9 +164,9 @@ with tab1:
     
     with col2:
         # Répartition territoriale
-        drom_ca = territory_data[territory_data['Type'] == 'DROM']['Chiffre_affaires'].sum()
-        com_ca = territory_data[territory_data['Type'] == 'COM']['Chiffre_affaires'].sum()
-        metro_ca = territory_data[territory_data['Type'] == 'Métropole']['Chiffre_affaires'].sum()
+        drom_ca = territory_cube.sum('Chiffre_affaires', 'DROM')
+        com_ca = territory_cube.sum('Chiffre_affaires', 'COM')
+        metro_ca = territory_cube.sum('Chiffre_affaires', 'Métropole')
         
         fig_pie = go.Figure(data=[go.Pie(
             labels=['DROM', 'COM', 'Métropole'],
@@ -220,19 +217,19 @@ with tab1:
 with tab2:
     st.markdown('<h2 class="section-header">🏝️ Analyse DROM</h2>', unsafe_allow_html=True)
     
-    drom_data = territory_data[territory_data['Type'] == 'DROM']
+    drom_data = territory_cube.rows('DROM')
     
     # KPI DROM
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Territoires DROM", f"{len(drom_data)}")
+        st.metric("Territoires DROM", f"{territory_cube.count('DROM')}")
     with col2:
-        st.metric("CA Total", f"{drom_data['Chiffre_affaires'].sum():,.0f}€".replace(',', ' '))
+        st.metric("CA Total", f"{territory_cube.sum('Chiffre_affaires', 'DROM'):,.0f}€".replace(',', ' '))
     with col3:
-        st.metric("Croissance Moyenne", f"+{drom_data['Croissance'].mean():.1f}%")
+        st.metric("Croissance Moyenne", f"+{territory_cube.mean('Croissance', 'DROM'):.1f}%")
     with col4:
-        st.metric("Satisfaction Moyenne", f"{drom_data['Satisfaction'].mean():.1f}/5")
+        st.metric("Satisfaction Moyenne", f"{territory_cube.mean('Satisfaction', 'DROM'):.1f}/5")
     
     # Graphiques DROM
     col1, col2 = st.columns(2)
@@ -254,8 +251,8 @@ with tab2:
     with col2:
         fig_drom_radar = go.Figure()
         fig_drom_radar.add_trace(go.Scatterpolar(
-            r=[drom_data['Croissance'].mean(), drom_data['Satisfaction'].mean()*20, 
-               drom_data['Rentabilité'].mean(), drom_data['Part_marche'].mean()/5],
+            r=[territory_cube.mean('Croissance', 'DROM'), territory_cube.mean('Satisfaction', 'DROM')*20, 
+               territory_cube.mean('Rentabilité', 'DROM'), territory_cube.mean('Part_marche', 'DROM')/5],
             theta=['Croissance', 'Satisfaction', 'Rentabilité', 'Part de Marché'],
             fill='toself',
             name='Performance DROM',
@@ -272,19 +269,19 @@ with tab2:
 with tab3:
     st.markdown('<h2 class="section-header">🏖️ Analyse COM</h2>', unsafe_allow_html=True)
     
-    com_data = territory_data[territory_data['Type'] == 'COM']
+    com_data = territory_cube.rows('COM')
     
     # KPI COM
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Territoires COM", f"{len(com_data)}")
+        st.metric("Territoires COM", f"{territory_cube.count('COM')}")
     with col2:
-        st.metric("CA Total", f"{com_data['Chiffre_affaires'].sum():,.0f}€".replace(',', ' '))
+        st.metric("CA Total", f"{territory_cube.sum('Chiffre_affaires', 'COM'):,.0f}€".replace(',', ' '))
     with col3:
-        st.metric("Panier Moyen", f"{com_data['Panier_moyen'].mean():.1f}€")
+        st.metric("Panier Moyen", f"{territory_cube.mean('Panier_moyen', 'COM'):.1f}€")
     with col4:
-        st.metric("Rentabilité Moyenne", f"{com_data['Rentabilité'].mean():.1f}%")
+        st.metric("Rentabilité Moyenne", f"{territory_cube.mean('Rentabilité', 'COM'):.1f}%")
     
     # Graphique COM
     fig_com = go.Figure(data=[go.Bar(
@@ -310,19 +307,19 @@ with tab3:
 with tab4:
     st.markdown('<h2 class="section-header">🏙️ Analyse Métropole</h2>', unsafe_allow_html=True)
     
-    metro_data = territory_data[territory_data['Type'] == 'Métropole']
+    metro_data = territory_cube.rows('Métropole')
     
     # KPI Métropole
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Régions", f"{len(metro_data)}")
+        st.metric("Régions", f"{territory_cube.count('Métropole')}")
     with col2:
-        st.metric("CA Total", f"{metro_data['Chiffre_affaires'].sum():,.0f}€".replace(',', ' '))
+        st.metric("CA Total", f"{territory_cube.sum('Chiffre_affaires', 'Métropole'):,.0f}€".replace(',', ' '))
     with col3:
-        st.metric("Part du CA Total", f"{(metro_data['Chiffre_affaires'].sum() / territory_data['Chiffre_affaires'].sum() * 100):.1f}%")
+        st.metric("Part du CA Total", f"{(territory_cube.share('Chiffre_affaires', 'Métropole') * 100):.1f}%")
     with col4:
-        st.metric("Nouveaux Clients/mois", f"{metro_data['Nouveaux_clients_mois'].sum():,}")
+        st.metric("Nouveaux Clients/mois", f"{int(territory_cube.sum('Nouveaux_clients_mois', 'Métropole')):,}")
     
     # Graphique Métropole
     metro_sorted = metro_data.sort_values('Chiffre_affaires', ascending=True)
@@ -414,10 +411,13 @@ st.markdown("---")
 st.markdown('<h2 class="section-header">💳 Transactions Récentes</h2>', unsafe_allow_html=True)
 
 # Convertir les transactions en DataFrame pour un meilleur affichage
-transactions_df = pd.DataFrame(transactions_data)
+transactions_df = format_transactions(transactions_data)
 if not transactions_df.empty:
     st.dataframe(
         transactions_df,
+        column_config={
+            'Montant': st.column_config.NumberColumn('Montant', format="%+.2f €")
+        },
         use_container_width=True,
         height=400
     )
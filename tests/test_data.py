@@ -0,0 +1,31 @@
+import asyncio
+
+import numpy as np
+
+from NinjaGBHData import NinjaGBHDataSimulator
+
+
+def _after_batches(simulator, n):
+    """Flux aléatoire tel qu'il est après exactement ``n`` lots"""
+    rng = np.random.default_rng(0)
+    stream = simulator.stream_transactions(start='2025-01-01', realtime=False, rng=rng)
+    for _ in range(n):
+        next(stream)
+    return rng
+
+
+def test_stream_stops_without_drawing_an_extra_batch():
+    simulator = NinjaGBHDataSimulator(5)
+    rng = np.random.default_rng(0)
+    batches = list(simulator.stream_transactions(max_batches=3, start='2025-01-01', realtime=False, rng=rng))
+    assert len(batches) == 3
+    assert rng.random() == _after_batches(simulator, 3).random()
+
+    async def collect():
+        rng = np.random.default_rng(0)
+        stream = simulator.astream_transactions(max_batches=3, start='2025-01-01', realtime=False, rng=rng)
+        return [batch async for batch in stream], rng
+
+    async_batches, async_rng = asyncio.run(collect())
+    assert len(async_batches) == 3
+    assert async_rng.random() == _after_batches(simulator, 3).random()
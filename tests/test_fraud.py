@@ -0,0 +1,32 @@
+import os
+
+from NinjaGBHData import NinjaGBHDataSimulator
+from NinjaGBHFraud import FraudScorer, ScoredBatches, score_simulated_batches
+
+
+def _scorer(simulator, n_history):
+    return FraudScorer(n_estimators=10, n_jobs=1).fit(simulator.generate_transactions_frame(n_history))
+
+
+def test_batch_cache_keyed_by_size_and_model(tmp_path):
+    cache = str(tmp_path / 'scores')
+    simulator = NinjaGBHDataSimulator(1)
+    batches = ScoredBatches(_scorer(simulator, 2000), cache)
+    small = score_simulated_batches(batches, simulator, 1, n_batches=2, batch_size=100)
+
+    # Autre taille de lot : nouveaux identifiants, pas les lots de 100 lignes relus
+    large = score_simulated_batches(batches, simulator, 1, n_batches=2, batch_size=300)
+    assert set(small).isdisjoint(large)
+    assert batches.summary(large)['rows'].tolist() == [300, 300]
+    assert batches.page(1, 1000, suspicious_only=False, batch_ids=large)['total'] == 600
+    assert not any(name.endswith('.tmp') for name in os.listdir(cache))
+
+    # Même modèle rouvert : cache conservé
+    assert all(b in ScoredBatches(batches.scorer, cache) for b in small + large)
+
+    # Modèle ré-entraîné : cache invalidé puis re-noté
+    retrained = ScoredBatches(_scorer(simulator, 3000), cache)
+    assert not any(b in retrained for b in small + large)
+    assert retrained.summary().empty
+    score_simulated_batches(retrained, simulator, 1, n_batches=2, batch_size=100)
+    assert retrained.summary()['rows'].sum() == 200
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+from NinjaGBHLive import SlidingWindowAggregator
+
+
+def test_windows_expire_after_long_idle_period():
+    aggregator = SlidingWindowAggregator(windows=(1, 5, 15, 60), slot_seconds=5)
+    start = pd.Timestamp('2025-01-01 10:00')
+    aggregator.add(start.value, 100.0, 'DROM')
+
+    # 90 minutes sans événement : plus que toute la profondeur de l'anneau
+    later = start + pd.Timedelta(minutes=90)
+    aggregator.add(later.value, 40.0, 'COM')
+
+    for minutes in (1, 5, 15, 60):
+        window = aggregator.window(minutes, now=later)
+        assert window['count'] == 1
+        assert np.isclose(window['revenue'], 40.0)
+
+    # Puis les totaux continuent d'expirer normalement
+    assert aggregator.window(1, now=later + pd.Timedelta(minutes=2))['count'] == 0
+    assert aggregator.window(60, now=later + pd.Timedelta(minutes=2))['count'] == 1
+
+
+def test_windows_match_recount_on_irregular_clock():
+    rng = np.random.default_rng(0)
+    aggregator = SlidingWindowAggregator(windows=(1, 15), slot_seconds=5)
+    start = pd.Timestamp('2025-01-01').value
+    # Rafales séparées de pauses courtes et longues
+    gaps = rng.choice([1, 30, 700, 5000], 200) * 1_000_000_000
+    times = start + np.cumsum(gaps)
+    amounts = rng.uniform(1, 100, 200)
+    for t, amount in zip(times, amounts):
+        aggregator.add(int(t), amount, 'Métropole')
+        for minutes in (1, 15):
+            slot_ns = aggregator.slot_ns
+            lower = (t // slot_ns - aggregator.widths[minutes]) * slot_ns
+            inside = (times <= t) & (times >= lower + slot_ns)
+            assert aggregator.window(minutes)['count'] == inside.sum()
+
+
+def test_first_batch_spanning_several_slots_expires():
+    aggregator = SlidingWindowAggregator(windows=(1, 5), slot_seconds=5)
+    start = pd.Timestamp('2025-01-01 10:00')
+    # Premier lot à cheval sur deux intervalles de 5 s
+    stamps = [(start + pd.Timedelta(seconds=s)).value for s in (2, 7)]
+    aggregator.add_batch(stamps, [10.0, 20.0], ['DROM', 'COM'])
+    assert aggregator.window(1)['count'] == 2
+
+    later = start + pd.Timedelta(minutes=3)
+    assert aggregator.window(1, now=later)['count'] == 0
+    assert aggregator.window(5, now=later)['count'] == 2
+    assert aggregator.window(5, now=start + pd.Timedelta(minutes=6))['count'] == 0
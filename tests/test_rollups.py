@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from NinjaGBHRollups import store_facts_rollup, transactions_rollup
+
+
+def _facts(dates, ca):
+    return pd.DataFrame({
+        'Date': pd.to_datetime(dates),
+        'Type': 'DROM', 'Territoire': 'Martinique', 'Magasin': 'GBH Ducos',
+        'CA': ca, 'Marge': 0.0, 'Clients': 1, 'Transactions': 1
+    })
+
+
+def test_day_split_across_blocks_counts_once():
+    rollup = store_facts_rollup()
+    rollup.update(_facts(['2025-03-10', '2025-03-10'], [100.0, 50.0]))
+    rollup.update(_facts(['2025-03-10', '2025-03-11'], [30.0, 20.0]))
+
+    day = rollup.table('day', 'store')
+    assert day['Jours'].tolist() == [1, 1]
+    assert day['CA'].tolist() == [180.0, 20.0]
+
+    month = rollup.mean('CA', 'month', 'group')
+    assert month['Jours'].tolist() == [2]
+    assert month['Lignes'].tolist() == [4]
+    assert np.isclose(month['CA_moyen'].iloc[0], 100.0)
+
+
+def test_micro_batches_keep_one_day_per_day():
+    start = pd.Timestamp('2025-03-01').value
+    step = 60 * 60 * 1_000_000_000
+    rollup = transactions_rollup()
+    # Un micro-lot par heure pendant 3 jours
+    for i in range(3 * 24):
+        rollup.update(pd.DataFrame({
+            'Timestamp': [start + i * step], 'Type': ['Vente Maison'], 'Montant': [10.0],
+            'Territoire': ['Martinique'], 'Magasin': ['GBH Ducos'], 'Type_Territoire': ['DROM']
+        }))
+    assert rollup.table('day', 'group')['Jours'].tolist() == [1, 1, 1]
+    assert rollup.table('month', 'store')['Jours'].tolist() == [3]
+    assert rollup.mean('Montant', 'month', 'group')['Montant_moyen'].tolist() == [240.0]
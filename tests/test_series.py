@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+
+from NinjaGBHData import NinjaGBHDataSimulator
+from NinjaGBHSeries import RangeSeries
+
+
+def test_window_sums_on_frame_starting_mid_series():
+    financial = NinjaGBHDataSimulator(3).generate_financial_data('2024-01-01', '2024-06-30')
+    full = RangeSeries(financial)
+    # Données filtrées par date (sources Parquet, SQLite, HTTP) : cumul non nul en première ligne
+    filtered = financial[financial['Date'] >= '2024-03-01'].reset_index(drop=True)
+    series = RangeSeries(filtered)
+
+    start, end = '2024-03-01', '2024-03-10'
+    expected = financial.set_index('Date').loc[start:end, 'CA_Quotidien'].sum()
+    assert np.isclose(series.sum('Chiffre_d_affaires', start, end), expected)
+    assert np.isclose(series.sum('Chiffre_d_affaires'), full.sum('Chiffre_d_affaires', start=start))
+
+    # Sans montant du jour : exact hors première ligne, estimé à un jour près sur celle-ci
+    assert np.isclose(series.sum('Dépenses', '2024-03-02', end), full.sum('Dépenses', '2024-03-02', end))
+    day = full.sum('Dépenses', start, start)
+    assert abs(series.sum('Dépenses', start, end) - full.sum('Dépenses', start, end)) < 0.5 * day
+
+    # Série complète : inchangée
+    assert np.isclose(full.sum('Bénéfice_net'), financial['Bénéfice_net'].iloc[-1])
+    assert np.isclose(full.sum('Chiffre_d_affaires', end=pd.Timestamp(end)),
+                      financial.set_index('Date').loc[:end, 'CA_Quotidien'].sum())
@@ -0,0 +1,65 @@
+import asyncio
+import socket
+
+import pytest
+
+from NinjaGBHServer import AsyncNinjaClient, create_server
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_client_recovers_after_refused_connections():
+    port = _free_port()
+    client = AsyncNinjaClient(f"http://127.0.0.1:{port}", pool_size=2, retries=0, timeout=2)
+
+    async def scenario():
+        # Plus d'échecs que de places dans le pool : aucune place ne doit être perdue
+        for _ in range(3):
+            with pytest.raises(OSError):
+                await client.get_json('health')
+
+        server = create_server('127.0.0.1', port, seed=1, n_transactions=100)
+        loop = asyncio.get_running_loop()
+        serving = loop.run_in_executor(None, server.serve_forever)
+        try:
+            return await asyncio.wait_for(client.get_json('health'), 1.5)
+        finally:
+            await client.close()
+            server.shutdown()
+            await serving
+            server.server_close()
+
+    assert asyncio.run(scenario()) is not None
+
+
+def test_client_errors_are_not_retried():
+    server = create_server('127.0.0.1', 0, seed=1, n_transactions=100)
+    client = AsyncNinjaClient(f"http://127.0.0.1:{server.server_address[1]}", retries=3, backoff=5)
+    requests = []
+    request = client._request
+
+    async def counted(path):
+        requests.append(path)
+        return await request(path)
+
+    client._request = counted
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        serving = loop.run_in_executor(None, server.serve_forever)
+        try:
+            # Un 404 est immédiat : pas de reprise ni d'attente de backoff
+            with pytest.raises(ConnectionError, match='404'):
+                await asyncio.wait_for(client.get_json('inconnue'), 2)
+        finally:
+            await client.close()
+            server.shutdown()
+            await serving
+            server.server_close()
+
+    asyncio.run(scenario())
+    assert requests == ['/inconnue']
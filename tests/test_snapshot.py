@@ -0,0 +1,66 @@
+from NinjaGBHData import NinjaGBHDataSimulator, SimulationSnapshot
+
+
+def _load(path, simulator, **kwargs):
+    return SimulationSnapshot.load_or_create(str(path), simulator, start_date='2025-01-01', **kwargs)
+
+
+def test_snapshot_reused_only_for_same_seed_and_parameters(tmp_path):
+    path = tmp_path / 'snapshot'
+    first = _load(path, NinjaGBHDataSimulator(1), n_transactions=10)
+    revenue = first.financial_data['Chiffre_d_affaires'].iloc[-1]
+
+    # Même graine, mêmes paramètres : relu depuis le disque
+    again = _load(path, NinjaGBHDataSimulator(1), n_transactions=10)
+    assert again.financial_data['Chiffre_d_affaires'].iloc[-1] == revenue
+
+    # Autre graine : régénéré et republié
+    other = _load(path, NinjaGBHDataSimulator(2), n_transactions=10)
+    assert other.financial_data['Chiffre_d_affaires'].iloc[-1] != revenue
+    reloaded = _load(path, NinjaGBHDataSimulator(2), n_transactions=10)
+    assert reloaded.financial_data['Chiffre_d_affaires'].iloc[-1] == other.financial_data['Chiffre_d_affaires'].iloc[-1]
+
+    # Autres paramètres : régénéré
+    assert len(_load(path, NinjaGBHDataSimulator(2), n_transactions=5).transactions) == 5
+
+
+def test_unseeded_simulator_reuses_published_snapshot(tmp_path):
+    path = tmp_path / 'snapshot'
+    published = _load(path, NinjaGBHDataSimulator(), n_transactions=10)
+    # Un autre processus sans graine fixée reprend l'instantané publié
+    worker = _load(path, NinjaGBHDataSimulator(), n_transactions=10)
+    assert worker.financial_data['Chiffre_d_affaires'].iloc[-1] == published.financial_data['Chiffre_d_affaires'].iloc[-1]
+
+
+def _metadata_path(path):
+    return path / (path / 'CURRENT').read_text(encoding='utf-8') / 'snapshot.json'
+
+
+def test_snapshot_without_fingerprint_is_regenerated(tmp_path):
+    import json
+    path = tmp_path / 'snapshot'
+    _load(path, NinjaGBHDataSimulator(1), n_transactions=10)
+    metadata = json.loads(_metadata_path(path).read_text(encoding='utf-8'))
+    del metadata['fingerprint']
+    _metadata_path(path).write_text(json.dumps(metadata), encoding='utf-8')
+    _load(path, NinjaGBHDataSimulator(1), n_transactions=10)
+    assert 'fingerprint' in json.loads(_metadata_path(path).read_text(encoding='utf-8'))
+
+
+def test_republish_keeps_previous_version_readable(tmp_path):
+    path = tmp_path / 'snapshot'
+    _load(path, NinjaGBHDataSimulator(1), n_transactions=10)
+    # Un lecteur a résolu la version publiée avant qu'un autre processus ne la remplace
+    reader_path = _metadata_path(path).parent
+    _load(path, NinjaGBHDataSimulator(2), n_transactions=10)
+    assert _metadata_path(path).parent != reader_path
+    assert (reader_path / 'financial.arrow').exists()
+
+
+def test_snapshot_regenerated_when_end_date_moves(tmp_path):
+    path = tmp_path / 'snapshot'
+    first = _load(path, NinjaGBHDataSimulator(1), end_date='2025-02-01', n_transactions=10)
+    same_day = _load(path, NinjaGBHDataSimulator(1), end_date='2025-02-01 18:00', n_transactions=10)
+    assert len(same_day.financial_data) == len(first.financial_data)
+    next_day = _load(path, NinjaGBHDataSimulator(1), end_date='2025-02-02', n_transactions=10)
+    assert len(next_day.financial_data) == len(first.financial_data) + 1
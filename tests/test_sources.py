@@ -0,0 +1,109 @@
+import numpy as np
+
+from NinjaGBHBackfill import main as backfill
+from NinjaGBHSources import get_data_source
+
+KEYS = ['Date', 'Territoire', 'Magasin', 'Département']
+
+
+def _by_key(facts):
+    facts = facts.astype({column: str for column in KEYS[1:]})
+    return facts.sort_values(KEYS, ignore_index=True)
+
+
+def test_parquet_source_reads_backfill_output(tmp_path):
+    backfill([
+        '--start', '2025-03-01', '--end', '2025-04-30', '--output', str(tmp_path),
+        '--seed', '7', '--workers', '1', '--territoires', 'Martinique', 'Île-de-France'
+    ])
+    source = get_data_source(f"parquet://{tmp_path}")
+
+    facts = source.store_facts('2025-03-28', '2025-04-02')
+    expected = get_data_source('simulator://?seed=7').store_facts(
+        '2025-03-28', '2025-04-02', territoires=['Martinique', 'Île-de-France']
+    )
+    facts, expected = _by_key(facts), _by_key(expected)
+    assert len(facts) == len(expected) > 0
+    assert np.allclose(facts['CA'], expected['CA'])
+
+    assert set(source.store_facts('2025-03-01', '2025-04-30', types='DROM')['Territoire']) == {'Martinique'}
+    # Tables de l'instantané écrites à côté des faits
+    assert len(source.financial('2025-03-01', '2025-04-30')) == 61
+
+
+def test_sqlite_source_store_facts(tmp_path):
+    import pytest
+
+    from NinjaGBHData import NinjaGBHDataSimulator
+    from NinjaGBHSources import write_sqlite
+
+    simulator = NinjaGBHDataSimulator(7)
+    path = tmp_path / 'ninja.db'
+    write_sqlite(simulator.snapshot('2025-03-01', '2025-04-30', n_transactions=200), str(path),
+                 store_facts=simulator.iter_store_daily_facts('2025-03-01', '2025-04-30', ['Martinique']))
+    source = get_data_source(f"sqlite:///{path}")
+
+    facts = source.store_facts('2025-03-28', '2025-04-02')
+    expected = get_data_source('simulator://?seed=7').store_facts('2025-03-28', '2025-04-02', territoires='Martinique')
+    facts, expected = _by_key(facts), _by_key(expected)
+    assert len(facts) == len(expected) > 0
+    assert np.allclose(facts['CA'], expected['CA'])
+
+    assert list(source.store_facts('2025-03-01', '2025-03-31', columns=['Magasin', 'CA']).columns) == ['Magasin', 'CA']
+    with pytest.raises(ValueError):
+        source.store_facts('2025-03-01', columns=['CA FROM store_facts; --'])
+    assert source.territory_summary(types='DROM')['Territoire'].tolist() == ['Martinique']
+    assert len(source.transactions(50, territoires='Martinique')) <= 50
+    source.close()
+
+
+
+def test_sqlite_source_never_shares_a_connection_between_threads(tmp_path):
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    from NinjaGBHData import NinjaGBHDataSimulator
+    from NinjaGBHSources import write_sqlite
+
+    path = tmp_path / 'ninja.db'
+    write_sqlite(NinjaGBHDataSimulator(7).snapshot('2024-01-01', n_transactions=100), str(path))
+    source = get_data_source(f"sqlite:///{path}")
+    barrier = threading.Barrier(6)
+
+    def session(_):
+        # Six sessions Streamlit simultanées, plus que le pool n'en garde en réserve
+        with source._connection() as connection:
+            barrier.wait(timeout=5)
+            rows = connection.execute("SELECT COUNT(*) FROM financial").fetchone()[0]
+            return id(connection), rows
+
+    with ThreadPoolExecutor(6) as pool:
+        results = list(pool.map(session, range(6)))
+    assert len({connection for connection, _ in results}) == 6
+    assert len({rows for _, rows in results}) == 1
+    assert len(source.financial('2024-01-01')) == results[0][1]
+    source.close()
+
+
+def test_backfill_started_mid_month_matches_simulator(tmp_path):
+    backfill([
+        '--start', '2025-03-15', '--end', '2025-04-10', '--output', str(tmp_path),
+        '--seed', '7', '--workers', '1', '--territoires', 'Martinique'
+    ])
+    facts = get_data_source(f"parquet://{tmp_path}").store_facts('2025-03-15', '2025-04-10')
+    # Même graine, période plus large : les jours communs ont les mêmes valeurs
+    expected = get_data_source('simulator://?seed=7').store_facts('2025-03-01', '2025-04-30', territoires='Martinique')
+    expected = expected[(expected['Date'] >= '2025-03-15') & (expected['Date'] <= '2025-04-10')]
+    facts, expected = _by_key(facts), _by_key(expected)
+    assert len(facts) == len(expected) > 0
+    assert np.allclose(facts['CA'], expected['CA'])
+
+
+def test_store_facts_territory_given_as_string():
+    from NinjaGBHData import NinjaGBHDataSimulator
+
+    # Une chaîne n'est pas filtrée par sous-chaîne (« Martinique » ⊂ « La Martinique »)
+    simulator = NinjaGBHDataSimulator(7)
+    facts = simulator.generate_store_daily_facts('2025-03-01', '2025-03-02', territoires='Guyane')
+    assert set(facts['Territoire'].astype(str)) == {'Guyane'}
+    assert len(simulator.generate_store_daily_facts('2025-03-01', '2025-03-02', territoires='La Martinique')) == 0